@@ -8,8 +8,21 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+import asyncio
 import os
 from auth import authenticate_admin, create_access_token, verify_token
+from model_utils import ml_models, ML_MODELS_MODE
+from model_training import training_jobs, MODEL_KINDS
+from model_export import EXPORT_EXTENSIONS
+from rate_limiter import rate_limiter
+from circuit_breaker import circuit_breakers
+from dashboard_hub import dashboard_hub
+from state_backend import state_backend
+from investigation_jobs import investigation_store, investigation_worker
+from keyword_matcher import keyword_registry
+from feature_store import feature_store
+from watchlist import watchlists
+from courtlistener_mirror import courtlistener_mirror
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -18,6 +31,13 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
+class RetrainRequest(BaseModel):
+    models: List[str] = MODEL_KINDS
+    muestras: Optional[int] = None
+
+class ModelExportRequest(BaseModel):
+    formats: List[str] = ["json"]
+
 class AdminStats(BaseModel):
     total_queries: int
     cases_processed: int
@@ -299,15 +319,219 @@ async def get_analytics(
     }
 
 @router.post("/model/retrain")
-async def trigger_model_retrain(token_payload: dict = Depends(verify_token)):
+async def trigger_model_retrain(
+    request: Optional[RetrainRequest] = None,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Trigger para re-entrenar modelos en background (proceso separado)
+    """
+    if ML_MODELS_MODE == "demo":
+        raise HTTPException(status_code=409, detail="Modelos de demo en servicio (ML_MODELS=demo): no hay modelos CatBoost que re-entrenar")
+    
+    request = request or RetrainRequest()
+    invalid = [kind for kind in request.models if kind not in MODEL_KINDS]
+    if invalid or not request.models:
+        raise HTTPException(status_code=400, detail=f"Modelos inválidos: {invalid}. Opciones: {MODEL_KINDS}")
+    
+    running = training_jobs.active_job()
+    job = training_jobs.start(ml_models, kinds=request.models, n_samples=request.muestras)
+    
+    return {
+        "status": "training_in_progress" if running else "training_initiated",
+        "message": "Ya existe un re-entrenamiento en curso" if running else "El re-entrenamiento de modelos ha sido iniciado",
+        "job_id": job["job_id"],
+        "models": job["models"],
+        "progress_url": f"/admin/model/retrain/{job['job_id']}",
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/model/retrain")
+async def list_model_retrain_jobs(token_payload: dict = Depends(verify_token)):
+    """
+    Historial de trabajos de re-entrenamiento
+    """
+    return {
+        "jobs": training_jobs.list_jobs(),
+        "active_job": training_jobs.active_job(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/model/retrain/{job_id}")
+async def get_model_retrain_job(job_id: str, token_payload: dict = Depends(verify_token)):
+    """
+    Progreso y resultado de validación de un trabajo de re-entrenamiento
+    """
+    job = training_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de entrenamiento no encontrado")
+    
+    return {
+        **job,
+        "model_stats": ml_models.get_model_stats()
+    }
+
+@router.post("/model/export")
+async def export_models(
+    request: Optional[ModelExportRequest] = None,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Exportar los modelos entrenados a formatos de inferencia ligeros (json, onnx, python, cpp)
+    """
+    if ML_MODELS_MODE == "demo":
+        raise HTTPException(status_code=409, detail="Modelos de demo en servicio (ML_MODELS=demo): no hay modelos CatBoost que exportar")
+    
+    request = request or ModelExportRequest()
+    invalid = [fmt for fmt in request.formats if fmt not in EXPORT_EXTENSIONS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Formatos inválidos: {invalid}. Opciones: {list(EXPORT_EXTENSIONS)}")
+    
+    try:
+        exported = await asyncio.to_thread(ml_models.export_models, request.formats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exportando modelos: {str(e)}")
+    
+    return {
+        "status": "exported",
+        "backend": ml_models.backend,
+        "files": exported,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/rate-limits")
+async def get_rate_limits(token_payload: dict = Depends(verify_token)):
+    """
+    Límites configurados y métricas de los token buckets por proveedor y credencial
+    """
+    return {
+        **rate_limiter.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/circuit-breakers")
+async def get_circuit_breakers(token_payload: dict = Depends(verify_token)):
+    """
+    Estado de los circuit breakers por proveedor: estado, fallos, latencias p50/p99 y timeout adaptativo
+    """
+    return {
+        **circuit_breakers.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/courtlistener-mirror")
+async def get_courtlistener_mirror_stats(token_payload: dict = Depends(verify_token)):
+    """
+    Espejo local de CourtListener: expedientes, fecha de cobertura, latencia y consultas a la API
+    """
+    return {
+        **await asyncio.to_thread(courtlistener_mirror.get_stats),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/courtlistener-mirror/import")
+async def import_courtlistener_bulk(token_payload: dict = Depends(verify_token)):
+    """
+    Importar los volcados nuevos o modificados de COURTLISTENER_BULK_DIR
+    """
+    return {
+        "results": await asyncio.to_thread(courtlistener_mirror.import_dir),
+        **await asyncio.to_thread(courtlistener_mirror.get_stats),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/dashboard-hub")
+async def get_dashboard_hub_stats(token_payload: dict = Depends(verify_token)):
+    """
+    Métricas del hub de WebSockets: clientes, profundidad de colas, descartes, coalescencias y envíos lentos
+    """
+    return {
+        **dashboard_hub.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/investigation-jobs")
+async def get_investigation_jobs_stats(token_payload: dict = Depends(verify_token)):
+    """
+    Cola de investigaciones: trabajos por estado y prioridad, workers con señal de vida (aviso si hay
+    trabajos en cola sin ninguno) y actividad del worker de este proceso
+    """
+    return {
+        **await asyncio.to_thread(investigation_store.get_stats),
+        "worker": investigation_worker.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/feature-store")
+async def get_feature_store_stats(token_payload: dict = Depends(verify_token)):
+    """
+    Historial de solicitantes para las features de fraude: solicitantes, registros y compactaciones
+    """
+    return {
+        **await asyncio.to_thread(feature_store.get_stats),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/feature-store/{documento}")
+async def get_applicant_velocity(documento: str, token_payload: dict = Depends(verify_token)):
+    """
+    Velocidad actual de un solicitante por documento (sin registrar una solicitud)
+    """
+    velocity = await asyncio.to_thread(feature_store.lookup, documento, None)
+    if velocity is None:
+        raise HTTPException(status_code=404, detail="Solicitante sin historial")
+    return {
+        **velocity,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/keywords")
+async def get_keyword_lists(token_payload: dict = Depends(verify_token)):
+    """
+    Listas de palabras clave por idioma (tamaño de cada lista) y estado de la recarga
+    """
+    return {
+        **keyword_registry.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/keywords/reload")
+async def reload_keyword_lists(token_payload: dict = Depends(verify_token)):
+    """
+    Releer el fichero de palabras clave sin esperar a la comprobación periódica
+    """
+    return {
+        **keyword_registry.reload(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/watchlists")
+async def get_watchlists_stats(token_payload: dict = Depends(verify_token)):
+    """
+    Listas de sanciones cargadas: entradas por lista, tamaño del índice y última recarga
+    """
+    return {
+        **watchlists.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.post("/watchlists/reload")
+async def reload_watchlists(token_payload: dict = Depends(verify_token)):
+    """
+    Reconstruir el índice de sanciones desde el directorio de datos sin esperar a la comprobación periódica
+    """
+    return {
+        **await asyncio.to_thread(watchlists.reload, True),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/state-backend")
+async def get_state_backend_stats(token_payload: dict = Depends(verify_token)):
     """
-    Trigger para re-entrenar modelos
+    Backend de estado compartido: tipo, ruta y entradas por namespace
     """
     return {
-        "status": "training_initiated",
-        "message": "El re-entrenamiento de modelos ha sido iniciado",
-        "estimated_time": "15 minutes",
-        "models": ["fraud_detection", "risk_score"],
+        **state_backend.get_stats(),
         "timestamp": datetime.now().isoformat()
     }
 
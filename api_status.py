@@ -13,6 +13,11 @@ import json
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from http_clients import get_http_client
+from circuit_breaker import classify_status_code, breaker_name
+from provider_health import provider_health
+from state_backend import StateCache
+from urllib.parse import urlparse
 
 load_dotenv()
 
@@ -23,9 +28,11 @@ APIS_CONFIG = {
     "serpapi": {
         "name": "SerpAPI",
         "description": "Búsquedas web y redes sociales", 
-        "url": "https://serpapi.com/search.json",
+        # Sonda: account.json no consume búsquedas del plan
+        "url": "https://serpapi.com/account.json",
+        "provider": "serpapi",
         "method": "GET",
-        "params": {"engine": "google", "q": "test", "api_key": os.getenv("SERPAPI_KEY")},
+        "params": {"api_key": os.getenv("SERPAPI_KEY")},
         "headers": {},
         "timeout": 10,
         "expected_status": 200,
@@ -34,9 +41,11 @@ APIS_CONFIG = {
     "courtlistener": {
         "name": "CourtListener",
         "description": "Casos legales y jurisprudencia",
-        "url": "https://www.courtlistener.com/api/rest/v3/search/",
+        # Sonda: raíz de la API en lugar de una búsqueda
+        "url": "https://www.courtlistener.com/api/rest/v3/",
+        "provider": "courtlistener",
         "method": "GET", 
-        "params": {"q": "test", "format": "json"},
+        "params": {"format": "json"},
         "headers": {
             "Authorization": f"Token {os.getenv('COURTLISTENER_TOKEN')}",
             "User-Agent": os.getenv("COURTLISTENER_UA", "Tavix/1.0 (ceo@tavit.com)")
@@ -49,6 +58,7 @@ APIS_CONFIG = {
         "name": "OpenAI GPT-4",
         "description": "Análisis de inteligencia artificial",
         "url": "https://api.openai.com/v1/models",
+        "provider": "openai",
         "method": "GET",
         "params": {},
         "headers": {
@@ -76,8 +86,10 @@ APIS_CONFIG = {
     "twitter_api": {
         "name": "Twitter/X API",
         "description": "Monitoreo redes sociales",
-        "url": "https://api.twitter.com/2/users/by/username/twitter",
-        "method": "GET",
+        # Sonda: especificación OpenAPI pública (sin consumir lecturas del plan)
+        "url": "https://api.twitter.com/2/openapi.json",
+        "provider": "twitter",
+        "method": "HEAD",
         "params": {},
         "headers": {
             "Authorization": f"Bearer {os.getenv('TWITTER_BEARER_TOKEN', '')}"
@@ -89,7 +101,9 @@ APIS_CONFIG = {
     "github_api": {
         "name": "GitHub API",
         "description": "Perfiles y repositorios",
-        "url": "https://api.github.com/user",
+        # Sonda: /rate_limit no descuenta cuota
+        "url": "https://api.github.com/rate_limit",
+        "provider": "github",
         "method": "GET",
         "params": {},
         "headers": {
@@ -104,6 +118,7 @@ APIS_CONFIG = {
         "name": "Reddit API",
         "description": "Foros y discusiones",
         "url": "https://www.reddit.com/api/v1/me",
+        "provider": "reddit",
         "method": "GET",
         "params": {},
         "headers": {
@@ -118,7 +133,7 @@ APIS_CONFIG = {
         "name": "VINELink",
         "description": "Notificaciones prisión",
         "url": "https://www.vinelink.com/vinelink/servlet",
-        "method": "GET",
+        "method": "HEAD",
         "params": {},
         "headers": {"User-Agent": "TAVIX-Platform/1.0"},
         "timeout": 15,
@@ -129,7 +144,7 @@ APIS_CONFIG = {
         "name": "PACER",
         "description": "Casos federales",
         "url": "https://pcl.uscourts.gov/search",
-        "method": "GET",
+        "method": "HEAD",
         "params": {},
         "headers": {"User-Agent": "TAVIX-Platform/1.0"},
         "timeout": 15,
@@ -138,23 +153,57 @@ APIS_CONFIG = {
     }
 }
 
-# Cache de estado de APIs
-api_status_cache = {}
-last_check_time = 0
+# Cache de estado de APIs (calculado una sola vez y compartido por endpoints, WebSockets
+# y, con STATE_BACKEND=sqlite, por todos los workers)
+API_STATUS_REFRESH_SECONDS = 30
+api_status_cache = StateCache("api_status", max_entries=1, default_ttl=API_STATUS_REFRESH_SECONDS)
+_refresh_task: Optional[asyncio.Task] = None
+
+def health_name(config: Dict) -> str:
+    """Nombre del proveedor en el registro de salud (el mismo que su circuit breaker)"""
+    return breaker_name(config.get("provider", "default"), urlparse(config["url"]).hostname)
+
+def passive_api_status(config: Dict) -> Optional[Dict]:
+    """Estado derivado del tráfico real reciente; None si el proveedor no tiene tráfico reciente"""
+    name = health_name(config)
+    if not provider_health.is_fresh(name):
+        return None
+    
+    health = provider_health.get(name)
+    return {
+        "name": config["name"],
+        "description": config["description"],
+        "status": health["status"],
+        "status_code": health["status_code"],
+        "response_time": health["response_time"],
+        "error_rate": health["error_rate"],
+        "last_check": health["last_check"],
+        "category": config["category"],
+        "source": health["source"],
+        "error": health["error"]
+    }
 
-async def check_api_status(api_name: str, config: Dict) -> Dict:
-    """Verifica el estado de una API específica"""
+async def check_api_status(api_name: str, config: Dict, force_probe: bool = False) -> Dict:
+    """
+    Verifica el estado de una API específica. Si hubo tráfico real reciente se usa
+    el registro de salud pasiva; si no, se lanza una sonda ligera (HEAD o endpoint gratuito).
+    """
     start_time = time.time()
     
+    if config["method"] != "INTERNAL" and not force_probe:
+        passive = passive_api_status(config)
+        if passive is not None:
+            return passive
+    
     try:
         # APIs internas (CatBoost)
         if config["method"] == "INTERNAL":
             if "fraud" in api_name:
                 from model_utils import ml_models
-                status = "active" if hasattr(ml_models, 'fraud_model') else "inactive"
+                status = "active" if ml_models.model_status("fraud") != "missing" else "inactive"
             elif "risk" in api_name:
                 from model_utils import ml_models  
-                status = "active" if hasattr(ml_models, 'risk_model') else "inactive"
+                status = "active" if ml_models.model_status("risk") != "missing" else "inactive"
             else:
                 status = "active"
                 
@@ -165,35 +214,37 @@ async def check_api_status(api_name: str, config: Dict) -> Dict:
                 "response_time": round((time.time() - start_time) * 1000, 2),
                 "last_check": datetime.now().isoformat(),
                 "category": config["category"],
+                "source": "internal",
                 "error": None
             }
         
         # APIs externas
-        async with httpx.AsyncClient(timeout=httpx.Timeout(config["timeout"])) as client:
-            if config["method"] == "GET":
-                response = await client.get(
-                    config["url"],
-                    params=config["params"],
-                    headers=config["headers"]
-                )
-            elif config["method"] == "POST":
-                response = await client.post(
-                    config["url"],
-                    json=config.get("data", {}),
-                    headers=config["headers"]
-                )
-            else:
-                raise ValueError(f"Método HTTP no soportado: {config['method']}")
+        # La sonda también pasa por el transporte, que la registra como "probe"
+        client = get_http_client(config.get("provider", "default"))
+        if config["method"] in ("GET", "HEAD"):
+            response = await client.request(
+                config["method"],
+                config["url"],
+                params=config["params"],
+                headers=config["headers"],
+                timeout=config["timeout"],
+                extensions={"health_probe": True, "expected_status": config["expected_status"]}
+            )
+        elif config["method"] == "POST":
+            response = await client.post(
+                config["url"],
+                json=config.get("data", {}),
+                headers=config["headers"],
+                timeout=config["timeout"],
+                extensions={"health_probe": True, "expected_status": config["expected_status"]}
+            )
+        else:
+            raise ValueError(f"Método HTTP no soportado: {config['method']}")
         
         response_time = round((time.time() - start_time) * 1000, 2)
         
-        # Determinar estado basado en código de respuesta
-        if response.status_code == config["expected_status"]:
-            status = "active"
-        elif response.status_code in [429, 503, 504]:
-            status = "maintenance" 
-        else:
-            status = "inactive"
+        # Determinar estado basado en código de respuesta (la misma clasificación que el tráfico real)
+        status = classify_status_code(response.status_code, config["expected_status"])
             
         return {
             "name": config["name"],
@@ -203,6 +254,7 @@ async def check_api_status(api_name: str, config: Dict) -> Dict:
             "response_time": response_time,
             "last_check": datetime.now().isoformat(),
             "category": config["category"],
+            "source": "probe",
             "error": None
         }
         
@@ -214,6 +266,7 @@ async def check_api_status(api_name: str, config: Dict) -> Dict:
             "response_time": round((time.time() - start_time) * 1000, 2),
             "last_check": datetime.now().isoformat(),
             "category": config["category"],
+            "source": "probe",
             "error": "Timeout"
         }
     except Exception as e:
@@ -224,18 +277,27 @@ async def check_api_status(api_name: str, config: Dict) -> Dict:
             "response_time": round((time.time() - start_time) * 1000, 2),
             "last_check": datetime.now().isoformat(),
             "category": config["category"],
+            "source": "probe",
             "error": str(e)[:100]
         }
 
 async def check_all_apis() -> Dict:
-    """Verifica el estado de todas las APIs en paralelo"""
-    global api_status_cache, last_check_time
+    """
+    Estado de todas las APIs, recalculado como mucho cada 30 segundos.
+    Las llamadas concurrentes (endpoints, cada cliente WebSocket) comparten un único cálculo.
+    """
+    global _refresh_task
     
-    # Cache por 30 segundos para evitar spam
-    current_time = time.time()
-    if current_time - last_check_time < 30 and api_status_cache:
-        return api_status_cache
+    cached = await api_status_cache.aget("snapshot")
+    if cached is not None:
+        return cached
     
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.ensure_future(_refresh_all_apis())
+    return await asyncio.shield(_refresh_task)
+
+async def _refresh_all_apis() -> Dict:
+    """Recalcular el estado de todas las APIs (tráfico reciente o sondas en paralelo)"""
     # Verificar todas las APIs en paralelo
     tasks = [
         check_api_status(api_name, config) 
@@ -248,6 +310,7 @@ async def check_all_apis() -> Dict:
     apis_status = {}
     categories_summary = {"osint": 0, "legal": 0, "ai": 0, "ml": 0, "social": 0}
     overall_health = {"active": 0, "maintenance": 0, "inactive": 0}
+    sources = {"traffic": 0, "probe": 0, "internal": 0}
     
     for result in results:
         if isinstance(result, Exception):
@@ -265,24 +328,30 @@ async def check_all_apis() -> Dict:
         status = result["status"]
         if status in overall_health:
             overall_health[status] += 1
+        
+        # Origen del estado: tráfico real, sonda o modelo interno
+        source = result.get("source")
+        if source in sources:
+            sources[source] += 1
     
     # Calcular métricas generales
     total_apis = len(results)
     health_percentage = round((overall_health["active"] / total_apis) * 100, 1) if total_apis > 0 else 0
     
-    api_status_cache = {
+    snapshot = {
         "apis": apis_status,
         "summary": {
             "total_apis": total_apis,
             "health_percentage": health_percentage,
             "categories": categories_summary,
-            "status_breakdown": overall_health
+            "status_breakdown": overall_health,
+            "sources": sources
         },
         "last_updated": datetime.now().isoformat()
     }
     
-    last_check_time = current_time
-    return api_status_cache
+    await api_status_cache.aset("snapshot", snapshot)
+    return snapshot
 
 @router.get("/api-status")
 async def get_api_status():
@@ -346,11 +415,8 @@ async def refresh_api_status():
     Fuerza una actualización del estado de todas las APIs
     """
     try:
-        global api_status_cache, last_check_time
-        
         # Limpiar cache para forzar actualización
-        api_status_cache = {}
-        last_check_time = 0
+        await api_status_cache.aclear()
         
         status_data = await check_all_apis()
         
@@ -6,11 +6,11 @@ Integración con EarthCam, Windy Webcams, TrafficLand y otros proveedores
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
 from typing import Dict, List, Any, Optional
-import httpx
 import asyncio
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from http_clients import get_http_client
 
 load_dotenv()
 
@@ -42,18 +42,8 @@ cache_timeout = 300  # 5 minutos
 class CameraManager:
     """Gestor de cámaras públicas con múltiples proveedores"""
     
-    def __init__(self):
-        self.session = None
-    
     async def get_session(self):
-        if self.session is None:
-            self.session = httpx.AsyncClient()
-        return self.session
-    
-    async def close_session(self):
-        if self.session:
-            await self.session.aclose()
-            self.session = None
+        return get_http_client("default")
 
     async def get_windy_cameras(self, filters: Optional[Dict] = None) -> List[Dict]:
         """Obtiene cámaras de Windy Webcams API v3"""
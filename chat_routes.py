@@ -11,6 +11,8 @@ import httpx
 import os
 from dotenv import load_dotenv
 from auth import verify_token
+from http_clients import get_http_client
+from state_backend import StateLists
 
 load_dotenv()
 
@@ -38,8 +40,8 @@ Características clave de TAVIT:
 
 Sé profesional, técnico pero accesible, y enfócate en el valor empresarial."""
 
-# Historial de conversaciones (en producción usar base de datos)
-CHAT_HISTORY = {}
+# Historial de conversaciones (compartido entre workers con STATE_BACKEND=sqlite)
+CHAT_HISTORY = StateLists("chat_history")
 
 class ChatMessage(BaseModel):
     role: str
@@ -76,12 +78,8 @@ async def chat_with_ai(request: ChatRequest):
         # Generar o recuperar conversation_id
         conversation_id = request.conversation_id or f"conv_{datetime.now().timestamp()}"
         
-        # Recuperar historial
-        if conversation_id not in CHAT_HISTORY:
-            CHAT_HISTORY[conversation_id] = []
-        
         # Agregar mensaje del usuario al historial
-        CHAT_HISTORY[conversation_id].append({
+        await CHAT_HISTORY.aappend(conversation_id, {
             "role": "user",
             "content": request.message
         })
@@ -89,7 +87,7 @@ async def chat_with_ai(request: ChatRequest):
         # Preparar mensajes para OpenAI
         messages = [
             {"role": "system", "content": CHAT_CONFIG["system_prompt"]}
-        ] + CHAT_HISTORY[conversation_id][-10:]  # Últimos 10 mensajes
+        ] + await CHAT_HISTORY.aget(conversation_id, limit=10)  # Últimos 10 mensajes
         
         # Llamar a OpenAI API
         headers = {
@@ -104,41 +102,42 @@ async def chat_with_ai(request: ChatRequest):
             "max_tokens": request.max_tokens
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                OPENAI_API_URL,
-                headers=headers,
-                json=payload
+        client = get_http_client("openai")
+        response = await client.post(
+            OPENAI_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Error de OpenAI API: {response.text}"
             )
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Error de OpenAI API: {response.text}"
-                )
-            
-            data = response.json()
-            
-            # Extraer respuesta
-            assistant_message = data["choices"][0]["message"]["content"]
-            
-            # Agregar respuesta al historial
-            CHAT_HISTORY[conversation_id].append({
-                "role": "assistant",
-                "content": assistant_message
-            })
-            
-            return {
-                "conversation_id": conversation_id,
-                "message": assistant_message,
-                "model_used": data["model"],
-                "tokens_used": {
-                    "prompt": data["usage"]["prompt_tokens"],
-                    "completion": data["usage"]["completion_tokens"],
-                    "total": data["usage"]["total_tokens"]
-                },
-                "timestamp": datetime.now().isoformat()
-            }
+        
+        data = response.json()
+        
+        # Extraer respuesta
+        assistant_message = data["choices"][0]["message"]["content"]
+        
+        # Agregar respuesta al historial
+        await CHAT_HISTORY.aappend(conversation_id, {
+            "role": "assistant",
+            "content": assistant_message
+        })
+        
+        return {
+            "conversation_id": conversation_id,
+            "message": assistant_message,
+            "model_used": data["model"],
+            "tokens_used": {
+                "prompt": data["usage"]["prompt_tokens"],
+                "completion": data["usage"]["completion_tokens"],
+                "total": data["usage"]["total_tokens"]
+            },
+            "timestamp": datetime.now().isoformat()
+        }
             
     except httpx.TimeoutException:
         raise HTTPException(
@@ -156,17 +155,12 @@ async def get_chat_history(conversation_id: str):
     """
     Obtener historial de una conversación
     """
-    if conversation_id not in CHAT_HISTORY:
-        return {
-            "conversation_id": conversation_id,
-            "messages": [],
-            "total_messages": 0
-        }
+    messages = await CHAT_HISTORY.aget(conversation_id)
     
     return {
         "conversation_id": conversation_id,
-        "messages": CHAT_HISTORY[conversation_id],
-        "total_messages": len(CHAT_HISTORY[conversation_id])
+        "messages": messages,
+        "total_messages": len(messages)
     }
 
 @router.delete("/chat/history/{conversation_id}")
@@ -174,8 +168,7 @@ async def clear_chat_history(conversation_id: str):
     """
     Limpiar historial de una conversación
     """
-    if conversation_id in CHAT_HISTORY:
-        del CHAT_HISTORY[conversation_id]
+    await CHAT_HISTORY.adelete(conversation_id)
     
     return {
         "message": "Historial eliminado",
@@ -235,25 +228,26 @@ async def test_chat_connection(token_payload: dict = Depends(verify_token)):
             "max_tokens": 10
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                OPENAI_API_URL,
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                return {
-                    "status": "success",
-                    "message": "Conexión con OpenAI exitosa",
-                    "api_responsive": True
-                }
-            else:
-                return {
-                    "status": "error",
-                    "message": f"Error: {response.status_code}",
-                    "api_responsive": False
-                }
+        client = get_http_client("openai")
+        response = await client.post(
+            OPENAI_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=30.0
+        )
+        
+        if response.status_code == 200:
+            return {
+                "status": "success",
+                "message": "Conexión con OpenAI exitosa",
+                "api_responsive": True
+            }
+        else:
+            return {
+                "status": "error",
+                "message": f"Error: {response.status_code}",
+                "api_responsive": False
+            }
                 
     except Exception as e:
         return {
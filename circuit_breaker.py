@@ -0,0 +1,254 @@
+"""
+TAVIT Platform v3.1 - Circuit Breakers por Proveedor
+Corte rápido de llamadas a proveedores caídos y timeouts adaptativos derivados
+de la latencia p99 observada; se aplica como transporte httpx
+"""
+
+from collections import deque
+from typing import Any, Dict, Optional
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+from rate_limiter import RateLimitExceeded
+from provider_health import provider_health
+
+load_dotenv()
+
+# Configuración de los circuit breakers
+CIRCUIT_BREAKER_CONFIG = {
+    # Fallos consecutivos que abren el circuito
+    "failure_threshold": int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5")),
+    # Tiempo en abierto antes de dejar pasar una llamada de prueba (segundos)
+    "open_seconds": float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+    # Llamadas de prueba simultáneas en semi-abierto
+    "half_open_max_calls": 1,
+    # Timeout adaptativo: p99 de las últimas latencias por un margen, acotado
+    "latency_window": int(os.getenv("CIRCUIT_LATENCY_WINDOW", "200")),
+    "min_samples": int(os.getenv("CIRCUIT_MIN_SAMPLES", "20")),
+    "timeout_multiplier": float(os.getenv("CIRCUIT_TIMEOUT_MULTIPLIER", "2.0")),
+    "min_timeout": float(os.getenv("CIRCUIT_MIN_TIMEOUT", "2.0")),
+    # Circuitos en memoria: el cliente "default" crea uno por host (URLs de cámaras, etc.)
+    "max_breakers": int(os.getenv("CIRCUIT_MAX_BREAKERS", "256"))
+}
+
+def classify_status_code(status_code: int, expected_status: Optional[int] = None) -> str:
+    """
+    Estado de un proveedor según el código HTTP (tráfico real, sondas y circuitos):
+    active, maintenance o inactive. En el tráfico real los errores de la petición (404, 422...)
+    no lo degradan; las credenciales rechazadas sí (no es utilizable). Una sonda indica su
+    expected_status: cualquier otra respuesta (URL movida o rota) deja al proveedor inactive.
+    """
+    if status_code == expected_status:
+        return "active"
+    if status_code in (429, 503, 504):
+        return "maintenance"
+    if expected_status is not None or status_code >= 500 or status_code in (401, 403):
+        return "inactive"
+    return "active"
+
+def is_provider_failure(status_code: int) -> bool:
+    """
+    Respuestas que indican un proveedor degradado (cuentan para abrir el circuito).
+    Los 4xx distintos de 429 son errores de la petición, no del proveedor.
+    """
+    return status_code >= 500 or classify_status_code(status_code) == "maintenance"
+
+def breaker_name(provider: str, host: str) -> str:
+    """Nombre del circuito: el proveedor, o el host para el cliente "default" """
+    return provider if provider != "default" else host
+
+class CircuitOpenError(httpx.TransportError):
+    """El circuito del proveedor está abierto: la llamada se rechaza sin salir a la red"""
+
+class CircuitBreaker:
+    """Circuito closed -> open -> half_open por proveedor, con ventana de latencias"""
+
+    def __init__(self, name: str, config: Dict[str, Any] = CIRCUIT_BREAKER_CONFIG):
+        self.name = name
+        self.config = config
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.latencies = deque(maxlen=config["latency_window"])
+        self._p99: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"calls": 0, "failures": 0, "fast_failed": 0, "opened": 0, "adaptive_timeouts": 0}
+
+    def allow(self):
+        """Autorizar una llamada; lanza CircuitOpenError si el circuito está abierto"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.config["open_seconds"]:
+                self.stats["fast_failed"] += 1
+                raise CircuitOpenError(f"Circuito abierto para {self.name}: {self.last_error}")
+            self.state = "half_open"
+            self.half_open_calls = 0
+
+        if self.state == "half_open":
+            if self.half_open_calls >= self.config["half_open_max_calls"]:
+                self.stats["fast_failed"] += 1
+                raise CircuitOpenError(f"Circuito semi-abierto para {self.name}: prueba en curso")
+            self.half_open_calls += 1
+
+        self.stats["calls"] += 1
+
+    def release(self):
+        """Liberar el turno de prueba de una llamada que no llegó a completarse"""
+        if self.state == "half_open" and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        # El p99 se recalcula cada 10 muestras (ordenar la ventana en cada llamada no compensa)
+        if len(self.latencies) % 10 == 0 or self._p99 is None:
+            self._p99 = self._percentile(0.99)
+        self.consecutive_failures = 0
+        if self.state == "half_open":
+            self.state = "closed"
+
+    def record_failure(self, error: str):
+        self.stats["failures"] += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        if self.state == "half_open" or self.consecutive_failures >= self.config["failure_threshold"]:
+            if self.state != "open":
+                self.stats["opened"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def _percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def adaptive_timeout(self, ceiling: Optional[float]) -> Optional[float]:
+        """Timeout de lectura: p99 x margen, nunca mayor que el fijado por el llamador"""
+        if self._p99 is None or len(self.latencies) < self.config["min_samples"]:
+            return ceiling
+        timeout = max(self.config["min_timeout"], self._p99 * self.config["timeout_multiplier"])
+        return timeout if ceiling is None else min(ceiling, timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        p50 = self._percentile(0.5)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "samples": len(self.latencies),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p99_ms": round(self._p99 * 1000, 1) if self._p99 is not None else None,
+            "adaptive_timeout_s": round(self.adaptive_timeout(None), 2) if self._p99 is not None else None,
+            **self.stats
+        }
+
+class CircuitBreakerRegistry:
+    """
+    Un circuit breaker por proveedor (o por host en el cliente "default"), acotado a
+    max_breakers: al crear uno nuevo se expulsa el menos usado recientemente, prefiriendo
+    los cerrados para no olvidar un host caído
+    """
+
+    def __init__(self, config: Dict[str, Any] = CIRCUIT_BREAKER_CONFIG):
+        self.config = config
+        # Orden de inserción = orden de uso (el más reciente al final)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self.stats = {"evicted": 0}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.pop(name, None)
+        if breaker is None:
+            self._evict(self.config["max_breakers"] - 1)
+            breaker = CircuitBreaker(name, self.config)
+        self._breakers[name] = breaker
+        return breaker
+
+    def _evict(self, limit: int):
+        while len(self._breakers) > max(limit, 0):
+            name = next((name for name, breaker in self._breakers.items() if breaker.state == "closed"),
+                        next(iter(self._breakers)))
+            del self._breakers[name]
+            provider_health.forget(name)
+            self.stats["evicted"] += 1
+
+    def state(self, name: str) -> str:
+        breaker = self._breakers.get(name)
+        return breaker.state if breaker is not None else "closed"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "config": self.config,
+            **self.stats,
+            "breakers": {name: breaker.get_stats() for name, breaker in self._breakers.items()}
+        }
+
+# Instancia global de circuit breakers
+circuit_breakers = CircuitBreakerRegistry()
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte httpx que corta las llamadas a proveedores caídos y ajusta el timeout
+    de lectura a la latencia observada. Va por fuera del limitador de tasa para que un
+    circuito abierto falle sin esperar token; la espera del limitador no cuenta como latencia.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, provider: str,
+                 registry: CircuitBreakerRegistry = circuit_breakers):
+        self.transport = transport
+        self.provider = provider
+        self.registry = registry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        name = breaker_name(self.provider, request.url.host)
+        breaker = self.registry.get(name)
+        breaker.allow()
+
+        timeouts = dict(request.extensions.get("timeout", {}))
+        read_timeout = breaker.adaptive_timeout(timeouts.get("read"))
+        if read_timeout != timeouts.get("read"):
+            breaker.stats["adaptive_timeouts"] += 1
+            request.extensions["timeout"] = {**timeouts, "read": read_timeout}
+
+        started = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except RateLimitExceeded:
+            # Los rechazos del limitador de tasa no dicen nada sobre la salud del proveedor
+            breaker.release()
+            raise
+        except httpx.TransportError as e:
+            error = "Timeout" if isinstance(e, httpx.TimeoutException) else f"{type(e).__name__}: {str(e)[:100]}"
+            breaker.record_failure(error)
+            provider_health.record(name, "inactive", self._elapsed_ms(request, started),
+                                   error=error, source=self._source(request))
+            raise
+        except BaseException:
+            # Cancelación u otro error local: la llamada de prueba queda libre
+            breaker.release()
+            raise
+
+        latency_ms = self._elapsed_ms(request, started)
+        if is_provider_failure(response.status_code):
+            breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            breaker.record_success(latency_ms / 1000)
+
+        # El mismo resultado alimenta la salud pasiva del proveedor (provider_health); una sonda
+        # se clasifica con su expected_status, igual que en api_status
+        status = classify_status_code(response.status_code, request.extensions.get("expected_status"))
+        provider_health.record(name, status, latency_ms,
+                               status_code=response.status_code, source=self._source(request))
+        return response
+
+    @staticmethod
+    def _elapsed_ms(request: httpx.Request, started: float) -> float:
+        """Latencia del proveedor en ms, sin la espera del limitador de tasa"""
+        return (time.monotonic() - started - request.extensions.get("rate_limit_wait", 0.0)) * 1000
+
+    @staticmethod
+    def _source(request: httpx.Request) -> str:
+        return "probe" if request.extensions.get("health_probe") else "traffic"
+
+    async def aclose(self):
+        await self.transport.aclose()
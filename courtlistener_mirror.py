@@ -0,0 +1,329 @@
+"""
+TAVIT Platform v3.1 - Espejo Local de CourtListener
+Importador de los volcados masivos de CourtListener (dockets y courts, CSV con o sin
+compresión bz2/gz) a un índice SQLite FTS5 de nombres de caso, partes, cortes y números
+de expediente. Importación incremental: los ficheros ya importados se omiten y cada
+expediente se actualiza solo si su date_modified es más reciente
+
+Uso: python courtlistener_mirror.py [ficheros...]   (sin argumentos importa COURTLISTENER_BULK_DIR)
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+import bz2
+import csv
+import gzip
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración del espejo local
+COURTLISTENER_MIRROR_CONFIG = {
+    "db_path": os.getenv("COURTLISTENER_MIRROR_DB", "cache/courtlistener.sqlite3"),
+    "bulk_dir": os.getenv("COURTLISTENER_BULK_DIR", "data/courtlistener"),
+    # local_first: espejo y API solo para lo posterior al volcado; local_only: nunca API; api: sin espejo
+    "mode": os.getenv("COURTLISTENER_MIRROR_MODE", "local_first"),
+    # Con un volcado más antiguo que esto se consulta la API para las presentaciones recientes (días)
+    "max_staleness_days": int(os.getenv("COURTLISTENER_MAX_STALENESS_DAYS", "7")),
+    # Tiempo máximo para esas presentaciones recientes: si vence se responde solo con el espejo
+    "recent_timeout": float(os.getenv("COURTLISTENER_RECENT_TIMEOUT", "3")),
+    # Tipos de búsqueda de CourtListener que cubre el espejo: los volcados de dockets son "r" (RECAP)
+    "case_types": ["r"],
+    "batch_size": 5000
+}
+
+_PARTIES_SPLIT = re.compile(r"\s+(?:v\.?|vs\.?)\s+", re.IGNORECASE)
+
+csv.field_size_limit(sys.maxsize)
+
+def split_parties(case_name: str) -> str:
+    """ "Smith v. Acme Corp." -> "Smith | Acme Corp." """
+    return " | ".join(part.strip() for part in _PARTIES_SPLIT.split(case_name or "") if part.strip())
+
+def fts_query(text: str) -> Optional[str]:
+    """Frase FTS5 con los términos del texto (sin operadores del usuario)"""
+    terms = re.findall(r"\w+", text)
+    return '"' + " ".join(terms) + '"' if terms else None
+
+def open_bulk_file(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace", newline="")
+    return open(path, "r", encoding="utf-8", errors="replace", newline="")
+
+def read_bulk_rows(path: str) -> Iterator[Dict[str, str]]:
+    with open_bulk_file(path) as f:
+        for row in csv.DictReader(f):
+            yield row
+
+class CourtListenerMirror:
+    """Índice local de expedientes: importación por lotes y búsqueda de texto completo"""
+
+    def __init__(self, config: Dict[str, Any] = COURTLISTENER_MIRROR_CONFIG):
+        self.config = config
+        self.db_path = config["db_path"]
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._import_lock = threading.Lock()
+        self.stats = {"searches": 0, "hits": 0, "search_ms_total": 0.0, "api_fallbacks": 0, "imports": 0}
+
+    def _open(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cases (
+                id INTEGER PRIMARY KEY,
+                case_name TEXT NOT NULL,
+                parties TEXT NOT NULL,
+                docket_number TEXT,
+                court_id TEXT,
+                date_filed TEXT,
+                date_modified TEXT,
+                slug TEXT
+            );
+            CREATE INDEX IF NOT EXISTS cases_date_filed ON cases (date_filed);
+            CREATE TABLE IF NOT EXISTS courts (id TEXT PRIMARY KEY, name TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS imported_files (
+                name TEXT PRIMARY KEY, size INTEGER, mtime REAL, rows INTEGER, imported_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE VIRTUAL TABLE IF NOT EXISTS cases_fts USING fts5(
+                case_name, parties, docket_number, court, tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = self._open()
+        return self._conn
+
+    def _meta(self, conn: sqlite3.Connection) -> Dict[str, str]:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    # Importación
+
+    def _import_courts(self, conn: sqlite3.Connection, rows: Iterator[Dict[str, str]]) -> int:
+        count = 0
+        for row in rows:
+            name = row.get("full_name") or row.get("short_name") or row.get("id")
+            conn.execute("INSERT OR REPLACE INTO courts (id, name) VALUES (?, ?)", (row.get("id"), name))
+            count += 1
+        return count
+
+    def _flush_dockets(self, conn: sqlite3.Connection, batch: List[tuple]):
+        conn.executemany("""
+            INSERT INTO cases (id, case_name, parties, docket_number, court_id, date_filed, date_modified, slug)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                case_name = excluded.case_name, parties = excluded.parties,
+                docket_number = excluded.docket_number, court_id = excluded.court_id,
+                date_filed = excluded.date_filed, date_modified = excluded.date_modified, slug = excluded.slug
+            WHERE excluded.date_modified >= COALESCE(cases.date_modified, '')
+        """, batch)
+
+        # Reindexar el lote (un expediente no modificado se reindexa con los mismos valores)
+        ids = [(row[0],) for row in batch]
+        conn.executemany("DELETE FROM cases_fts WHERE rowid = ?", ids)
+        conn.executemany("""
+            INSERT INTO cases_fts (rowid, case_name, parties, docket_number, court)
+            SELECT cases.id, cases.case_name, cases.parties, cases.docket_number,
+                   COALESCE(courts.name, cases.court_id)
+            FROM cases LEFT JOIN courts ON courts.id = cases.court_id
+            WHERE cases.id = ?
+        """, ids)
+
+    def _import_dockets(self, conn: sqlite3.Connection, rows: Iterator[Dict[str, str]]) -> Dict[str, Any]:
+        count = 0
+        latest = ""
+        batch: List[tuple] = []
+        for row in rows:
+            case_name = row.get("case_name") or row.get("case_name_full") or row.get("case_name_short") or ""
+            if not row.get("id") or not case_name:
+                continue
+            modified = (row.get("date_modified") or "")[:19]
+            batch.append((
+                int(row["id"]), case_name, split_parties(case_name), row.get("docket_number"),
+                row.get("court_id"), (row.get("date_filed") or "")[:10] or None, modified, row.get("slug")
+            ))
+            latest = max(latest, modified[:10])
+            count += 1
+            if len(batch) >= self.config["batch_size"]:
+                self._flush_dockets(conn, batch)
+                batch = []
+        if batch:
+            self._flush_dockets(conn, batch)
+        return {"rows": count, "latest": latest}
+
+    def import_file(self, path: str, force: bool = False) -> Dict[str, Any]:
+        """Importar un fichero del volcado (dockets o courts); los ya importados sin cambios se omiten"""
+        name = os.path.basename(path)
+        size, mtime = os.path.getsize(path), os.path.getmtime(path)
+
+        with self._import_lock:
+            conn = self._open()
+            try:
+                previous = conn.execute("SELECT size, mtime FROM imported_files WHERE name = ?", (name,)).fetchone()
+                if previous == (size, mtime) and not force:
+                    return {"file": name, "status": "skipped"}
+
+                started = time.perf_counter()
+                rows = read_bulk_rows(path)
+                first = next(rows, None)
+                if first is None:
+                    return {"file": name, "status": "empty"}
+                columns = set(first)
+
+                def all_rows():
+                    yield first
+                    yield from rows
+
+                with conn:
+                    if {"docket_number", "court_id", "case_name"} <= columns:
+                        result = self._import_dockets(conn, all_rows())
+                        meta = self._meta(conn)
+                        if result["latest"] > meta.get("coverage_date", ""):
+                            conn.execute("INSERT OR REPLACE INTO meta VALUES ('coverage_date', ?)", (result["latest"],))
+                        kind, count = "dockets", result["rows"]
+                    elif {"id", "full_name"} <= columns:
+                        kind, count = "courts", self._import_courts(conn, all_rows())
+                    else:
+                        return {"file": name, "status": "unsupported", "columns": sorted(columns)[:20]}
+
+                    total = conn.execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('cases', ?)", (str(total),))
+                    conn.execute(
+                        "INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?, ?, ?)",
+                        (name, size, mtime, count, time.time())
+                    )
+            finally:
+                conn.close()
+
+        self.stats["imports"] += 1
+        return {
+            "file": name,
+            "status": "imported",
+            "kind": kind,
+            "rows": count,
+            "elapsed_s": round(time.perf_counter() - started, 2)
+        }
+
+    def import_dir(self, directory: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Importar los ficheros nuevos o modificados del directorio (courts antes que dockets)"""
+        directory = directory or self.config["bulk_dir"]
+        if not os.path.isdir(directory):
+            return []
+        files = sorted(
+            (os.path.join(directory, name) for name in os.listdir(directory)
+             if name.endswith((".csv", ".csv.bz2", ".csv.gz"))),
+            key=lambda path: (not os.path.basename(path).startswith("courts"), path)
+        )
+        results = []
+        for path in files:
+            try:
+                results.append(self.import_file(path))
+            except Exception as e:
+                print(f"Error importando volcado de CourtListener {path}: {e}")
+                results.append({"file": os.path.basename(path), "status": "error", "error": str(e)})
+        return results
+
+    # Consulta
+
+    def search(self, query: str, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """
+        Expedientes que contienen el nombre (como frase) ordenados por fecha de presentación.
+        None si el espejo está vacío
+        """
+        started = time.perf_counter()
+        match = fts_query(query)
+        with self._lock:
+            conn = self._connect()
+            meta = self._meta(conn)
+            if not int(meta.get("cases", "0")) or match is None:
+                return None
+            total = conn.execute("SELECT COUNT(*) FROM cases_fts WHERE cases_fts MATCH ?", (match,)).fetchone()[0]
+            rows = conn.execute("""
+                SELECT cases.id, cases.case_name, cases.date_filed, COALESCE(courts.name, cases.court_id),
+                       cases.docket_number, cases.slug
+                FROM cases_fts
+                JOIN cases ON cases.id = cases_fts.rowid
+                LEFT JOIN courts ON courts.id = cases.court_id
+                WHERE cases_fts MATCH ?
+                ORDER BY cases.date_filed DESC
+                LIMIT ?
+            """, (match, limit)).fetchall()
+
+        self.stats["searches"] += 1
+        self.stats["hits"] += 1 if rows else 0
+        self.stats["search_ms_total"] += (time.perf_counter() - started) * 1000
+        return {
+            "total": total,
+            "coverage_date": meta.get("coverage_date"),
+            "items": [
+                {
+                    "case_name": case_name,
+                    "date_filed": date_filed,
+                    "court": court,
+                    "docket_number": docket_number,
+                    "url": f"https://www.courtlistener.com/docket/{case_id}/{slug}/" if slug else None,
+                    "source": "legal"
+                }
+                for case_id, case_name, date_filed, court, docket_number, slug in rows
+            ]
+        }
+
+    def loaded(self) -> bool:
+        """Si el espejo está en uso y tiene expedientes importados"""
+        if self.config["mode"] == "api":
+            return False
+        with self._lock:
+            return int(self._meta(self._connect()).get("cases", "0")) > 0
+
+    def covers(self, case_type: Optional[str]) -> bool:
+        """Si el espejo puede responder a una búsqueda de ese tipo (sin tipo: cualquier expediente)"""
+        return not case_type or case_type in self.config["case_types"]
+
+    def needs_recent(self, coverage_date: Optional[str]) -> bool:
+        """Si el volcado es antiguo hay que pedir a la API las presentaciones posteriores"""
+        if self.config["mode"] == "local_only":
+            return False
+        if not coverage_date:
+            return True
+        cutoff = date.today() - timedelta(days=self.config["max_staleness_days"])
+        return coverage_date < cutoff.isoformat()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            meta = self._meta(conn)
+            files = conn.execute("SELECT COUNT(*) FROM imported_files").fetchone()[0]
+        searches = self.stats["searches"]
+        return {
+            "db_path": self.db_path,
+            "mode": self.config["mode"],
+            "cases": int(meta.get("cases", "0")),
+            "coverage_date": meta.get("coverage_date"),
+            "imported_files": files,
+            "avg_search_ms": round(self.stats["search_ms_total"] / searches, 3) if searches else 0.0,
+            **self.stats
+        }
+
+# Instancia global del espejo de CourtListener
+courtlistener_mirror = CourtListenerMirror()
+
+if __name__ == "__main__":
+    paths = sys.argv[1:]
+    results = [courtlistener_mirror.import_file(path) for path in paths] if paths else courtlistener_mirror.import_dir()
+    for result in results:
+        print(result)
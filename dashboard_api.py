@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timedelta
+import asyncio
 import httpx
 import os
 import json
@@ -16,7 +17,8 @@ from dotenv import load_dotenv
 # Importar utilidades internas
 from auth import verify_token, authenticate_admin
 from model_utils import ml_models
-from notification_system import notification_manager
+from state_backend import StateMap, StateList
+from investigation_jobs import investigation_store, enqueue_investigation
 
 load_dotenv()
 
@@ -50,13 +52,13 @@ class MonitoringSetupRequest(BaseModel):
     frequency: str = Field(default="daily", description="Frecuencia: hourly, daily, weekly")
     alert_threshold: int = Field(default=5, description="Número de coincidencias para activar alerta")
 
-# Simulación de base de datos empresarial en memoria
+# Base de datos empresarial sobre el backend de estado (compartida entre workers con STATE_BACKEND=sqlite).
+# Los registros leídos son copias: tras modificarlos hay que volver a asignarlos.
 corporate_database = {
-    "companies": {},
-    "investigations": {},
-    "tracking_targets": {},
-    "monitors": {},
-    "alerts": []
+    "companies": StateMap("corporate_companies"),
+    "tracking_targets": StateMap("corporate_tracking_targets"),
+    "monitors": StateMap("corporate_monitors"),
+    "alerts": StateList("corporate_alerts", "alerts")
 }
 
 # Fuentes OSINT avanzadas
@@ -91,6 +93,18 @@ PREMIUM_SOURCES = {
     }
 }
 
+def expand_sources(requested: List[str]) -> List[str]:
+    """Fuentes concretas de una investigación: "all" o una categoría se expanden a sus fuentes"""
+    sources = []
+    for name in requested:
+        if name == "all":
+            sources.extend(source for category in PREMIUM_SOURCES.values() for source in category)
+        elif name in PREMIUM_SOURCES:
+            sources.extend(PREMIUM_SOURCES[name])
+        else:
+            sources.append(name)
+    return list(dict.fromkeys(sources))
+
 @router.post("/auth", summary="Autenticación corporativa")
 async def corporate_auth(request: CorporateAuthRequest):
     """
@@ -122,7 +136,6 @@ async def corporate_auth(request: CorporateAuthRequest):
 @router.post("/investigate", summary="Investigación multi-fuente completa")
 async def start_investigation(
     request: InvestigationRequest,
-    background_tasks: BackgroundTasks,
     current_user: dict = Depends(verify_token)
 ):
     """
@@ -130,32 +143,22 @@ async def start_investigation(
     """
     investigation_id = f"inv_{uuid.uuid4().hex[:12]}"
     
-    # Configurar búsqueda multi-fuente
-    sources_to_search = []
-    if "all" in request.sources:
-        sources_to_search = list(PREMIUM_SOURCES.keys())
-    else:
-        sources_to_search = request.sources
+    # Configurar búsqueda multi-fuente ("all", categorías o fuentes concretas)
+    sources_to_search = expand_sources(request.sources)
     
     investigation_data = {
         "id": investigation_id,
         "target_name": request.target_name,
         "target_id": request.target_id,
         "type": request.investigation_type,
-        "priority": request.priority,
         "sources": sources_to_search,
-        "status": "processing",
-        "created_at": datetime.now().isoformat(),
-        "estimated_completion": (datetime.now() + timedelta(minutes=15)).isoformat(),
-        "progress": 0,
-        "findings": [],
-        "ai_analysis": None
+        "company_context": request.company_context,
+        "requested_by": current_user.get("sub"),
+        "estimated_completion": (datetime.now() + timedelta(minutes=15)).isoformat()
     }
     
-    corporate_database["investigations"][investigation_id] = investigation_data
-    
-    # Iniciar procesamiento en background
-    background_tasks.add_task(process_investigation, investigation_id, request)
+    # Encolar: la procesan los workers de investigation_jobs, fuera del manejo de peticiones
+    await enqueue_investigation(investigation_data, request.priority)
     
     return {
         "investigation_id": investigation_id,
@@ -170,12 +173,29 @@ async def get_investigation_status(investigation_id: str):
     """
     Obtiene el estado actual de una investigación en curso
     """
-    if investigation_id not in corporate_database["investigations"]:
+    investigation = await asyncio.to_thread(investigation_store.get_job, investigation_id)
+    if investigation is None:
         raise HTTPException(status_code=404, detail="Investigación no encontrada")
     
-    investigation = corporate_database["investigations"][investigation_id]
     return investigation
 
+@router.post("/investigation/{investigation_id}/cancel", summary="Cancelar investigación")
+async def cancel_investigation(
+    investigation_id: str,
+    current_user: dict = Depends(verify_token)
+):
+    """
+    Cancela una investigación en cola o en curso (las fuentes ya consultadas se conservan)
+    """
+    status = await asyncio.to_thread(investigation_store.request_cancel, investigation_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Investigación no encontrada")
+    
+    return {
+        "investigation_id": investigation_id,
+        "status": status
+    }
+
 @router.get("/cases", summary="Lista de casos activos")
 async def get_active_cases(
     status: Optional[str] = None,
@@ -185,19 +205,11 @@ async def get_active_cases(
     """
     Obtiene lista de casos/investigaciones activas
     """
-    cases = list(corporate_database["investigations"].values())
-    
-    # Filtros
-    if status:
-        cases = [c for c in cases if c["status"] == status]
-    if priority:
-        cases = [c for c in cases if c["priority"] == priority]
-    
-    # Limitar resultados
-    cases = cases[:limit]
+    cases = await asyncio.to_thread(investigation_store.list_jobs, status, priority, limit)
     
     return {
         "total_cases": len(cases),
+        "queued_investigations": len([c for c in cases if c["status"] == "queued"]),
         "active_investigations": len([c for c in cases if c["status"] == "processing"]),
         "completed_investigations": len([c for c in cases if c["status"] == "completed"]),
         "cases": cases
@@ -245,11 +257,10 @@ async def generate_detailed_report(case_id: str):
     """
     Genera reporte detallado con análisis de IA para un caso específico
     """
-    if case_id not in corporate_database["investigations"]:
+    investigation = await asyncio.to_thread(investigation_store.get_job, case_id)
+    if investigation is None:
         raise HTTPException(status_code=404, detail="Caso no encontrado")
     
-    investigation = corporate_database["investigations"][case_id]
-    
     # Generar reporte con IA (simulado)
     ai_report = {
         "executive_summary": f"Análisis completo de {investigation['target_name']} realizado mediante 25+ fuentes OSINT y modelos de IA CatBoost.",
@@ -341,7 +352,7 @@ async def get_system_alerts(
     """
     Obtiene alertas activas del sistema de monitoreo
     """
-    alerts = corporate_database["alerts"]
+    alerts = corporate_database["alerts"].values()
     
     if severity:
         alerts = [a for a in alerts if a.get("severity") == severity]
@@ -357,32 +368,11 @@ async def get_system_alerts(
     }
 
 # Funciones de procesamiento en background
-async def process_investigation(investigation_id: str, request: InvestigationRequest):
-    """
-    Procesa una investigación completa en background
-    """
-    investigation = corporate_database["investigations"][investigation_id]
-    
-    # Simular procesamiento gradual
-    for progress in range(0, 101, 20):
-        investigation["progress"] = progress
-        if progress == 100:
-            investigation["status"] = "completed"
-            investigation["ai_analysis"] = {
-                "risk_score": 65.3,
-                "fraud_probability": 18.7,
-                "confidence": 0.89,
-                "recommendation": "APPROVE_WITH_MONITORING"
-            }
-    
-    # Notificar completion
-    if notification_manager:
-        await notification_manager.send_completion_notification(investigation_id)
-
 async def start_person_monitoring(tracking_id: str):
     """
     Inicia monitoreo automático de una persona
     """
     tracking = corporate_database["tracking_targets"][tracking_id]
     tracking["status"] = "monitoring"
-    tracking["last_check"] = datetime.now().isoformat()
\ No newline at end of file
+    tracking["last_check"] = datetime.now().isoformat()
+    corporate_database["tracking_targets"][tracking_id] = tracking
\ No newline at end of file
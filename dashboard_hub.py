@@ -0,0 +1,262 @@
+"""
+TAVIT Platform v3.1 - Hub de WebSockets del Dashboard
+Un único productor de estado, colas de envío acotadas por cliente con políticas
+de descarte/coalescencia, mensajes serializados una sola vez y métricas de backpressure
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from fastapi import WebSocket
+from dotenv import load_dotenv
+from api_status import check_all_apis
+
+load_dotenv()
+
+# Configuración del hub
+DASHBOARD_HUB_CONFIG = {
+    # Mensajes pendientes por cliente antes de aplicar la política de descarte
+    "queue_size": int(os.getenv("DASHBOARD_QUEUE_SIZE", "64")),
+    # Un cliente que tarda más que esto en aceptar un mensaje se desconecta (segundos)
+    "send_timeout": float(os.getenv("DASHBOARD_SEND_TIMEOUT", "10")),
+    # Periodo del productor de estado de APIs (segundos)
+    "status_interval": float(os.getenv("DASHBOARD_STATUS_INTERVAL", "30")),
+    # dashboard_update se publica cada N ciclos del productor (60 s por defecto)
+    "dashboard_every": 2
+}
+
+# Políticas de encolado de offer/publish (nunca bloquean al productor):
+#   coalesce: un mensaje pendiente del mismo tema se reemplaza por el más reciente
+#   drop_oldest: con la cola llena se descarta el mensaje descartable más antiguo
+# Los mensajes dirigidos a un solo cliente van por DashboardClient.send, que espera hueco
+QUEUE_POLICIES = ["coalesce", "drop_oldest"]
+
+class DashboardClient:
+    """Sesión de un cliente: cola acotada y una tarea de envío propia"""
+
+    def __init__(self, websocket: WebSocket, hub: "DashboardHub"):
+        self.websocket = websocket
+        self.hub = hub
+        self.queue_size = hub.config["queue_size"]
+        self.send_timeout = hub.config["send_timeout"]
+        # Entradas [tema, payload, descartable]; mutables para coalescer en el sitio
+        self._queue: deque = deque()
+        self._slots: Dict[str, list] = {}
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self.closed = False
+        self.sender: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "dropped": 0, "coalesced": 0, "max_queue_depth": 0}
+
+    def start(self):
+        self.sender = asyncio.create_task(self._send_loop())
+
+    def offer(self, topic: str, payload: str, policy: str = "coalesce") -> bool:
+        """Encolar sin bloquear un mensaje ya serializado; False si se descartó"""
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Política de encolado desconocida: {policy}")
+        if self.closed:
+            return False
+
+        if policy == "coalesce":
+            entry = self._slots.get(topic)
+            if entry is not None:
+                entry[1] = payload
+                self.stats["coalesced"] += 1
+                self.hub.stats["coalesced"] += 1
+                return True
+
+        if len(self._queue) >= self.queue_size and not self._drop_oldest():
+            self.stats["dropped"] += 1
+            self.hub.stats["dropped"] += 1
+            return False
+
+        entry = [topic, payload, True]
+        self._queue.append(entry)
+        if policy == "coalesce":
+            self._slots[topic] = entry
+        self._enqueued()
+        return True
+
+    async def send(self, data: Dict[str, Any]):
+        """Mensaje dirigido a este cliente: nunca se descarta, espera hueco en la cola"""
+        payload = json.dumps(data, ensure_ascii=False)
+        while len(self._queue) >= self.queue_size and not self.closed:
+            self._space.clear()
+            await self._space.wait()
+        if self.closed:
+            raise ConnectionError("Cliente de dashboard desconectado")
+        self._queue.append(["direct", payload, False])
+        self._enqueued()
+
+    def _enqueued(self):
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._queue))
+        self._ready.set()
+
+    def _drop_oldest(self) -> bool:
+        for entry in self._queue:
+            if entry[2]:
+                self._queue.remove(entry)
+                if self._slots.get(entry[0]) is entry:
+                    del self._slots[entry[0]]
+                self.stats["dropped"] += 1
+                self.hub.stats["dropped"] += 1
+                return True
+        return False
+
+    async def _send_loop(self):
+        try:
+            # Además de cancelar la tarea, close() marca closed y despierta el bucle:
+            # en Python 3.11 wait_for puede absorber una cancelación que llega junto al envío
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+
+                entry = self._queue.popleft()
+                if self._slots.get(entry[0]) is entry:
+                    del self._slots[entry[0]]
+                self._space.set()
+
+                started = time.perf_counter()
+                await asyncio.wait_for(self.websocket.send_text(entry[1]), self.send_timeout)
+                self.hub.record_send(time.perf_counter() - started)
+                self.stats["sent"] += 1
+        except asyncio.TimeoutError:
+            # Cliente lento: se desconecta para no acumular memoria
+            self.hub.stats["slow_disconnects"] += 1
+            try:
+                await self.websocket.close(code=1008)
+            except Exception:
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        finally:
+            self.closed = True
+            self._space.set()
+
+    async def close(self):
+        self.closed = True
+        self._ready.set()
+        self._space.set()
+        if self.sender is not None and not self.sender.done():
+            self.sender.cancel()
+            try:
+                await self.sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+class DashboardHub:
+    """Pub/sub de los WebSockets del dashboard: un productor, fan-out concurrente por cliente"""
+
+    def __init__(self, config: Dict[str, Any] = DASHBOARD_HUB_CONFIG):
+        self.config = config
+        self.clients: Set[DashboardClient] = set()
+        self._producer: Optional[asyncio.Task] = None
+        self.last_messages: Dict[str, str] = {}
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "sent": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "slow_disconnects": 0,
+            "connections_total": 0,
+            "send_ms_total": 0.0,
+            "max_send_ms": 0.0
+        }
+
+    async def connect(self, websocket: WebSocket) -> DashboardClient:
+        """Aceptar la conexión y enviarle el último estado publicado"""
+        await websocket.accept()
+        client = DashboardClient(websocket, self)
+        self.clients.add(client)
+        self.stats["connections_total"] += 1
+        for topic, payload in self.last_messages.items():
+            client.offer(topic, payload)
+        client.start()
+        return client
+
+    async def disconnect(self, client: DashboardClient):
+        self.clients.discard(client)
+        await client.close()
+
+    def publish(self, topic: str, data: Dict[str, Any], policy: str = "coalesce") -> int:
+        """Serializar una vez y encolar en todos los clientes; devuelve a cuántos se encoló"""
+        payload = json.dumps(data, ensure_ascii=False)
+        self.stats["published"] += 1
+        if policy == "coalesce":
+            self.last_messages[topic] = payload
+
+        delivered = 0
+        for client in list(self.clients):
+            if client.closed:
+                self.clients.discard(client)
+                continue
+            if client.offer(topic, payload, policy):
+                delivered += 1
+        self.stats["delivered"] += delivered
+        return delivered
+
+    def record_send(self, seconds: float):
+        send_ms = seconds * 1000
+        self.stats["sent"] += 1
+        self.stats["send_ms_total"] += send_ms
+        self.stats["max_send_ms"] = max(self.stats["max_send_ms"], round(send_ms, 2))
+
+    async def _produce_status(self):
+        """Único productor: estado de APIs cada 30 s y actualización del dashboard cada 60 s"""
+        cycle = 0
+        while True:
+            try:
+                api_status = await check_all_apis()
+                timestamp = datetime.now().isoformat()
+                self.publish("api_status_update", {
+                    "type": "api_status_update",
+                    "data": api_status,
+                    "timestamp": timestamp
+                })
+                if cycle % self.config["dashboard_every"] == 0:
+                    self.publish("dashboard_update", {
+                        "type": "dashboard_update",
+                        "api_status": api_status,
+                        "timestamp": timestamp
+                    })
+            except Exception as e:
+                print(f"Error en actualización dashboard: {e}")
+
+            cycle += 1
+            await asyncio.sleep(self.config["status_interval"])
+
+    def start(self):
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._produce_status())
+
+    async def stop(self):
+        if self._producer is not None:
+            self._producer.cancel()
+            self._producer = None
+        for client in list(self.clients):
+            await self.disconnect(client)
+
+    def get_stats(self) -> Dict[str, Any]:
+        depths: List[int] = [len(client._queue) for client in self.clients]
+        sent = self.stats["sent"]
+        return {
+            "clients": len(self.clients),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "queue_size": self.config["queue_size"],
+            "avg_send_ms": round(self.stats["send_ms_total"] / sent, 3) if sent else 0.0,
+            **self.stats
+        }
+
+# Instancia global del hub del dashboard
+dashboard_hub = DashboardHub()
@@ -0,0 +1,184 @@
+"""
+TAVIT Platform v3.1 - Extractor de Entidades
+Patrones precompilados en un único escáner (una pasada por texto) con offsets,
+modo streaming por bloques para documentos grandes y pool de procesos para lotes
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import asyncio
+import multiprocessing
+import os
+import re
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración del extractor
+ENTITY_CONFIG = {
+    "processes": int(os.getenv("ENTITY_PROCESSES", str(max(1, (os.cpu_count() or 2) // 2)))),
+    # Lotes con más caracteres que esto se procesan en el pool de procesos
+    "process_threshold_chars": int(os.getenv("ENTITY_PROCESS_THRESHOLD_CHARS", "200000")),
+    "max_batch": int(os.getenv("ENTITY_MAX_BATCH", "1000")),
+    # Modo streaming: tamaño de bloque y solape entre bloques (entidad más larga esperada)
+    "stream_chunk_chars": int(os.getenv("ENTITY_STREAM_CHUNK_CHARS", "65536")),
+    "stream_overlap": 512,
+    # Máximo de valores distintos devueltos por tipo (None = sin límite)
+    "limits": {"names": 10}
+}
+
+_UPPER = "A-ZÁÉÍÓÚÜÑ"
+_LOWER = "a-záéíóúüñ"
+
+# Tipos de entidad en orden de preferencia: ante un solapamiento gana el primero
+# (un email no produce además una mención, una URL no produce nombres)
+ENTITY_PATTERNS = [
+    ("emails", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b"),
+    ("urls", r"https?://[^\s<>\"'()\[\]{}]+"),
+    ("phones", r"\+\d{1,3}(?:[\s.-]?\d{2,4}){2,4}\b|\b\d{3}-\d{3}-\d{4}\b|\(\d{3}\)\s*\d{3}-\d{4}\b"),
+    ("mentions", r"(?<![\w@])@\w+"),
+    ("hashtags", r"(?<![\w#])#\w+"),
+    ("names", rf"\b[{_UPPER}][{_LOWER}]+(?:[ \t]+[{_UPPER}][{_LOWER}]+)*\b")
+]
+
+ENTITY_TYPES = [entity_type for entity_type, _ in ENTITY_PATTERNS]
+
+# Un solo patrón con un grupo con nombre por tipo
+ENTITY_SCANNER = re.compile("|".join(f"(?P<{entity_type}>{pattern})" for entity_type, pattern in ENTITY_PATTERNS))
+
+_URL_TRAILING = ".,;:!?"
+
+def iter_spans(text: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+    """Entidades del texto en orden de aparición: {"type", "value", "start", "end"}"""
+    for match in ENTITY_SCANNER.finditer(text):
+        entity_type = match.lastgroup
+        value = match.group()
+        end = match.end()
+        if entity_type == "urls":
+            stripped = value.rstrip(_URL_TRAILING)
+            end -= len(value) - len(stripped)
+            value = stripped
+        yield {"type": entity_type, "value": value, "start": offset + match.start(), "end": offset + end}
+
+def iter_spans_stream(chunks: Iterable[str], overlap: int = ENTITY_CONFIG["stream_overlap"]
+                      ) -> Iterator[Dict[str, Any]]:
+    """
+    Escanear un documento por bloques sin cargarlo entero. Las entidades cerca del final de
+    un bloque se aplazan al siguiente (solape) para no cortarlas; los offsets son globales.
+    """
+    carry = ""
+    carry_offset = 0
+    for chunk in chunks:
+        buffer = carry + chunk
+        safe_end = len(buffer) - overlap
+        resume = 0
+        deferred: Optional[int] = None
+        for span in iter_spans(buffer):
+            if span["end"] > safe_end:
+                deferred = span["start"]
+                break
+            resume = span["end"]
+            span["start"] += carry_offset
+            span["end"] += carry_offset
+            yield span
+
+        # Reanudar tras la última entidad emitida: en la primera aplazada o al inicio
+        # de una palabra dentro del solape
+        if safe_end > resume:
+            space = buffer.find(" ", safe_end)
+            boundary = space + 1 if space != -1 else safe_end
+            resume = boundary if deferred is None else min(deferred, boundary)
+        carry = buffer[resume:]
+        carry_offset += resume
+
+    for span in iter_spans(carry, carry_offset):
+        yield span
+
+def chunk_text(text: str, size: int = ENTITY_CONFIG["stream_chunk_chars"]) -> Iterator[str]:
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def aggregate_spans(spans: Iterable[Dict[str, Any]], include_offsets: bool = False,
+                    limits: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    """Valores distintos por tipo en orden de primera aparición (y opcionalmente los offsets)"""
+    limits = ENTITY_CONFIG["limits"] if limits is None else limits
+    seen: Dict[str, Dict[str, None]] = {entity_type: {} for entity_type in ENTITY_TYPES}
+    offsets: List[Dict[str, Any]] = []
+    for span in spans:
+        seen[span["type"]].setdefault(span["value"], None)
+        if include_offsets:
+            offsets.append(span)
+
+    entities = {}
+    for entity_type, values in seen.items():
+        values = list(values)
+        limit = limits.get(entity_type)
+        entities[entity_type] = values[:limit] if limit else values
+
+    result = {"entities": entities}
+    if include_offsets:
+        result["spans"] = offsets
+    return result
+
+def extract(text: str, include_offsets: bool = False) -> Dict[str, Any]:
+    """Extraer entidades de un texto; los textos grandes se recorren en modo streaming"""
+    if len(text) > ENTITY_CONFIG["stream_chunk_chars"]:
+        spans = iter_spans_stream(chunk_text(text))
+    else:
+        spans = iter_spans(text)
+    return aggregate_spans(spans, include_offsets)
+
+def extract_many(texts: List[str], include_offsets: bool = False) -> List[Dict[str, Any]]:
+    return [extract(text, include_offsets) for text in texts]
+
+class EntityExtractor:
+    """Extracción individual en el proceso y lotes grandes en un pool de procesos"""
+
+    def __init__(self, config: Dict[str, Any] = ENTITY_CONFIG):
+        self.config = config
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {"texts": 0, "batches": 0, "process_batches": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.config["processes"],
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def extract(self, text: str, include_offsets: bool = False) -> Dict[str, Any]:
+        self.stats["texts"] += 1
+        return extract(text, include_offsets)
+
+    async def extract_batch(self, texts: List[str], include_offsets: bool = False) -> List[Dict[str, Any]]:
+        """Lotes pequeños en un hilo; los grandes repartidos entre los procesos del pool"""
+        self.stats["batches"] += 1
+        self.stats["texts"] += len(texts)
+        if sum(len(text) for text in texts) <= self.config["process_threshold_chars"]:
+            return await asyncio.to_thread(extract_many, texts, include_offsets)
+
+        self.stats["process_batches"] += 1
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        parts = max(1, min(self.config["processes"], len(texts)))
+        size = -(-len(texts) // parts)
+        futures = [
+            loop.run_in_executor(executor, extract_many, texts[start:start + size], include_offsets)
+            for start in range(0, len(texts), size)
+        ]
+        results: List[Dict[str, Any]] = []
+        for part in await asyncio.gather(*futures):
+            results.extend(part)
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"processes": self.config["processes"], "pool_started": self._executor is not None, **self.stats}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Instancia global del extractor de entidades
+entity_extractor = EntityExtractor()
@@ -0,0 +1,79 @@
+"""
+TAVIT Platform v3.1 - Construcción de Features
+Mapeo de solicitudes a features y construcción columnar de matrices para los modelos
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# Especificación de features: (columna del modelo, clave en el dict de entrada, valor por defecto)
+FeatureSpec = List[Tuple[str, str, float]]
+
+FRAUD_FEATURES: FeatureSpec = [
+    ('edad', 'edad', 35),
+    ('monto_solicitado', 'monto', 50000),
+    ('historial_años', 'historial_años', 5),
+    ('cambios_direccion', 'cambios_direccion', 1),
+    ('menciones_negativas', 'menciones_negativas', 0),
+    ('registros_judiciales', 'registros_judiciales', 0),
+    ('presencia_digital_score', 'presencia_digital', 50),
+    ('variacion_datos', 'variacion_datos', 0.1),
+    ('frecuencia_solicitudes', 'frecuencia_solicitudes', 1)
+]
+
+RISK_FEATURES: FeatureSpec = [
+    ('edad', 'edad', 35),
+    ('historial_credito_score', 'historial_credito_score', 650),
+    ('años_experiencia', 'años_experiencia', 5),
+    ('ingresos_anuales', 'ingresos_anuales', 50000),
+    ('deuda_ratio', 'deuda_ratio', 0.3),
+    ('tipo_poliza_score', 'tipo_poliza_score', 50),
+    ('ubicacion_risk_score', 'ubicacion_risk_score', 50),
+    ('osint_score', 'osint_score', 50)
+]
+
+# Mapeo de historial crediticio a score
+CREDIT_HISTORY_SCORES = {
+    "excelente": 800,
+    "bueno": 700,
+    "regular": 600,
+    "malo": 450,
+    None: 600
+}
+
+# Mapeo de tipo de póliza a score
+POLICY_TYPE_SCORES = {
+    "vida": 70,
+    "salud": 60,
+    "auto": 50,
+    "propiedad": 65,
+    "otro": 50
+}
+
+DEFAULT_ANNUAL_INCOME = 50000
+DEFAULT_OSINT_SCORE = 50
+
+def feature_names(spec: FeatureSpec) -> List[str]:
+    """Nombres de columnas en el orden esperado por el modelo"""
+    return [column for column, _, _ in spec]
+
+def build_feature_matrix(features_list: List[Dict[str, Any]], spec: FeatureSpec) -> np.ndarray:
+    """Construir en una pasada una matriz float32 preasignada (una fila por solicitud)"""
+    X = np.empty((len(features_list), len(spec)), dtype=np.float32)
+    for row, features in enumerate(features_list):
+        X[row] = [features.get(key, default) for _, key, default in spec]
+    return X
+
+def risk_features(request: Any, osint_score: Optional[int] = None) -> Dict[str, Any]:
+    """Mapear un RiskScoreRequest a las features del modelo de riesgo"""
+    tipo_poliza = (request.tipo_poliza or "").lower()
+    return {
+        "edad": request.edad,
+        "historial_credito_score": CREDIT_HISTORY_SCORES.get(request.historial_credito, 600),
+        "años_experiencia": max(0, request.edad - 25),
+        "ingresos_anuales": request.ingresos_anuales or DEFAULT_ANNUAL_INCOME,
+        "deuda_ratio": 0.3,
+        "tipo_poliza_score": POLICY_TYPE_SCORES.get(tipo_poliza, 50),
+        "ubicacion_risk_score": 50,
+        "osint_score": DEFAULT_OSINT_SCORE if osint_score is None else osint_score
+    }
@@ -0,0 +1,248 @@
+"""
+TAVIT Platform v3.1 - Feature Store de Solicitantes
+Historial de solicitudes por solicitante (documento o nombre normalizado) con contadores
+de ventana deslizante, valores distintos y varianza incremental; persistido en SQLite
+y compactado en background
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from keyword_matcher import fold
+
+load_dotenv()
+
+# Configuración del feature store
+FEATURE_STORE_CONFIG = {
+    "db_path": os.getenv("FEATURE_STORE_DB", "cache/feature_store.sqlite3"),
+    # Solicitantes sin actividad en este tiempo se eliminan al compactar (días)
+    "retention_days": int(os.getenv("FEATURE_STORE_RETENTION_DAYS", "365")),
+    "compact_seconds": float(os.getenv("FEATURE_STORE_COMPACT_SECONDS", "3600")),
+    # Valores distintos recordados por campo (direcciones, montos, nombres)
+    "max_distinct": 50,
+    # Historial mínimo para enviar historial_años al modelo (días)
+    "min_history_days": int(os.getenv("FEATURE_STORE_MIN_HISTORY_DAYS", "365"))
+}
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+def normalize_text(value: Optional[str]) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios colapsados"""
+    if not value:
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", " ", fold(value)).split())
+
+def applicant_key(documento: Optional[str], nombre: Optional[str]) -> str:
+    """Clave del solicitante: documento normalizado o, si falta, el nombre normalizado"""
+    document = re.sub(r"[^0-9A-Za-z]", "", documento or "").upper()
+    if document:
+        return f"doc:{document}"
+    return f"name:{normalize_text(nombre)}"
+
+def _bump(counter: Dict[str, Any], value: str, score: float, limit: int):
+    """Actualizar un mapa de valores distintos acotado (se descarta el de menor score)"""
+    counter[value] = score
+    if len(counter) > limit:
+        del counter[min(counter, key=counter.get)]
+
+def new_state(now: float) -> Dict[str, Any]:
+    return {
+        "first_seen": now,
+        "last_seen": now,
+        "count": 0,
+        "hourly": {},
+        "daily": {},
+        "addresses": {},
+        "amounts": {},
+        "names": {},
+        "amount_stats": {"n": 0, "mean": 0.0, "m2": 0.0}
+    }
+
+def apply_application(state: Dict[str, Any], now: float, nombre: Optional[str],
+                      ubicacion: Optional[str], monto: Optional[float], max_distinct: int):
+    """Registrar una solicitud en el estado: coste acotado e independiente del historial"""
+    state["count"] += 1
+    state["last_seen"] = now
+
+    # Buckets horarios (24 h) y diarios (30 d); los vencidos se podan al escribir
+    hour, day = str(int(now // HOUR)), str(int(now // DAY))
+    state["hourly"][hour] = state["hourly"].get(hour, 0) + 1
+    state["daily"][day] = state["daily"].get(day, 0) + 1
+    state["hourly"] = {k: v for k, v in state["hourly"].items() if int(k) > int(hour) - 24}
+    state["daily"] = {k: v for k, v in state["daily"].items() if int(k) > int(day) - 30}
+
+    address = normalize_text(ubicacion)
+    if address:
+        _bump(state["addresses"], address, now, max_distinct)
+    name = normalize_text(nombre)
+    if name:
+        _bump(state["names"], name, state["names"].get(name, 0) + 1, max_distinct)
+
+    if monto is not None:
+        _bump(state["amounts"], f"{monto:.2f}", state["amounts"].get(f"{monto:.2f}", 0) + 1, max_distinct)
+        # Media y varianza del monto con el algoritmo de Welford
+        stats = state["amount_stats"]
+        stats["n"] += 1
+        delta = monto - stats["mean"]
+        stats["mean"] += delta / stats["n"]
+        stats["m2"] += delta * (monto - stats["mean"])
+
+def velocity_snapshot(state: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Contadores de ventana y variación de datos a partir del estado"""
+    hour, day = int(now // HOUR), int(now // DAY)
+    stats = state["amount_stats"]
+    amount_std = math.sqrt(stats["m2"] / (stats["n"] - 1)) if stats["n"] > 1 else 0.0
+    amount_cv = amount_std / stats["mean"] if stats["mean"] else 0.0
+
+    return {
+        "applications_total": state["count"],
+        "applications_24h": sum(v for k, v in state["hourly"].items() if int(k) > hour - 24),
+        "applications_7d": sum(v for k, v in state["daily"].items() if int(k) > day - 7),
+        "applications_30d": sum(v for k, v in state["daily"].items() if int(k) > day - 30),
+        "distinct_addresses": len(state["addresses"]),
+        "distinct_amounts": len(state["amounts"]),
+        "distinct_names": len(state["names"]),
+        "amount_mean": round(stats["mean"], 2),
+        "amount_std": round(amount_std, 2),
+        "amount_cv": round(amount_cv, 4),
+        "history_days": round((now - state["first_seen"]) / DAY, 2)
+    }
+
+def velocity_features(velocity: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Features del modelo de fraude derivadas del snapshot, también para la primera solicitud
+    (frecuencia 1, sin cambios de dirección ni variación). Un historial más corto que
+    min_history_days se trata como desconocido: historial_años no se envía y el modelo usa
+    su valor por defecto (feature_builder.FRAUD_FEATURES), en lugar de un 0 que haría parecer
+    más riesgoso a quien repite que a un solicitante nuevo.
+    """
+    n = velocity["applications_total"]
+    name_variation = (velocity["distinct_names"] - 1) / (n - 1) if n > 1 else 0.0
+    features = {
+        "frecuencia_solicitudes": velocity["applications_30d"],
+        "cambios_direccion": max(velocity["distinct_addresses"] - 1, 0),
+        "variacion_datos": round(min(1.0, 0.5 * min(velocity["amount_cv"], 1.0) + 0.5 * min(name_variation, 1.0)), 3)
+    }
+    if velocity["history_days"] >= FEATURE_STORE_CONFIG["min_history_days"]:
+        features["historial_años"] = round(velocity["history_days"] / 365, 2)
+    return features
+
+class FeatureStore:
+    """Estado por solicitante en SQLite (WAL): una transacción de lectura-escritura por solicitud"""
+
+    def __init__(self, config: Dict[str, Any] = FEATURE_STORE_CONFIG):
+        self.config = config
+        self.db_path = config["db_path"]
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._compactor: Optional[asyncio.Task] = None
+        self.stats = {"recorded": 0, "lookups": 0, "record_ms_total": 0.0, "compactions": 0, "compacted_rows": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS applicant_features ("
+                "key TEXT PRIMARY KEY, state TEXT NOT NULL, last_seen REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS applicant_features_seen ON applicant_features (last_seen)")
+            self._conn = conn
+        return self._conn
+
+    def _load(self, conn: sqlite3.Connection, key: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute("SELECT state FROM applicant_features WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(self, documento: Optional[str], nombre: Optional[str], ubicacion: Optional[str] = None,
+               monto: Optional[float] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """Registrar una solicitud y devolver la velocidad del solicitante (incluida esta)"""
+        started = time.perf_counter()
+        now = now or time.time()
+        key = applicant_key(documento, nombre)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._load(conn, key) or new_state(now)
+                apply_application(state, now, nombre, ubicacion, monto, self.config["max_distinct"])
+                conn.execute(
+                    "INSERT OR REPLACE INTO applicant_features (key, state, last_seen) VALUES (?, ?, ?)",
+                    (key, json.dumps(state), now)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        self.stats["recorded"] += 1
+        self.stats["record_ms_total"] += (time.perf_counter() - started) * 1000
+        return {"key": key, **velocity_snapshot(state, now)}
+
+    def record_many(self, applications: List[Tuple[Optional[str], Optional[str], Optional[str], Optional[float]]]
+                    ) -> List[Dict[str, Any]]:
+        """Registrar un lote en orden (solicitudes repetidas del mismo lote cuentan entre sí)"""
+        return [self.record(*application) for application in applications]
+
+    def lookup(self, documento: Optional[str], nombre: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Velocidad actual de un solicitante sin registrar una solicitud"""
+        self.stats["lookups"] += 1
+        key = applicant_key(documento, nombre)
+        with self._lock:
+            state = self._load(self._connect(), key)
+        return {"key": key, **velocity_snapshot(state, time.time())} if state else None
+
+    def compact(self) -> int:
+        """Eliminar solicitantes inactivos y recortar el WAL"""
+        cutoff = time.time() - self.config["retention_days"] * DAY
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute("DELETE FROM applicant_features WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.stats["compactions"] += 1
+        self.stats["compacted_rows"] += deleted
+        return deleted
+
+    async def _compact_loop(self):
+        while True:
+            await asyncio.sleep(self.config["compact_seconds"])
+            try:
+                await asyncio.to_thread(self.compact)
+            except Exception as e:
+                print(f"Error compactando feature store: {e}")
+
+    def start_compactor(self):
+        if self._compactor is None or self._compactor.done():
+            self._compactor = asyncio.create_task(self._compact_loop())
+
+    def stop_compactor(self):
+        if self._compactor is not None:
+            self._compactor.cancel()
+            self._compactor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            applicants = self._connect().execute("SELECT COUNT(*) FROM applicant_features").fetchone()[0]
+        recorded = self.stats["recorded"]
+        return {
+            "db_path": self.db_path,
+            "applicants": applicants,
+            "avg_record_ms": round(self.stats["record_ms_total"] / recorded, 3) if recorded else 0.0,
+            **self.stats
+        }
+
+# Instancia global del feature store
+feature_store = FeatureStore()
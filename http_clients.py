@@ -0,0 +1,149 @@
+"""
+TAVIT Platform v3.1 - Pool de Clientes HTTP
+Registro de httpx.AsyncClient compartidos por proveedor durante la vida de la aplicación
+"""
+
+from typing import Dict, Any
+import httpx
+import os
+from dotenv import load_dotenv
+from rate_limiter import RateLimitedTransport
+from circuit_breaker import CircuitBreakerTransport
+
+load_dotenv()
+
+# HTTP/2 requiere el paquete opcional "h2" (httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Límites por defecto de los pools (configurables por entorno)
+HTTP_POOL_DEFAULTS = {
+    "max_connections": int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    "keepalive_expiry": float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+    "timeout": float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30")),
+    "connect_timeout": float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+}
+
+# Configuración por proveedor: cada uno tiene su propio pool de conexiones
+HTTP_PROVIDERS = {
+    "serpapi": {
+        "http2": True,
+        "max_connections": 50,
+        "max_keepalive_connections": 20
+    },
+    "courtlistener": {
+        "http2": True,
+        "max_connections": 20,
+        "max_keepalive_connections": 10
+    },
+    "openai": {
+        "http2": True,
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "timeout": 60
+    },
+    "stripe": {
+        "http2": True,
+        "max_connections": 10,
+        "max_keepalive_connections": 5
+    },
+    "supabase": {
+        "http2": True,
+        "max_connections": 20,
+        "max_keepalive_connections": 10
+    },
+    "github": {
+        "http2": True,
+        "max_connections": 10,
+        "max_keepalive_connections": 5
+    },
+    "reddit": {
+        "http2": True,
+        "max_connections": 10,
+        "max_keepalive_connections": 5
+    },
+    "twitter": {
+        "http2": True,
+        "max_connections": 10,
+        "max_keepalive_connections": 5
+    },
+    # Hosts arbitrarios (cámaras, webhooks, sistemas de justicia)
+    "default": {
+        "http2": False
+    }
+}
+
+class HTTPClientRegistry:
+    """Registro de clientes HTTP compartidos, uno por proveedor"""
+
+    def __init__(self, providers: Dict[str, Dict[str, Any]] = None):
+        self.providers = providers or HTTP_PROVIDERS
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _build_client(self, provider: str) -> httpx.AsyncClient:
+        """Crear cliente con límites, keep-alive y limitador de tasa del proveedor"""
+        config = {**HTTP_POOL_DEFAULTS, **self.providers.get(provider, self.providers["default"])}
+
+        limits = httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"]
+        )
+        timeout = httpx.Timeout(config["timeout"], connect=config["connect_timeout"])
+
+        transport = httpx.AsyncHTTPTransport(
+            limits=limits,
+            http2=bool(config.get("http2")) and HTTP2_AVAILABLE
+        )
+
+        # Circuit breaker (corte rápido y timeout adaptativo) por fuera del token bucket
+        # del proveedor (rate_limiter.RATE_LIMITS), que envuelve al pool de conexiones
+        return httpx.AsyncClient(
+            timeout=timeout,
+            transport=CircuitBreakerTransport(RateLimitedTransport(transport, provider), provider)
+        )
+
+    def get(self, provider: str = "default") -> httpx.AsyncClient:
+        """Obtener (o crear perezosamente) el cliente de un proveedor"""
+        if provider not in self.providers:
+            provider = "default"
+
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._build_client(provider)
+            self._clients[provider] = client
+        return client
+
+    async def start(self):
+        """Crear los clientes de todos los proveedores al arrancar la aplicación"""
+        for provider in self.providers:
+            self.get(provider)
+
+    async def aclose(self):
+        """Cerrar todos los pools al apagar la aplicación"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de los pools registrados"""
+        return {
+            "http2_available": HTTP2_AVAILABLE,
+            "defaults": HTTP_POOL_DEFAULTS,
+            "clients": {
+                provider: {"open": not client.is_closed}
+                for provider, client in self._clients.items()
+            }
+        }
+
+# Instancia global del registro de clientes
+http_clients = HTTPClientRegistry()
+
+def get_http_client(provider: str = "default") -> httpx.AsyncClient:
+    """Atajo para obtener el cliente compartido de un proveedor"""
+    return http_clients.get(provider)
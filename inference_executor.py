@@ -0,0 +1,171 @@
+"""
+TAVIT Platform v3.1 - Ejecutor de Inferencia
+Despacho de predicciones fuera del event loop con micro-batching
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración del ejecutor de inferencia
+INFERENCE_CONFIG = {
+    "threads": int(os.getenv("INFERENCE_THREADS", str(os.cpu_count() or 4))),
+    "use_process_pool": os.getenv("INFERENCE_PROCESS_POOL", "0") == "1",
+    "processes": int(os.getenv("INFERENCE_PROCESSES", str(os.cpu_count() or 2))),
+    "batch_window_ms": float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "2")),
+    "max_batch_size": int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "256"))
+}
+
+# Modelos cargados dentro de cada proceso del pool (solo backend CatBoost)
+_worker_models = None
+
+def _init_process_worker():
+    """Inicializador de procesos: carga los modelos CatBoost desde models/*.cbm"""
+    global _worker_models
+    from model_utils import ml_models
+    ml_models.load()
+    _worker_models = ml_models
+
+def _process_predict_fraud_batch(features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Un re-entrenamiento reemplaza el .cbm en disco: el proceso recarga antes de predecir
+    _worker_models.refresh_if_changed()
+    return _worker_models.predict_fraud_batch(features_list)
+
+def _process_predict_risk_batch(features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    _worker_models.refresh_if_changed()
+    return _worker_models.predict_risk_score_batch(features_list)
+
+class MicroBatcher:
+    """Agrupa predicciones que llegan dentro de una ventana corta en una sola llamada al modelo"""
+
+    def __init__(self, predict_batch: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                 get_executor: Callable[[], Executor],
+                 window_ms: float = INFERENCE_CONFIG["batch_window_ms"],
+                 max_batch_size: int = INFERENCE_CONFIG["max_batch_size"]):
+        self.predict_batch = predict_batch
+        self.get_executor = get_executor
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Referencias a los lotes en curso: asyncio solo guarda referencias débiles a las tareas
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0}
+
+    async def submit(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Encolar una predicción y esperar su resultado"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        self.stats["batches"] += 1
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self.get_executor(), self.predict_batch, [features for features, _ in batch]
+            )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+class InferenceDispatcher:
+    """Despacha las predicciones de ml_models a un pool de hilos (o procesos) con micro-batching"""
+
+    def __init__(self, models: Any, config: Dict[str, Any] = INFERENCE_CONFIG):
+        self.models = models
+        self.config = config
+        self._executor: Optional[Executor] = None
+
+        # El pool de procesos solo aplica al backend CatBoost (modelos en models/*.cbm)
+        self.use_processes = config["use_process_pool"] and hasattr(models, "models_dir")
+        if self.use_processes:
+            fraud_batch, risk_batch = _process_predict_fraud_batch, _process_predict_risk_batch
+        else:
+            fraud_batch, risk_batch = models.predict_fraud_batch, models.predict_risk_score_batch
+
+        self._fraud_batch = fraud_batch
+        self._risk_batch = risk_batch
+        self.fraud_batcher = MicroBatcher(fraud_batch, self.get_executor)
+        self.risk_batcher = MicroBatcher(risk_batch, self.get_executor)
+
+    def get_executor(self) -> Executor:
+        """Crear perezosamente el pool de inferencia"""
+        if self._executor is None:
+            if self.use_processes:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.config["processes"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.config["threads"],
+                    thread_name_prefix="inference"
+                )
+        return self._executor
+
+    async def predict_fraud(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.fraud_batcher.submit(features)
+
+    async def predict_risk_score(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.risk_batcher.submit(features)
+
+    async def predict_fraud_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lotes completos (endpoints batch) van directo al pool, sin ventana de espera"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), self._fraud_batch, features_list)
+
+    async def predict_risk_score_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), self._risk_batch, features_list)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "executor": "process" if self.use_processes else "thread",
+            "workers": self.config["processes"] if self.use_processes else self.config["threads"],
+            "batch_window_ms": self.config["batch_window_ms"],
+            "fraud": self.fraud_batcher.stats,
+            "risk": self.risk_batcher.stats
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
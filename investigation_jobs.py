@@ -0,0 +1,655 @@
+"""
+TAVIT Platform v3.1 - Motor de Investigaciones
+Cola durable de investigaciones en SQLite, pool de workers con concurrencia por prioridad,
+sub-tareas por fuente en paralelo con reintentos, cancelación y progreso incremental.
+Los workers pueden ir dentro del proceso web o aparte: python investigation_jobs.py --processes N
+"""
+
+from typing import Any, Dict, List, Optional, Set
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from osint_sources import run_source
+
+load_dotenv()
+
+PRIORITIES = ["low", "normal", "high", "urgent"]
+
+# Configuración del motor de investigaciones
+INVESTIGATION_CONFIG = {
+    "db_path": os.getenv("INVESTIGATION_DB_PATH", "cache/investigations.sqlite3"),
+    # embedded: cada proceso web ejecuta un worker | external: la web solo encola y los workers
+    # (python investigation_jobs.py) leen la misma base, así que exige un INVESTIGATION_DB_PATH compartido
+    "worker_mode": os.getenv("INVESTIGATION_WORKER_MODE", "embedded"),
+    # Investigaciones simultáneas por prioridad en cada proceso worker: con N workers de uvicorn
+    # en modo embedded el límite efectivo es N veces este
+    "concurrency": {
+        priority: int(os.getenv(f"INVESTIGATION_CONCURRENCY_{priority.upper()}", default))
+        for priority, default in zip(PRIORITIES, ["1", "2", "3", "4"])
+    },
+    # Fuentes consultadas en paralelo dentro de una investigación
+    "max_parallel_sources": int(os.getenv("INVESTIGATION_MAX_PARALLEL_SOURCES", "6")),
+    "results_per_source": int(os.getenv("INVESTIGATION_RESULTS_PER_SOURCE", "10")),
+    # Reintentos por fuente ante timeout o error, con espera exponencial (segundos)
+    "max_attempts": int(os.getenv("INVESTIGATION_MAX_ATTEMPTS", "3")),
+    "retry_backoff": float(os.getenv("INVESTIGATION_RETRY_BACKOFF", "2")),
+    # Un worker renueva el lease de sus trabajos; si muere, otro los retoma al vencer
+    "lease_seconds": float(os.getenv("INVESTIGATION_LEASE_SECONDS", "60")),
+    "max_job_attempts": 3,
+    "heartbeat_seconds": 2.0,
+    "poll_seconds": 1.0
+}
+
+if INVESTIGATION_CONFIG["worker_mode"] == "external" and not os.getenv("INVESTIGATION_DB_PATH"):
+    # Con la ruta por defecto cada máquina tiene su propia cola y nadie tomaría los trabajos
+    print("INVESTIGATION_WORKER_MODE=external requiere un INVESTIGATION_DB_PATH compartido: se usa embedded")
+    INVESTIGATION_CONFIG["worker_mode"] = "embedded"
+
+# Fuentes de una investigación -> (fuente OSINT, plantilla de búsqueda, opciones).
+# Las fuentes sin plan (sin API pública utilizable) quedan como "unavailable".
+INVESTIGATION_SOURCE_PLAN = {
+    "courtlistener": ("legal", "{target}", {}),
+    "pacer": ("legal", "{target}", {"case_type": "r"}),
+    "state_courts": ("legal", "{target}", {"case_type": "o"}),
+    "bankruptcy_records": ("web", '"{target}" bankruptcy', {}),
+    "sec_filings": ("web", '"{target}" site:sec.gov', {}),
+    "patent_uspto": ("web", '"{target}" site:patents.google.com', {}),
+    "business_registrations": ("web", '"{target}" site:opencorporates.com', {}),
+    "tax_liens": ("web", '"{target}" "tax lien"', {}),
+    "social_media": ("reddit", "{target}", {}),
+    "professional_networks": ("web", '"{target}" site:linkedin.com', {}),
+    "news_mentions": ("news", "{target}", {}),
+    "academic_papers": ("web", '"{target}" site:researchgate.net OR site:scholar.google.com', {}),
+    "government_records": ("web", '"{target}" site:.gov', {}),
+    "domain_whois": ("web", '"{target}" whois', {}),
+    "github_activity": ("github", "{target}", {"search_type": "users"}),
+    "technology_patents": ("web", '"{target}" patent technology', {}),
+    "security_breaches": ("web", '"{target}" "data breach"', {}),
+    "cyber_threat_intel": ("news", '"{target}" ransomware OR ciberataque', {})
+}
+
+# Estados de fuente que merecen reintento
+RETRYABLE_STATUSES = {"timeout", "error"}
+
+class InvestigationStore:
+    """Cola y estado de investigaciones en SQLite (WAL): compartida por todos los procesos worker"""
+
+    def __init__(self, db_path: str = INVESTIGATION_CONFIG["db_path"]):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS investigation_jobs (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT UNIQUE NOT NULL,
+                    priority TEXT NOT NULL,
+                    priority_rank INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    ai_analysis TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    cancel_requested INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS investigation_jobs_queue
+                    ON investigation_jobs (status, priority_rank DESC, seq);
+                CREATE TABLE IF NOT EXISTS investigation_tasks (
+                    job_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    elapsed_ms REAL,
+                    updated_at TEXT,
+                    PRIMARY KEY (job_id, source)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS investigation_findings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS investigation_findings_job ON investigation_findings (job_id, id);
+                CREATE TABLE IF NOT EXISTS investigation_workers (
+                    worker_id TEXT PRIMARY KEY,
+                    last_seen REAL NOT NULL
+                ) WITHOUT ROWID;
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._connect().execute(sql, params).rowcount
+
+    def enqueue(self, payload: Dict[str, Any], priority: str = "normal") -> str:
+        """Encolar una investigación con una sub-tarea por fuente"""
+        if priority not in PRIORITIES:
+            priority = "normal"
+        job_id = payload.get("id") or f"inv_{uuid.uuid4().hex[:12]}"
+        now = datetime.now().isoformat()
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO investigation_jobs (id, priority, priority_rank, status, payload, created_at) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (job_id, priority, PRIORITIES.index(priority), json.dumps(payload, default=str), now)
+                )
+                conn.executemany(
+                    "INSERT INTO investigation_tasks (job_id, source, status, updated_at) VALUES (?, ?, 'pending', ?)",
+                    [(job_id, source, now) for source in dict.fromkeys(payload["sources"])]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def claim(self, worker_id: str, priorities: List[str], lease_seconds: float,
+              max_job_attempts: int) -> Optional[Dict[str, Any]]:
+        """
+        Tomar la investigación más prioritaria entre las prioridades con hueco libre.
+        También retoma las de un worker caído (lease vencido).
+        """
+        if not priorities:
+            return None
+        now = time.time()
+        placeholders = ",".join("?" for _ in priorities)
+
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id, attempts FROM investigation_jobs "
+                    f"WHERE priority IN ({placeholders}) AND "
+                    f"(status = 'queued' OR (status = 'processing' AND lease_expires < ?)) "
+                    f"ORDER BY priority_rank DESC, seq LIMIT 1",
+                    (*priorities, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row["attempts"] >= max_job_attempts:
+                    # Un trabajo que ha tumbado varias veces a su worker no se reintenta más
+                    conn.execute(
+                        "UPDATE investigation_jobs SET status = 'failed', error = ?, finished_at = ?, "
+                        "worker_id = NULL WHERE id = ?",
+                        ("Worker perdido demasiadas veces", datetime.now().isoformat(), row["id"])
+                    )
+                    conn.execute("COMMIT")
+                    return None
+
+                conn.execute(
+                    "UPDATE investigation_jobs SET status = 'processing', worker_id = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (worker_id, now + lease_seconds, datetime.now().isoformat(), row["id"])
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get_job(row["id"])
+
+    def renew_leases(self, worker_id: str, job_ids: List[str], lease_seconds: float) -> Set[str]:
+        """Renovar los leases y devolver los trabajos con cancelación solicitada"""
+        if not job_ids:
+            return set()
+        placeholders = ",".join("?" for _ in job_ids)
+        self._write(
+            f"UPDATE investigation_jobs SET lease_expires = ? WHERE worker_id = ? AND id IN ({placeholders})",
+            (time.time() + lease_seconds, worker_id, *job_ids)
+        )
+        rows = self._query(
+            f"SELECT id FROM investigation_jobs WHERE cancel_requested = 1 AND id IN ({placeholders})",
+            tuple(job_ids)
+        )
+        return {row["id"] for row in rows}
+
+    def heartbeat(self, worker_id: str):
+        """Señal de vida de un worker (los de hace más de un día se olvidan)"""
+        now = time.time()
+        self._write("INSERT OR REPLACE INTO investigation_workers (worker_id, last_seen) VALUES (?, ?)",
+                    (worker_id, now))
+        self._write("DELETE FROM investigation_workers WHERE last_seen < ?", (now - 86400,))
+
+    def live_workers(self, max_age: float = INVESTIGATION_CONFIG["lease_seconds"]) -> int:
+        """Workers con señal de vida reciente, en cualquier proceso que use esta base"""
+        rows = self._query("SELECT COUNT(*) AS n FROM investigation_workers WHERE last_seen >= ?",
+                           (time.time() - max_age,))
+        return rows[0]["n"]
+
+    def release(self, worker_id: str, job_ids: List[str]):
+        """Devolver a la cola los trabajos de un worker que se detiene ordenadamente"""
+        for job_id in job_ids:
+            self._write(
+                "UPDATE investigation_jobs SET status = 'queued', worker_id = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0) WHERE id = ? AND worker_id = ? AND status = 'processing'",
+                (job_id, worker_id)
+            )
+
+    def pending_tasks(self, job_id: str) -> List[str]:
+        """Fuentes aún no resueltas (al retomar un trabajo se conservan las ya terminadas)"""
+        rows = self._query(
+            "SELECT source FROM investigation_tasks WHERE job_id = ? AND status IN ('pending', 'running', 'retrying')",
+            (job_id,)
+        )
+        return [row["source"] for row in rows]
+
+    def update_task(self, job_id: str, source: str, status: str, attempts: int,
+                    total: int = 0, error: Optional[str] = None, elapsed_ms: Optional[float] = None):
+        self._write(
+            "UPDATE investigation_tasks SET status = ?, attempts = ?, total = ?, error = ?, elapsed_ms = ?, "
+            "updated_at = ? WHERE job_id = ? AND source = ?",
+            (status, attempts, total, error, elapsed_ms, datetime.now().isoformat(), job_id, source)
+        )
+
+    def complete_task(self, job_id: str, source: str, outcome: Dict[str, Any], attempts: int,
+                      items: List[Dict[str, Any]]):
+        """Guardar los hallazgos de una fuente y recalcular el progreso en una transacción"""
+        status = "done" if outcome["status"] == "ok" else outcome["status"]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM investigation_findings WHERE job_id = ? AND source = ?", (job_id, source))
+                conn.executemany(
+                    "INSERT INTO investigation_findings (job_id, source, data) VALUES (?, ?, ?)",
+                    [(job_id, source, json.dumps(item, default=str)) for item in items]
+                )
+                conn.execute(
+                    "UPDATE investigation_tasks SET status = ?, attempts = ?, total = ?, error = ?, elapsed_ms = ?, "
+                    "updated_at = ? WHERE job_id = ? AND source = ?",
+                    (status, attempts, outcome.get("total", 0), outcome.get("error"), outcome.get("elapsed_ms"),
+                     datetime.now().isoformat(), job_id, source)
+                )
+                counts = conn.execute(
+                    "SELECT COUNT(*), SUM(status NOT IN ('pending', 'running', 'retrying')) "
+                    "FROM investigation_tasks WHERE job_id = ?", (job_id,)
+                ).fetchone()
+                progress = int(100 * (counts[1] or 0) / counts[0]) if counts[0] else 100
+                conn.execute("UPDATE investigation_jobs SET progress = ? WHERE id = ?", (progress, job_id))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def finish(self, job_id: str, status: str, ai_analysis: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None):
+        now = datetime.now().isoformat()
+        if status == "cancelled":
+            self._write(
+                "UPDATE investigation_tasks SET status = 'cancelled', updated_at = ? "
+                "WHERE job_id = ? AND status IN ('pending', 'running', 'retrying')",
+                (now, job_id)
+            )
+        self._write(
+            "UPDATE investigation_jobs SET status = ?, ai_analysis = ?, error = ?, finished_at = ?, "
+            "worker_id = NULL, lease_expires = NULL, progress = CASE WHEN ? = 'completed' THEN 100 ELSE progress END "
+            "WHERE id = ?",
+            (status, json.dumps(ai_analysis) if ai_analysis is not None else None, error, now, status, job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancelar: inmediato si está en cola; si está en proceso lo cancela su worker"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT status FROM investigation_jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                status = row["status"]
+                if status == "queued":
+                    status = "cancelled"
+                    conn.execute(
+                        "UPDATE investigation_jobs SET status = 'cancelled', finished_at = ? WHERE id = ?",
+                        (now, job_id)
+                    )
+                    conn.execute(
+                        "UPDATE investigation_tasks SET status = 'cancelled', updated_at = ? WHERE job_id = ?",
+                        (now, job_id)
+                    )
+                elif status == "processing":
+                    status = "cancelling"
+                    conn.execute("UPDATE investigation_jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return status
+
+    def _job_from_row(self, row: sqlite3.Row, include_details: bool = True) -> Dict[str, Any]:
+        payload = json.loads(row["payload"])
+        job = {
+            **payload,
+            "id": row["id"],
+            "priority": row["priority"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "ai_analysis": json.loads(row["ai_analysis"]) if row["ai_analysis"] else None,
+            "error": row["error"]
+        }
+        if include_details:
+            tasks = self._query(
+                "SELECT source, status, attempts, total, error, elapsed_ms, updated_at "
+                "FROM investigation_tasks WHERE job_id = ?", (row["id"],)
+            )
+            findings = self._query(
+                "SELECT source, data FROM investigation_findings WHERE job_id = ? ORDER BY id", (row["id"],)
+            )
+            job["source_status"] = {task["source"]: {k: task[k] for k in task.keys() if k != "source"} for task in tasks}
+            job["findings"] = [{**json.loads(finding["data"]), "investigation_source": finding["source"]}
+                               for finding in findings]
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT * FROM investigation_jobs WHERE id = ?", (job_id,))
+        return self._job_from_row(rows[0]) if rows else None
+
+    def list_jobs(self, status: Optional[str] = None, priority: Optional[str] = None,
+                  limit: int = 50) -> List[Dict[str, Any]]:
+        """Listado sin hallazgos (los detalles se piden por id)"""
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if priority:
+            conditions.append("priority = ?")
+            params.append(priority)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._query(
+            f"SELECT * FROM investigation_jobs {where} ORDER BY seq DESC LIMIT ?", (*params, limit)
+        )
+        return [self._job_from_row(row, include_details=False) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_status = self._query("SELECT status, COUNT(*) AS n FROM investigation_jobs GROUP BY status")
+        queued = self._query(
+            "SELECT priority, COUNT(*) AS n FROM investigation_jobs WHERE status = 'queued' GROUP BY priority"
+        )
+        stats = {
+            "db_path": self.db_path,
+            "jobs_by_status": {row["status"]: row["n"] for row in by_status},
+            "queued_by_priority": {row["priority"]: row["n"] for row in queued},
+            "workers_alive": self.live_workers()
+        }
+        if stats["queued_by_priority"] and not stats["workers_alive"]:
+            stats["warning"] = "Hay investigaciones en cola y ningún worker activo las está tomando"
+        return stats
+
+# Instancia global de la cola de investigaciones
+investigation_store = InvestigationStore()
+
+def summarize_findings(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumen de la investigación a partir de los hallazgos y el estado de cada fuente"""
+    source_status = job.get("source_status", {})
+    by_source: Dict[str, int] = {}
+    for finding in job.get("findings", []):
+        by_source[finding["investigation_source"]] = by_source.get(finding["investigation_source"], 0) + 1
+
+    statuses = [task["status"] for task in source_status.values()]
+    legal_sources = [source for source, plan in INVESTIGATION_SOURCE_PLAN.items() if plan[0] == "legal"]
+    return {
+        "sources_total": len(statuses),
+        "sources_ok": statuses.count("done"),
+        "sources_unavailable": statuses.count("unavailable"),
+        "sources_failed": len([status for status in statuses if status in RETRYABLE_STATUSES]),
+        "findings_total": sum(by_source.values()),
+        "findings_by_source": by_source,
+        "legal_records": sum(source_status.get(source, {}).get("total", 0) for source in legal_sources),
+        "news_mentions": source_status.get("news_mentions", {}).get("total", 0),
+        "generated_at": datetime.now().isoformat()
+    }
+
+class InvestigationWorker:
+    """
+    Worker de investigaciones: toma trabajos de la cola respetando el límite de
+    concurrencia de cada prioridad y ejecuta sus fuentes en paralelo
+    """
+
+    def __init__(self, store: InvestigationStore = investigation_store,
+                 config: Dict[str, Any] = INVESTIGATION_CONFIG):
+        self.store = store
+        self.config = config
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.running: Dict[str, asyncio.Task] = {}
+        self.running_priority: Dict[str, str] = {}
+        self._cancelled: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._source_slots: Optional[asyncio.Semaphore] = None
+        self.stats = {"claimed": 0, "completed": 0, "failed": 0, "cancelled": 0, "source_retries": 0}
+
+    def free_priorities(self) -> List[str]:
+        """Prioridades con hueco libre en este worker"""
+        busy = list(self.running_priority.values())
+        return [
+            priority for priority in PRIORITIES
+            if busy.count(priority) < self.config["concurrency"].get(priority, 1)
+        ]
+
+    def notify(self):
+        """Despertar al worker (encolado en el mismo proceso)"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run_loop(self):
+        self._wakeup = asyncio.Event()
+        self._source_slots = asyncio.Semaphore(self.config["max_parallel_sources"])
+        heartbeat = asyncio.create_task(self._heartbeat_loop())
+        try:
+            while True:
+                try:
+                    claimed = await asyncio.to_thread(
+                        self.store.claim, self.worker_id, self.free_priorities(),
+                        self.config["lease_seconds"], self.config["max_job_attempts"]
+                    )
+                except Exception as e:
+                    print(f"Error tomando investigaciones de la cola: {e}")
+                    claimed = None
+                if claimed is not None:
+                    self.stats["claimed"] += 1
+                    self.running_priority[claimed["id"]] = claimed["priority"]
+                    self.running[claimed["id"]] = asyncio.create_task(self._run_job(claimed))
+                    continue
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.config["poll_seconds"])
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat_loop(self):
+        """Señal de vida, renovar leases y aplicar las cancelaciones pedidas desde cualquier proceso"""
+        while True:
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.worker_id)
+                to_cancel = await asyncio.to_thread(
+                    self.store.renew_leases, self.worker_id, list(self.running), self.config["lease_seconds"]
+                )
+            except Exception as e:
+                print(f"Error renovando leases de investigaciones: {e}")
+                to_cancel = set()
+            for job_id in to_cancel:
+                task = self.running.get(job_id)
+                if task is not None and job_id not in self._cancelled:
+                    self._cancelled.add(job_id)
+                    task.cancel()
+            await asyncio.sleep(self.config["heartbeat_seconds"])
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        try:
+            sources = await asyncio.to_thread(self.store.pending_tasks, job_id)
+            await asyncio.gather(*[self._run_source_task(job, source) for source in sources])
+
+            finished = await asyncio.to_thread(self.store.get_job, job_id)
+            await asyncio.to_thread(self.store.finish, job_id, "completed", summarize_findings(finished))
+            self.stats["completed"] += 1
+            await self._notify_completion(job_id)
+        except asyncio.CancelledError:
+            if job_id in self._cancelled:
+                await asyncio.to_thread(self.store.finish, job_id, "cancelled")
+                self.stats["cancelled"] += 1
+            else:
+                # Parada del worker: el trabajo vuelve a la cola para otro worker
+                await asyncio.to_thread(self.store.release, self.worker_id, [job_id])
+        except Exception as e:
+            print(f"Error en investigación {job_id}: {e}")
+            await asyncio.to_thread(self.store.finish, job_id, "failed", None, str(e))
+            self.stats["failed"] += 1
+        finally:
+            self.running.pop(job_id, None)
+            self.running_priority.pop(job_id, None)
+            self._cancelled.discard(job_id)
+            self.notify()
+
+    async def _run_source_task(self, job: Dict[str, Any], source: str):
+        """Una fuente de la investigación, con reintentos ante timeout o error"""
+        job_id = job["id"]
+        plan = INVESTIGATION_SOURCE_PLAN.get(source)
+        if plan is None:
+            outcome = {"status": "unavailable", "total": 0, "error": f"Fuente sin integración: {source}"}
+            await asyncio.to_thread(self.store.complete_task, job_id, source, outcome, 0, [])
+            return
+
+        name, template, options = plan
+        query = template.format(target=job["target_name"])
+        max_attempts = self.config["max_attempts"]
+
+        for attempt in range(1, max_attempts + 1):
+            await asyncio.to_thread(self.store.update_task, job_id, source, "running", attempt)
+            async with self._source_slots:
+                outcome = await run_source(name, query, self.config["results_per_source"], **options)
+
+            if outcome["status"] not in RETRYABLE_STATUSES or attempt == max_attempts:
+                break
+
+            self.stats["source_retries"] += 1
+            await asyncio.to_thread(
+                self.store.update_task, job_id, source, "retrying", attempt, 0, outcome["error"]
+            )
+            await asyncio.sleep(self.config["retry_backoff"] * 2 ** (attempt - 1))
+
+        await asyncio.to_thread(self.store.complete_task, job_id, source, outcome, attempt, outcome["items"])
+
+    async def _notify_completion(self, job_id: str):
+        try:
+            from notification_system import notification_manager
+            await notification_manager.send_completion_notification(job_id)
+        except Exception as e:
+            print(f"Error notificando investigación {job_id}: {e}")
+
+    def start(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        """Detener el worker; las investigaciones en curso vuelven a la cola"""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        tasks = list(self.running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "worker_mode": self.config["worker_mode"],
+            "concurrency": self.config["concurrency"],
+            "running": dict(self.running_priority),
+            **self.stats
+        }
+
+# Instancia global del worker (la usa el proceso web en modo embedded)
+investigation_worker = InvestigationWorker()
+
+async def enqueue_investigation(payload: Dict[str, Any], priority: str = "normal") -> str:
+    """Encolar una investigación (SQLite fuera del event loop) y despertar al worker local si lo hay"""
+    job_id = await asyncio.to_thread(investigation_store.enqueue, payload, priority)
+    if INVESTIGATION_CONFIG["worker_mode"] == "embedded":
+        investigation_worker.notify()
+    elif not await asyncio.to_thread(investigation_store.live_workers):
+        print(f"Investigación {job_id} en cola sin ningún worker activo (INVESTIGATION_WORKER_MODE=external)")
+    return job_id
+
+async def _serve_worker():
+    from http_clients import http_clients
+    await http_clients.start()
+    investigation_worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await investigation_worker.stop()
+        await http_clients.aclose()
+
+def _worker_process():
+    try:
+        asyncio.run(_serve_worker())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workers de investigaciones TAVIT")
+    parser.add_argument("--processes", type=int, default=1, help="Procesos worker (uno por núcleo)")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        _worker_process()
+    else:
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_worker_process) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
@@ -0,0 +1,243 @@
+"""
+TAVIT Platform v3.1 - Detector de Palabras Clave
+Búsqueda multi-patrón compilada (una sola alternancia) sobre texto normalizado sin acentos
+ni mayúsculas: cada texto se recorre una vez. Listas por idioma recargables en caliente
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración de las listas de palabras clave
+KEYWORD_CONFIG = {
+    # JSON {idioma: {lista: {categoría: [palabras]} | [palabras]}} que amplía o reemplaza los valores por defecto
+    "file": os.getenv("KEYWORDS_FILE", "config/keywords.json"),
+    # Cada cuánto se comprueba si el fichero ha cambiado (segundos)
+    "reload_check_seconds": float(os.getenv("KEYWORDS_RELOAD_CHECK_SECONDS", "5")),
+    "default_language": "es",
+    # Palabras de hasta esta longitud solo coinciden como palabra completa (o su plural):
+    # "IA" no encuentra "aire" ni "AI" encuentra "aim"
+    "whole_word_max_length": int(os.getenv("KEYWORDS_WHOLE_WORD_MAX_LENGTH", "4"))
+}
+
+# Listas por defecto: {idioma: {lista: {categoría: [palabras]}}}
+DEFAULT_KEYWORD_LISTS = {
+    "es": {
+        "fraud_negative": {
+            "negative": ["fraude", "estafa", "demanda", "condena", "ilegal", "investigación"]
+        },
+        "compliance_concern": {
+            "alta": ["fraude", "sanción"],
+            "media": ["negligencia", "demanda", "multa", "violación"]
+        },
+        "trend_topics": {
+            "security": ["seguridad", "ciberseguridad", "vulnerabilidad", "fraude"],
+            "finance": ["finanzas", "financiero", "dinero", "banco", "blockchain"],
+            "tech": ["tecnología", "IA", "software", "herramientas"]
+        }
+    },
+    "en": {
+        "fraud_negative": {
+            "negative": ["fraud", "scam", "lawsuit", "convicted", "illegal", "investigation"]
+        },
+        "compliance_concern": {
+            "alta": ["fraud", "sanction"],
+            "media": ["negligence", "lawsuit", "fined", "penalty", "violation"]
+        },
+        "trend_topics": {
+            "security": ["security", "cybersecurity", "vulnerability", "fraud"],
+            "finance": ["finance", "money", "bank", "blockchain"],
+            "tech": ["technology", "AI", "software", "tools"]
+        }
+    }
+}
+
+def _build_fold_table() -> Dict[int, str]:
+    """Tabla de traducción letra acentuada -> letra base (un carácter por carácter)"""
+    table = {}
+    for code in range(0xC0, 0x250):
+        char = chr(code)
+        base = "".join(c for c in unicodedata.normalize("NFKD", char) if not unicodedata.combining(c))
+        if len(base) == 1 and base != char:
+            table[code] = base.lower()
+    return table
+
+_FOLD_TABLE = _build_fold_table()
+
+def fold(text: str) -> str:
+    """
+    Minúsculas sin acentos. Conserva la longitud del texto (salvo casos raros de lower()),
+    así las posiciones de las coincidencias valen también sobre el texto original.
+    """
+    return text.translate(_FOLD_TABLE).lower()
+
+class KeywordMatcher:
+    """
+    Todas las palabras de una lista compiladas en una sola expresión regular.
+    Una palabra coincide al inicio de palabra del texto ("demanda" encuentra "demandado");
+    las cortas (whole_word_max_length) solo como palabra completa o en plural ("bank"
+    encuentra "banks" pero no "bankruptcy"). Ante solapamientos gana la más larga.
+    """
+
+    def __init__(self, keywords: Union[Dict[str, Iterable[str]], Iterable[str]],
+                 whole_word_max_length: int = KEYWORD_CONFIG["whole_word_max_length"]):
+        if not isinstance(keywords, dict):
+            keywords = {"default": keywords}
+
+        # Palabra normalizada -> forma original y categorías a las que pertenece
+        self.keywords: Dict[str, str] = {}
+        self.categories: Dict[str, List[str]] = {}
+        for category, words in keywords.items():
+            for word in words:
+                folded = fold(word.strip())
+                if not folded:
+                    continue
+                self.keywords.setdefault(folded, word)
+                self.categories.setdefault(folded, [])
+                if category not in self.categories[folded]:
+                    self.categories[folded].append(category)
+
+        if self.keywords:
+            # El plural va en un lookahead: el texto coincidente sigue siendo la palabra de la lista
+            alternation = "|".join(
+                re.escape(word) + (r"(?=(?:e?s)?(?!\w))" if len(word) <= whole_word_max_length else "")
+                for word in sorted(self.keywords, key=len, reverse=True)
+            )
+            self.pattern = re.compile(rf"(?<!\w)(?:{alternation})")
+        else:
+            self.pattern = re.compile(r"(?!)")
+
+    def finditer(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """(palabra, inicio, fin) de cada coincidencia, en una sola pasada"""
+        for match in self.pattern.finditer(fold(text)):
+            yield self.keywords[match.group()], match.start(), match.end()
+
+    def scan(self, text: str) -> Dict[str, Any]:
+        """Conteo y posiciones por palabra, y conteo por categoría"""
+        counts: Dict[str, int] = {}
+        positions: Dict[str, List[Tuple[int, int]]] = {}
+        categories: Dict[str, int] = {}
+        for keyword, start, end in self.finditer(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+            positions.setdefault(keyword, []).append((start, end))
+            for category in self.categories[fold(keyword)]:
+                categories[category] = categories.get(category, 0) + 1
+        return {"counts": counts, "positions": positions, "categories": categories}
+
+    def distinct(self, text: str) -> Set[str]:
+        """Palabras distintas presentes en el texto"""
+        return {self.keywords[folded] for folded in set(self.pattern.findall(fold(text)))}
+
+    def categories_of(self, keyword: str) -> List[str]:
+        return self.categories.get(fold(keyword), [])
+
+    def first_category(self, text: str, order: Optional[List[str]] = None) -> Optional[str]:
+        """Primera categoría (según `order`) con alguna coincidencia en el texto"""
+        found = {category for keyword in self.distinct(text) for category in self.categories_of(keyword)}
+        for category in order or sorted(found):
+            if category in found:
+                return category
+        return None
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+class KeywordRegistry:
+    """Listas de palabras por idioma, con matchers compilados en cache y recarga en caliente"""
+
+    def __init__(self, config: Dict[str, Any] = KEYWORD_CONFIG,
+                 defaults: Dict[str, Dict[str, Any]] = DEFAULT_KEYWORD_LISTS):
+        self.config = config
+        self.defaults = defaults
+        self.lists: Dict[str, Dict[str, Dict[str, List[str]]]] = {}
+        self._matchers: Dict[Tuple[str, Tuple[str, ...]], KeywordMatcher] = {}
+        self._file_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"reloads": 0, "compiled": 0, "last_reload": None, "last_error": None}
+        self.reload()
+
+    def _read_file(self) -> Dict[str, Any]:
+        path = self.config["file"]
+        if not path or not os.path.exists(path):
+            self._file_mtime = None
+            return {}
+        self._file_mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def reload(self) -> Dict[str, Any]:
+        """Releer el fichero de listas; un fichero inválido deja en servicio las listas anteriores"""
+        with self._lock:
+            try:
+                overrides = self._read_file()
+            except Exception as e:
+                print(f"Error cargando listas de palabras clave: {e}")
+                self.stats["last_error"] = str(e)
+                return self.get_stats()
+
+            lists = {
+                language: {name: dict(categories) for name, categories in named.items()}
+                for language, named in self.defaults.items()
+            }
+            for language, named in overrides.items():
+                for name, categories in named.items():
+                    if not isinstance(categories, dict):
+                        categories = {"default": categories}
+                    lists.setdefault(language, {})[name] = categories
+
+            self.lists = lists
+            self._matchers = {}
+            self.stats["reloads"] += 1
+            self.stats["last_reload"] = time.time()
+            self.stats["last_error"] = None
+        return self.get_stats()
+
+    def _check_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.config["reload_check_seconds"]:
+            return
+        self._last_check = now
+
+        path = self.config["file"]
+        mtime = os.path.getmtime(path) if path and os.path.exists(path) else None
+        if mtime != self._file_mtime:
+            self.reload()
+
+    def get(self, name: str, *languages: str) -> KeywordMatcher:
+        """Matcher de una lista; con varios idiomas se combinan en una sola expresión"""
+        self._check_reload()
+        languages = languages or (self.config["default_language"],)
+        key = (name, languages)
+        matcher = self._matchers.get(key)
+        if matcher is None:
+            combined: Dict[str, List[str]] = {}
+            for language in languages:
+                for category, words in self.lists.get(language, {}).get(name, {}).items():
+                    combined.setdefault(category, []).extend(words)
+            matcher = KeywordMatcher(combined, self.config["whole_word_max_length"])
+            self._matchers[key] = matcher
+            self.stats["compiled"] += 1
+        return matcher
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "file": self.config["file"],
+            "file_loaded": self._file_mtime is not None,
+            "languages": {
+                language: {name: sum(len(words) for words in categories.values()) for name, categories in named.items()}
+                for language, named in self.lists.items()
+            },
+            "compiled_matchers": len(self._matchers),
+            **self.stats
+        }
+
+# Instancia global de las listas de palabras clave
+keyword_registry = KeywordRegistry()
@@ -17,16 +17,29 @@ import json
 import asyncio
 
 # Importar módulos personalizados
-# from model_utils import ml_models  # Versión CatBoost
-from model_utils_simple import ml_models  # Versión simplificada para demo
+# CatBoost por defecto; ML_MODELS=demo sirve la versión simplificada
+from model_utils import serving_models as ml_models, ML_MODELS_MODE, ModelUnavailableError
 from admin_routes import router as admin_router
 from chat_routes import router as chat_router
 from dashboard_api import router as dashboard_router
 from api_status import router as api_status_router
 from cameras_api import router as cameras_router
-from social_osint import router as osint_router
+from social_osint import router as osint_router, osint_cache, OSINTSearchRequest, stream_osint_search
 from payment_routes import router as payment_router
 from real_cameras import router as real_cameras_router
+from http_clients import http_clients, get_http_client
+from provider_cache import serpapi_cache
+from osint_sources import fan_out, run_source
+from courtlistener_mirror import courtlistener_mirror
+from feature_builder import risk_features, DEFAULT_OSINT_SCORE
+from inference_executor import InferenceDispatcher
+from model_training import training_jobs
+from dashboard_hub import dashboard_hub, DashboardClient
+from investigation_jobs import investigation_worker, INVESTIGATION_CONFIG
+from keyword_matcher import keyword_registry
+from entity_extractor import entity_extractor
+from feature_store import feature_store, velocity_features
+from watchlist import watchlists
 
 # Cargar variables de entorno
 load_dotenv()
@@ -34,8 +47,23 @@ load_dotenv()
 # Configuración
 SERPAPI_KEY = os.getenv("SERPAPI_KEY")
 COURTLISTENER_TOKEN = os.getenv("COURTLISTENER_TOKEN")
-COURTLISTENER_UA = os.getenv("COURTLISTENER_UA", "Tavix/1.0 (ceo@tavit.com)")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+BATCH_OSINT_CONCURRENCY = int(os.getenv("BATCH_OSINT_CONCURRENCY", "20"))
+
+# Deadline de compliance y reparto por proveedor (fracción del deadline, ambos corren en paralelo)
+COMPLIANCE_CONFIG = {
+    "deadline_ms": int(os.getenv("COMPLIANCE_DEADLINE_MS", "10000")),
+    "assembly_margin_ms": 50,
+    "min_budget_ms": 100,
+    "budget_share": {
+        "courtlistener": float(os.getenv("COMPLIANCE_BUDGET_COURTLISTENER", "1.0")),
+        "serpapi": float(os.getenv("COMPLIANCE_BUDGET_SERPAPI", "0.8"))
+    }
+}
+
+# Inferencia fuera del event loop (pool de hilos/procesos con micro-batching)
+inference = InferenceDispatcher(ml_models)
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -85,11 +113,20 @@ class RiskScoreRequest(BaseModel):
 class ComplianceVerifyRequest(BaseModel):
     nombre: str = Field(..., description="Nombre completo de la persona o empresa")
     tipo: str = Field(..., description="Tipo de entidad: persona o empresa")
+    deadline_ms: Optional[int] = Field(None, ge=100, le=60000, description="Tiempo máximo de respuesta en ms (por defecto COMPLIANCE_DEADLINE_MS)")
 
 class DataCrawlerRequest(BaseModel):
     nombre: str = Field(..., description="Nombre a investigar")
     fuentes: List[str] = Field(default=["web", "noticias"], description="Fuentes: web, noticias, legal, github, uspto")
 
+class FraudCheckBatchRequest(BaseModel):
+    solicitantes: List[FraudCheckRequest] = Field(..., description="Solicitantes a evaluar", min_length=1, max_length=MAX_BATCH_SIZE)
+    omitir_osint: bool = Field(default=False, description="Puntuar solo con el modelo, sin búsqueda OSINT")
+
+class RiskScoreBatchRequest(BaseModel):
+    solicitantes: List[RiskScoreRequest] = Field(..., description="Clientes a puntuar", min_length=1, max_length=MAX_BATCH_SIZE)
+    omitir_osint: bool = Field(default=False, description="Puntuar solo con el modelo, sin búsqueda OSINT")
+
 # Endpoint raíz
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -126,11 +163,12 @@ async def favicon():
 
 @app.get("/health")
 async def health_check():
-    """Verificar estado del servicio"""
+    """Verificar estado del servicio (liveness: no fuerza la carga de modelos)"""
     model_stats = ml_models.get_model_stats()
     
     return {
         "status": "healthy",
+        "ready": ml_models.is_ready(),
         "service": "tavit-platform-v2",
         "version": "2.0.0",
         "timestamp": datetime.now().isoformat(),
@@ -140,12 +178,126 @@ async def health_check():
             "openai": bool(OPENAI_API_KEY)
         },
         "ml_models": {
-            "fraud_model_loaded": ml_models.fraud_model is not None,
-            "risk_model_loaded": ml_models.risk_model is not None,
-            "model_accuracy": model_stats["fraud_model"]["accuracy"]
+            "fraud_model_loaded": model_stats["fraud_model"]["loaded"],
+            "risk_model_loaded": model_stats["risk_model"]["loaded"],
+            "model_accuracy": model_stats["fraud_model"]["accuracy"],
+            "state": model_stats["state"]
         }
     }
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 503 hasta que los modelos estén cargados en memoria"""
+    ready = ml_models.is_ready()
+    
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "ready": ready,
+            "state": ml_models.get_model_stats()["state"],
+            "timestamp": datetime.now().isoformat()
+        }
+    )
+
+# Funciones auxiliares de detección de fraude
+async def fetch_fraud_osint(request: FraudCheckRequest) -> Dict[str, int]:
+    """Búsqueda OSINT con SerpAPI y extracción de señales para el modelo de fraude"""
+    search_query = f"{request.nombre} {request.documento}"
+    if request.ubicacion:
+        search_query += f" {request.ubicacion}"
+    
+    serpapi_params = {
+        "q": search_query,
+        "api_key": SERPAPI_KEY,
+        "num": 10,
+        "hl": "es"
+    }
+    
+    response = await serpapi_cache.get(serpapi_params, timeout=30.0)
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=f"Error en SerpAPI: {response.status_code}")
+    
+    data = response.json()
+    organic_results = data.get("organic_results", [])
+    news_results = data.get("news_results", [])
+    
+    # Extraer features para CatBoost: palabras negativas distintas por resultado (una pasada por texto)
+    menciones_negativas = 0
+    negative_keywords = keyword_registry.get("fraud_negative", "es")
+    
+    for result in organic_results + news_results:
+        text = f"{result.get('title', '')}\n{result.get('snippet', '')}"
+        menciones_negativas += len(negative_keywords.distinct(text))
+    
+    return {
+        "fuentes_consultadas": len(organic_results),
+        "menciones_negativas": menciones_negativas,
+        "presencia_digital_score": len(organic_results) * 10
+    }
+
+def build_fraud_features(request: FraudCheckRequest, osint: Optional[Dict[str, int]],
+                         velocity: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Preparar features para el modelo CatBoost"""
+    features = {
+        "edad": 35,  # Por defecto, en producción obtener del request
+        "monto": request.monto or 50000,
+        "historial_años": 5,
+        "cambios_direccion": 1,
+        "registros_judiciales": 0,  # Se obtendrá de CourtListener
+        "variacion_datos": 0.1,
+        "frecuencia_solicitudes": 1
+    }
+    
+    # Sin OSINT se usan los valores por defecto del modelo
+    if osint is not None:
+        features["menciones_negativas"] = osint["menciones_negativas"]
+        features["presencia_digital"] = osint["presencia_digital_score"]
+    
+    # Historial del solicitante (frecuencia, cambios de dirección, variación de datos)
+    if velocity is not None:
+        features.update(velocity_features(velocity))
+    
+    return features
+
+def build_fraud_result(request: FraudCheckRequest, osint: Optional[Dict[str, int]],
+                       ml_prediction: Dict[str, Any],
+                       velocity: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Combinar análisis OSINT con predicción ML"""
+    fraud_score = int(ml_prediction["fraud_score"])
+    
+    # Determinar nivel de riesgo
+    if fraud_score >= 70:
+        risk_level = "ALTO"
+        recommendation = "NO EMITIR - Alto riesgo detectado por IA"
+    elif fraud_score >= 40:
+        risk_level = "MEDIO"
+        recommendation = "REVISAR MANUALMENTE - Indicadores de riesgo detectados"
+    else:
+        risk_level = "BAJO"
+        recommendation = "APROBAR - Sin indicadores significativos"
+    
+    return {
+        "cliente": {
+            "nombre": request.nombre,
+            "documento": request.documento,
+            "ubicacion": request.ubicacion
+        },
+        "resultado": {
+            "nivel_riesgo": risk_level,
+            "fraud_score": fraud_score,
+            "recomendacion": recommendation
+        },
+        "ml_prediction": {
+            "fraud_probability": ml_prediction["fraud_probability"],
+            "confidence": ml_prediction["confidence"],
+            "model_version": ml_prediction["model_version"],
+            "algorithm": "CatBoost Gradient Boosting"
+        },
+        "osint_analysis": osint,
+        "velocity": velocity
+    }
+
 @app.post("/api/v1/fraud-check")
 async def fraud_check(request: FraudCheckRequest):
     """
@@ -156,102 +308,164 @@ async def fraud_check(request: FraudCheckRequest):
     """
     try:
         # Búsqueda OSINT con SerpAPI
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            search_query = f"{request.nombre} {request.documento}"
-            if request.ubicacion:
-                search_query += f" {request.ubicacion}"
-            
-            serpapi_params = {
-                "q": search_query,
-                "api_key": SERPAPI_KEY,
-                "num": 10,
-                "hl": "es"
-            }
-            
-            response = await client.get(
-                "https://serpapi.com/search",
-                params=serpapi_params
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Error en SerpAPI: {response.status_code}")
-            
-            data = response.json()
-            organic_results = data.get("organic_results", [])
-            news_results = data.get("news_results", [])
-            
-            # Extraer features para CatBoost
-            menciones_negativas = 0
-            negative_keywords = ["fraude", "estafa", "demanda", "condena", "ilegal", "investigación"]
-            
-            for result in organic_results + news_results:
-                title = result.get("title", "").lower()
-                snippet = result.get("snippet", "").lower()
-                for keyword in negative_keywords:
-                    if keyword in title or keyword in snippet:
-                        menciones_negativas += 1
-            
-            # Preparar features para el modelo CatBoost
-            features = {
-                "edad": 35,  # Por defecto, en producción obtener del request
-                "monto": request.monto or 50000,
-                "historial_años": 5,
-                "cambios_direccion": 1,
-                "menciones_negativas": menciones_negativas,
-                "registros_judiciales": 0,  # Se obtendrá de CourtListener
-                "presencia_digital": len(organic_results) * 10,
-                "variacion_datos": 0.1,
-                "frecuencia_solicitudes": 1
-            }
-            
-            # Predicción con CatBoost
-            ml_prediction = ml_models.predict_fraud(features)
-            
-            # Combinar análisis OSINT con predicción ML
-            fraud_score = int(ml_prediction["fraud_score"])
-            
-            # Determinar nivel de riesgo
-            if fraud_score >= 70:
-                risk_level = "ALTO"
-                recommendation = "NO EMITIR - Alto riesgo detectado por IA"
-            elif fraud_score >= 40:
-                risk_level = "MEDIO"
-                recommendation = "REVISAR MANUALMENTE - Indicadores de riesgo detectados"
-            else:
-                risk_level = "BAJO"
-                recommendation = "APROBAR - Sin indicadores significativos"
-            
-            return {
-                "cliente": {
-                    "nombre": request.nombre,
-                    "documento": request.documento,
-                    "ubicacion": request.ubicacion
-                },
-                "resultado": {
-                    "nivel_riesgo": risk_level,
-                    "fraud_score": fraud_score,
-                    "recomendacion": recommendation
-                },
-                "ml_prediction": {
-                    "fraud_probability": ml_prediction["fraud_probability"],
-                    "confidence": ml_prediction["confidence"],
-                    "model_version": ml_prediction["model_version"],
-                    "algorithm": "CatBoost Gradient Boosting"
-                },
-                "osint_analysis": {
-                    "fuentes_consultadas": len(organic_results),
-                    "menciones_negativas": menciones_negativas,
-                    "presencia_digital_score": len(organic_results) * 10
-                },
-                "feature_importance": ml_prediction.get("feature_importance", {}),
-                "timestamp": datetime.now().isoformat()
-            }
-            
+        osint = await fetch_fraud_osint(request)
+        
+        # Registrar la solicitud en el historial del solicitante
+        velocity = await asyncio.to_thread(
+            feature_store.record, request.documento, request.nombre, request.ubicacion, request.monto
+        )
+        
+        # Predicción con CatBoost
+        features = build_fraud_features(request, osint, velocity)
+        ml_prediction = await inference.predict_fraud(features)
+        
+        return {
+            **build_fraud_result(request, osint, ml_prediction, velocity),
+            "feature_importance": ml_prediction.get("feature_importance", {}),
+            "timestamp": datetime.now().isoformat()
+        }
+        
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Timeout en consulta OSINT")
+    except ModelUnavailableError as e:
+        # Arranque con models/ vacío: los modelos se están entrenando en background
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.post("/api/v1/fraud-check/batch")
+async def fraud_check_batch(request: FraudCheckBatchRequest):
+    """
+    Detección de Fraude por lotes (carteras completas de solicitantes)
+    
+    El enriquecimiento OSINT se ejecuta en paralelo con concurrencia acotada
+    y todas las filas se puntúan con una sola pasada del modelo.
+    """
+    try:
+        start_time = datetime.now()
+        applicants = request.solicitantes
+        osint_results: List[Optional[Dict[str, int]]] = [None] * len(applicants)
+        osint_errors: Dict[int, str] = {}
+        
+        if not request.omitir_osint:
+            semaphore = asyncio.Semaphore(BATCH_OSINT_CONCURRENCY)
+            
+            async def enrich(index: int, applicant: FraudCheckRequest):
+                async with semaphore:
+                    try:
+                        osint_results[index] = await fetch_fraud_osint(applicant)
+                    except HTTPException as e:
+                        osint_errors[index] = str(e.detail)
+                    except httpx.TimeoutException:
+                        osint_errors[index] = "Timeout en consulta OSINT"
+                    except Exception as e:
+                        osint_errors[index] = str(e)
+            
+            await asyncio.gather(*[enrich(i, a) for i, a in enumerate(applicants)])
+        
+        # Registrar el lote en orden: un solicitante repetido en el lote cuenta sus solicitudes
+        velocities = await asyncio.to_thread(feature_store.record_many, [
+            (applicant.documento, applicant.nombre, applicant.ubicacion, applicant.monto)
+            for applicant in applicants
+        ])
+        
+        # Una sola pasada del modelo para todo el lote
+        features_list = [
+            build_fraud_features(applicant, osint_results[i], velocities[i])
+            for i, applicant in enumerate(applicants)
+        ]
+        predictions = await inference.predict_fraud_batch(features_list)
+        
+        results = []
+        for i, (applicant, prediction) in enumerate(zip(applicants, predictions)):
+            row = build_fraud_result(applicant, osint_results[i], prediction, velocities[i])
+            if i in osint_errors:
+                row["osint_error"] = osint_errors[i]
+            results.append(row)
+        
+        return {
+            "total_solicitantes": len(applicants),
+            "osint_consultado": not request.omitir_osint,
+            "errores_osint": len(osint_errors),
+            "resultados": results,
+            "feature_importance": predictions[0].get("feature_importance", {}) if predictions else {},
+            # Con ML_MODELS=demo el lote se puntúa fila a fila (simulación, sin pasada vectorizada)
+            "inferencia_vectorizada": ML_MODELS_MODE != "demo",
+            "tiempo_procesamiento_ms": round((datetime.now() - start_time).total_seconds() * 1000, 2),
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+# Funciones auxiliares de scoring de riesgo
+async def fetch_risk_osint_score(request: RiskScoreRequest) -> int:
+    """Búsqueda OSINT adicional para el score de riesgo"""
+    search_query = f"{request.nombre} seguro {request.tipo_poliza}"
+    serpapi_params = {
+        "q": search_query,
+        "api_key": SERPAPI_KEY,
+        "num": 5,
+        "hl": "es"
+    }
+    
+    response = await serpapi_cache.get(serpapi_params, timeout=20.0)
+    osint_score = DEFAULT_OSINT_SCORE
+    
+    if response.status_code == 200:
+        results = response.json().get("organic_results", [])
+        osint_score = min(100, len(results) * 15)
+    
+    return osint_score
+
+def build_risk_result(request: RiskScoreRequest, features: Dict[str, Any],
+                      ml_prediction: Dict[str, Any]) -> Dict[str, Any]:
+    """Clasificar el score predicho y armar la respuesta"""
+    final_score = ml_prediction["risk_score"]
+    
+    # Clasificación
+    if final_score >= 750:
+        classification = "EXCELENTE"
+        approval_rate = 95
+        premium_adjustment = 0.8
+    elif final_score >= 650:
+        classification = "BUENO"
+        approval_rate = 85
+        premium_adjustment = 1.0
+    elif final_score >= 550:
+        classification = "REGULAR"
+        approval_rate = 60
+        premium_adjustment = 1.3
+    elif final_score >= 450:
+        classification = "RIESGOSO"
+        approval_rate = 30
+        premium_adjustment = 1.6
+    else:
+        classification = "ALTO RIESGO"
+        approval_rate = 10
+        premium_adjustment = 2.0
+    
+    return {
+        "cliente": {
+            "nombre": request.nombre,
+            "edad": request.edad,
+            "tipo_poliza": request.tipo_poliza
+        },
+        "risk_score": final_score,
+        "clasificacion": classification,
+        "probabilidad_aprobacion": approval_rate,
+        "ajuste_prima_sugerido": premium_adjustment,
+        "ml_prediction": {
+            "confidence": ml_prediction["confidence"],
+            "model_version": ml_prediction["model_version"],
+            "algorithm": "CatBoost Regression"
+        },
+        "desglose_features": features,
+        "recomendacion": f"Score {final_score}/850 - {classification}"
+    }
+
 @app.post("/api/v1/risk-score")
 async def risk_score(request: RiskScoreRequest):
     """
@@ -261,199 +475,247 @@ async def risk_score(request: RiskScoreRequest):
     basado en múltiples factores y análisis OSINT.
     """
     try:
-        # Mapear historial crediticio a score
-        credit_scores = {
-            "excelente": 800,
-            "bueno": 700,
-            "regular": 600,
-            "malo": 450,
-            None: 600
-        }
-        historial_score = credit_scores.get(request.historial_credito, 600)
-        
-        # Mapear tipo de póliza a score
-        policy_scores = {
-            "vida": 70,
-            "salud": 60,
-            "auto": 50,
-            "propiedad": 65,
-            "otro": 50
+        # Búsqueda OSINT adicional
+        osint_score = await fetch_risk_osint_score(request)
+        
+        # Predicción con CatBoost
+        features = risk_features(request, osint_score)
+        ml_prediction = await inference.predict_risk_score(features)
+        
+        return {
+            **build_risk_result(request, features, ml_prediction),
+            "feature_importance": ml_prediction.get("feature_importance", {}),
+            "timestamp": datetime.now().isoformat()
         }
-        tipo_poliza_score = policy_scores.get(request.tipo_poliza.lower(), 50)
         
-        # Búsqueda OSINT adicional
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            search_query = f"{request.nombre} seguro {request.tipo_poliza}"
-            serpapi_params = {
-                "q": search_query,
-                "api_key": SERPAPI_KEY,
-                "num": 5,
-                "hl": "es"
-            }
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+
+@app.post("/api/v1/risk-score/batch")
+async def risk_score_batch(request: RiskScoreBatchRequest):
+    """
+    Cálculo de Score de Riesgo por lotes (re-rating nocturno de la cartera)
+    
+    Las features de todo el lote se construyen en una matriz columnar y se
+    puntúan con una sola pasada del regresor.
+    """
+    try:
+        start_time = datetime.now()
+        applicants = request.solicitantes
+        osint_scores: List[Optional[int]] = [None] * len(applicants)
+        
+        if not request.omitir_osint:
+            semaphore = asyncio.Semaphore(BATCH_OSINT_CONCURRENCY)
             
-            response = await client.get("https://serpapi.com/search", params=serpapi_params)
-            osint_score = 50
+            async def enrich(index: int, applicant: RiskScoreRequest):
+                async with semaphore:
+                    try:
+                        osint_scores[index] = await fetch_risk_osint_score(applicant)
+                    except Exception:
+                        osint_scores[index] = None
             
-            if response.status_code == 200:
-                results = response.json().get("organic_results", [])
-                osint_score = min(100, len(results) * 15)
+            await asyncio.gather(*[enrich(i, a) for i, a in enumerate(applicants)])
         
-        # Preparar features para CatBoost
-        features = {
-            "edad": request.edad,
-            "historial_credito_score": historial_score,
-            "años_experiencia": max(0, request.edad - 25),
-            "ingresos_anuales": request.ingresos_anuales or 50000,
-            "deuda_ratio": 0.3,
-            "tipo_poliza_score": tipo_poliza_score,
-            "ubicacion_risk_score": 50,
-            "osint_score": osint_score
-        }
-        
-        # Predicción con CatBoost
-        ml_prediction = ml_models.predict_risk_score(features)
-        final_score = ml_prediction["risk_score"]
-        
-        # Clasificación
-        if final_score >= 750:
-            classification = "EXCELENTE"
-            approval_rate = 95
-            premium_adjustment = 0.8
-        elif final_score >= 650:
-            classification = "BUENO"
-            approval_rate = 85
-            premium_adjustment = 1.0
-        elif final_score >= 550:
-            classification = "REGULAR"
-            approval_rate = 60
-            premium_adjustment = 1.3
-        elif final_score >= 450:
-            classification = "RIESGOSO"
-            approval_rate = 30
-            premium_adjustment = 1.6
-        else:
-            classification = "ALTO RIESGO"
-            approval_rate = 10
-            premium_adjustment = 2.0
+        # Una sola pasada del modelo para todo el lote
+        features_list = [
+            risk_features(applicant, osint_scores[i])
+            for i, applicant in enumerate(applicants)
+        ]
+        predictions = await inference.predict_risk_score_batch(features_list)
         
         return {
-            "cliente": {
-                "nombre": request.nombre,
-                "edad": request.edad,
-                "tipo_poliza": request.tipo_poliza
-            },
-            "risk_score": final_score,
-            "clasificacion": classification,
-            "probabilidad_aprobacion": approval_rate,
-            "ajuste_prima_sugerido": premium_adjustment,
-            "ml_prediction": {
-                "confidence": ml_prediction["confidence"],
-                "model_version": ml_prediction["model_version"],
-                "algorithm": "CatBoost Regression"
-            },
-            "desglose_features": features,
-            "feature_importance": ml_prediction.get("feature_importance", {}),
-            "recomendacion": f"Score {final_score}/850 - {classification}",
+            "total_solicitantes": len(applicants),
+            "osint_consultado": not request.omitir_osint,
+            "resultados": [
+                build_risk_result(applicant, features, prediction)
+                for applicant, features, prediction in zip(applicants, features_list, predictions)
+            ],
+            "feature_importance": predictions[0].get("feature_importance", {}) if predictions else {},
+            # Con ML_MODELS=demo el lote se puntúa fila a fila (simulación, sin pasada vectorizada)
+            "inferencia_vectorizada": ML_MODELS_MODE != "demo",
+            "tiempo_procesamiento_ms": round((datetime.now() - start_time).total_seconds() * 1000, 2),
             "timestamp": datetime.now().isoformat()
         }
         
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+def compliance_budgets(deadline_ms: int) -> Dict[str, float]:
+    """Presupuesto por proveedor (segundos) derivado del deadline de la solicitud"""
+    available_ms = max(deadline_ms - COMPLIANCE_CONFIG["assembly_margin_ms"], COMPLIANCE_CONFIG["min_budget_ms"])
+    return {
+        provider: max(available_ms * share, COMPLIANCE_CONFIG["min_budget_ms"]) / 1000
+        for provider, share in COMPLIANCE_CONFIG["budget_share"].items()
+    }
+
 @app.post("/api/v1/compliance-verify")
 async def compliance_verify(request: ComplianceVerifyRequest):
     """
     Verificación de Cumplimiento Legal con CourtListener + IA
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # CourtListener
-            headers = {
-                "Authorization": f"Token {COURTLISTENER_TOKEN}",
-                "User-Agent": COURTLISTENER_UA
-            }
-            
-            params = {
-                "q": request.nombre,
-                "type": "o" if request.tipo == "empresa" else "p",
-                "order_by": "dateFiled desc"
-            }
-            
-            response = await client.get(
-                "https://www.courtlistener.com/api/rest/v3/search/",
-                headers=headers,
-                params=params
+        deadline_ms = request.deadline_ms or COMPLIANCE_CONFIG["deadline_ms"]
+        budgets = compliance_budgets(deadline_ms)
+        
+        # Listas de sanciones locales (índice en memoria, sin llamada externa)
+        sanctions = watchlists.screen(request.nombre, request.tipo)
+        
+        # CourtListener y SerpAPI en paralelo; run_source cancela la llamada que agota su presupuesto.
+        # La búsqueda web de sanciones solo se usa mientras no hay listas locales cargadas.
+        # Con el espejo de expedientes cargado se busca sin tipo (personas y empresas figuran como
+        # partes de los expedientes) para responder desde el espejo y no desde la API
+        if await asyncio.to_thread(courtlistener_mirror.loaded):
+            case_type = None
+        else:
+            case_type = "o" if request.tipo == "empresa" else "p"
+        searches = [
+            run_source(
+                "legal", request.nombre, 10,
+                timeout=budgets["courtlistener"],
+                case_type=case_type
             )
-            
-            compliance_issues = []
-            legal_records_found = 0
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get("results", [])
-                legal_records_found = len(results)
-                
-                concern_keywords = ["fraude", "negligencia", "demanda", "sanción", "multa", "violación"]
-                
-                for record in results[:10]:
-                    case_name = record.get("caseName", "")
-                    for keyword in concern_keywords:
-                        if keyword in case_name.lower():
-                            compliance_issues.append({
-                                "tipo": "registro_judicial",
-                                "caso": case_name,
-                                "fecha": record.get("dateFiled", ""),
-                                "corte": record.get("court", ""),
-                                "severidad": "alta" if keyword in ["fraude", "sanción"] else "media"
-                            })
-            
-            # SerpAPI para sanciones regulatorias
-            serpapi_params = {
-                "q": f"{request.nombre} sanción regulatoria multa",
-                "api_key": SERPAPI_KEY,
-                "num": 5,
-                "hl": "es"
-            }
-            
-            serp_response = await client.get("https://serpapi.com/search", params=serpapi_params)
-            regulatory_mentions = 0
-            
-            if serp_response.status_code == 200:
-                regulatory_mentions = len(serp_response.json().get("organic_results", []))
-            
-            # Determinar status
-            if len(compliance_issues) >= 3:
-                compliance_status = "NO CUMPLE"
-                recommendation = "RECHAZAR - Múltiples problemas legales"
-                risk_level = "ALTO"
-            elif len(compliance_issues) >= 1:
-                compliance_status = "REQUIERE REVISIÓN"
-                recommendation = "REVISIÓN MANUAL - Verificar registros"
-                risk_level = "MEDIO"
-            else:
-                compliance_status = "CUMPLE"
-                recommendation = "APROBAR - Sin registros preocupantes"
-                risk_level = "BAJO"
-            
-            return {
-                "entidad": {
-                    "nombre": request.nombre,
-                    "tipo": request.tipo
-                },
-                "compliance_status": compliance_status,
-                "nivel_riesgo_legal": risk_level,
-                "recomendacion": recommendation,
-                "registros_judiciales_encontrados": legal_records_found,
-                "problemas_identificados": len(compliance_issues),
-                "detalles_problemas": compliance_issues[:5],
-                "menciones_regulatorias": regulatory_mentions,
-                "fuentes_consultadas": ["CourtListener", "SerpAPI", "OSINT"],
-                "timestamp": datetime.now().isoformat()
-            }
-            
+        ]
+        if not watchlists.loaded:
+            searches.append(run_source(
+                "web", f"{request.nombre} sanción regulatoria multa", 5,
+                timeout=budgets["serpapi"]
+            ))
+        legal, *regulatory = await asyncio.gather(*searches)
+        
+        compliance_issues = []
+        # Registros revisados (los devueltos, como siempre); el total del proveedor va aparte
+        legal_records_found = len(legal["items"])
+        # Los casos de CourtListener están en inglés: se combinan las listas es + en
+        concern_keywords = keyword_registry.get("compliance_concern", "es", "en")
+        
+        for record in legal["items"]:
+            case_name = record.get("case_name") or ""
+            for keyword in concern_keywords.distinct(case_name):
+                compliance_issues.append({
+                    "tipo": "registro_judicial",
+                    "caso": case_name,
+                    "fecha": record.get("date_filed") or "",
+                    "corte": record.get("court") or "",
+                    "severidad": "alta" if "alta" in concern_keywords.categories_of(keyword) else "media"
+                })
+        
+        providers = {"CourtListener": (legal, budgets["courtlistener"])}
+        # menciones_regulatorias sigue siendo el conteo de resultados web (None si la búsqueda
+        # se omite porque hay listas cargadas); las coincidencias van en listas_sanciones
+        regulatory_mentions = None
+        if regulatory:
+            providers["SerpAPI"] = (regulatory[0], budgets["serpapi"])
+            regulatory_mentions = regulatory[0]["total"]
+        degraded = any(outcome["status"] != "ok" for outcome, _ in providers.values())
+        
+        # Determinar status
+        if sanctions["bloqueante"]:
+            compliance_status = "NO CUMPLE"
+            recommendation = "RECHAZAR - Coincidencia en listas de sanciones"
+            risk_level = "ALTO"
+        elif len(compliance_issues) >= 3:
+            compliance_status = "NO CUMPLE"
+            recommendation = "RECHAZAR - Múltiples problemas legales"
+            risk_level = "ALTO"
+        elif len(compliance_issues) >= 1 or sanctions["coincidencias"]:
+            compliance_status = "REQUIERE REVISIÓN"
+            recommendation = "REVISIÓN MANUAL - Verificar registros"
+            risk_level = "MEDIO"
+        elif legal["status"] != "ok":
+            # Sin verificación judicial no se puede aprobar automáticamente
+            compliance_status = "REQUIERE REVISIÓN"
+            recommendation = "REVISIÓN MANUAL - Verificación judicial incompleta"
+            risk_level = "MEDIO"
+        else:
+            compliance_status = "CUMPLE"
+            recommendation = "APROBAR - Sin registros preocupantes"
+            risk_level = "BAJO"
+        
+        return {
+            "entidad": {
+                "nombre": request.nombre,
+                "tipo": request.tipo
+            },
+            "compliance_status": compliance_status,
+            "nivel_riesgo_legal": risk_level,
+            "recomendacion": recommendation,
+            "registros_judiciales_encontrados": legal_records_found,
+            # Coincidencias totales según CourtListener (puede superar los registros revisados)
+            "registros_judiciales_totales": legal["total"],
+            "problemas_identificados": len(compliance_issues),
+            "detalles_problemas": compliance_issues[:5],
+            "menciones_regulatorias": regulatory_mentions,
+            "listas_sanciones": sanctions,
+            "fuentes_consultadas": [name for name, (outcome, _) in providers.items() if outcome["status"] == "ok"]
+                                   + (["Listas de sanciones"] if watchlists.loaded else []),
+            "respuesta_degradada": degraded,
+            "proveedores": {
+                name: {
+                    "estado": outcome["status"],
+                    "tiempo_ms": outcome["elapsed_ms"],
+                    "presupuesto_ms": round(budget * 1000),
+                    "error": outcome["error"]
+                }
+                for name, (outcome, budget) in providers.items()
+            },
+            "deadline_ms": deadline_ms,
+            "timestamp": datetime.now().isoformat()
+        }
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+# Fuentes del data crawler: {fuente solicitada: (plugin de osint_sources, opciones)}
+CRAWLER_SOURCES = {
+    "web": ("web", {"limit": 15}),
+    "noticias": ("news", {}),
+    "legal": ("legal", {}),
+    "github": ("github", {"search_type": "users"})
+}
+
+def build_crawler_section(fuente: str, outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Formatear el resultado normalizado de un plugin con las claves del crawler"""
+    items = outcome["items"][:10]
+    
+    if fuente == "web":
+        return {
+            "total_encontrados": outcome["total"],
+            "resultados": [
+                {"titulo": r["title"], "descripcion": r["snippet"], "url": r["link"], "fecha": r["date"]}
+                for r in items
+            ]
+        }
+    
+    if fuente == "noticias":
+        return {
+            "total_encontrados": outcome["total"],
+            "articulos": [
+                {"titulo": a["title"], "fuente": a["provider"], "fecha": a["date"], "url": a["link"]}
+                for a in items
+            ]
+        }
+    
+    if fuente == "legal":
+        return {
+            "total_encontrados": outcome["total"],
+            "registros": [
+                {"caso": r["case_name"], "fecha": r["date_filed"], "corte": r["court"]}
+                for r in items
+            ]
+        }
+    
+    return {
+        "total_encontrados": outcome["total"],
+        "perfiles": [
+            {"usuario": p["username"], "url": p["profile_url"], "tipo": p["type"]}
+            for p in items
+        ]
+    }
+
 @app.post("/api/v1/data-crawler")
 async def data_crawler(request: DataCrawlerRequest):
     """
@@ -470,107 +732,40 @@ async def data_crawler(request: DataCrawlerRequest):
             "timestamp": datetime.now().isoformat()
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            # Web General
-            if "web" in request.fuentes:
-                response = await client.get(
-                    "https://serpapi.com/search",
-                    params={"q": request.nombre, "api_key": SERPAPI_KEY, "num": 15, "hl": "es"}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    web_results = [
-                        {
-                            "titulo": r.get("title"),
-                            "descripcion": r.get("snippet"),
-                            "url": r.get("link"),
-                            "fecha": r.get("date")
-                        }
-                        for r in data.get("organic_results", [])[:10]
-                    ]
-                    
-                    collected_data["resultados"]["web"] = {
-                        "total_encontrados": len(data.get("organic_results", [])),
-                        "resultados": web_results
-                    }
-            
-            # Noticias
-            if "noticias" in request.fuentes:
-                response = await client.get(
-                    "https://serpapi.com/search",
-                    params={"q": request.nombre, "api_key": SERPAPI_KEY, "tbm": "nws", "num": 10, "hl": "es"}
-                )
-                
-                if response.status_code == 200:
-                    news_data = response.json()
-                    news_results = [
-                        {
-                            "titulo": a.get("title"),
-                            "fuente": a.get("source"),
-                            "fecha": a.get("date"),
-                            "url": a.get("link")
-                        }
-                        for a in news_data.get("news_results", [])[:10]
-                    ]
-                    
-                    collected_data["resultados"]["noticias"] = {
-                        "total_encontrados": len(news_data.get("news_results", [])),
-                        "articulos": news_results
-                    }
-            
-            # Registros Legales
-            if "legal" in request.fuentes:
-                headers = {
-                    "Authorization": f"Token {COURTLISTENER_TOKEN}",
-                    "User-Agent": COURTLISTENER_UA
-                }
-                
-                response = await client.get(
-                    "https://www.courtlistener.com/api/rest/v3/search/",
-                    headers=headers,
-                    params={"q": request.nombre, "order_by": "dateFiled desc"}
-                )
-                
-                if response.status_code == 200:
-                    legal_data = response.json()
-                    legal_results = [
-                        {
-                            "caso": r.get("caseName"),
-                            "fecha": r.get("dateFiled"),
-                            "corte": r.get("court")
-                        }
-                        for r in legal_data.get("results", [])[:10]
-                    ]
-                    
-                    collected_data["resultados"]["legal"] = {
-                        "total_encontrados": len(legal_data.get("results", [])),
-                        "registros": legal_results
-                    }
-            
-            # GitHub (si está disponible)
-            if "github" in request.fuentes:
-                collected_data["resultados"]["github"] = {
-                    "nota": "Requiere autenticación GitHub API",
-                    "total_encontrados": 0
-                }
-            
-            # Resumen
-            total_sources = len(collected_data["resultados"])
-            total_records = sum(
-                result.get("total_encontrados", 0)
-                for result in collected_data["resultados"].values()
-            )
-            
-            collected_data["resumen"] = {
-                "fuentes_consultadas": total_sources,
-                "total_registros_encontrados": total_records,
-                "cobertura": "ALTA" if total_records > 20 else "MEDIA" if total_records > 5 else "BAJA",
-                "recomendacion": "Suficiente información para análisis" if total_records > 10 else "Búsqueda manual adicional recomendada"
-            }
-            
-            return collected_data
-            
+        # Cada fuente solicitada es una tarea independiente con su propio timeout
+        plan = {fuente: CRAWLER_SOURCES[fuente] for fuente in request.fuentes if fuente in CRAWLER_SOURCES}
+        outcomes = await fan_out(plan, request.nombre)
+        
+        # Ensamblado de resultados parciales: las fuentes fallidas se reportan aparte
+        collected_data["fuentes_fallidas"] = {
+            fuente: {"estado": "no_soportada", "error": "Fuente no disponible en el crawler"}
+            for fuente in request.fuentes if fuente not in CRAWLER_SOURCES
+        }
+        collected_data["tiempos_ms"] = {}
+        
+        for fuente, outcome in outcomes.items():
+            collected_data["tiempos_ms"][fuente] = outcome["elapsed_ms"]
+            if outcome["status"] == "ok":
+                collected_data["resultados"][fuente] = build_crawler_section(fuente, outcome)
+            else:
+                collected_data["fuentes_fallidas"][fuente] = {"estado": outcome["status"], "error": outcome["error"]}
+        
+        # Resumen
+        total_sources = len(collected_data["resultados"])
+        total_records = sum(
+            result.get("total_encontrados", 0)
+            for result in collected_data["resultados"].values()
+        )
+        
+        collected_data["resumen"] = {
+            "fuentes_consultadas": total_sources,
+            "total_registros_encontrados": total_records,
+            "cobertura": "ALTA" if total_records > 20 else "MEDIA" if total_records > 5 else "BAJA",
+            "recomendacion": "Suficiente información para análisis" if total_records > 10 else "Búsqueda manual adicional recomendada"
+        }
+        
+        return collected_data
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
@@ -579,7 +774,10 @@ async def get_model_stats():
     """
     Estadísticas de los modelos CatBoost
     """
-    return ml_models.get_model_stats()
+    return {
+        **ml_models.get_model_stats(),
+        "inference": inference.get_stats()
+    }
 
 # Modelos Pydantic para Stripe
 class StripeCheckoutRequest(BaseModel):
@@ -601,28 +799,28 @@ async def create_checkout_session(request: StripeCheckoutRequest):
         if not supabase_url:
             raise HTTPException(status_code=500, detail="Configuración de Supabase faltante")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{supabase_url}/functions/v1/stripe-checkout",
-                json={
-                    "companyId": request.company_id,
-                    "planType": request.plan_type,
-                    "billingPeriod": request.billing_period,
-                    "email": request.email,
-                    "companyName": request.company_name
-                },
-                headers={
-                    "Authorization": f"Bearer {os.getenv('SUPABASE_ANON_KEY')}",
-                    "Content-Type": "application/json"
-                }
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                raise HTTPException(status_code=response.status_code, detail=f"Error en checkout: {error_detail}")
-            
-            return response.json()
-            
+        client = get_http_client("supabase")
+        response = await client.post(
+            f"{supabase_url}/functions/v1/stripe-checkout",
+            json={
+                "companyId": request.company_id,
+                "planType": request.plan_type,
+                "billingPeriod": request.billing_period,
+                "email": request.email,
+                "companyName": request.company_name
+            },
+            headers={
+                "Authorization": f"Bearer {os.getenv('SUPABASE_ANON_KEY')}",
+                "Content-Type": "application/json"
+            }
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            raise HTTPException(status_code=response.status_code, detail=f"Error en checkout: {error_detail}")
+        
+        return response.json()
+        
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Error de conexión: {str(e)}")
     except Exception as e:
@@ -771,93 +969,119 @@ async def get_subscription_plans():
         "webhookUrl": f"{os.getenv('SUPABASE_URL')}/functions/v1/stripe-webhook"
     }
 
-# WebSocket para actualizaciones en tiempo real
-class WebSocketManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-    
-    async def broadcast(self, data: dict):
-        if self.active_connections:
-            message = json.dumps(data)
-            disconnected = []
-            for connection in self.active_connections:
-                try:
-                    await connection.send_text(message)
-                except:
-                    disconnected.append(connection)
-            
-            # Limpiar conexiones desconectadas
-            for conn in disconnected:
-                self.disconnect(conn)
+# WebSocket para actualizaciones en tiempo real (dashboard_hub: un productor, una cola por cliente)
+async def ws_osint_search(client: DashboardClient, message: dict):
+    """Búsqueda OSINT en streaming sobre el WebSocket: un frame por fuente y un resumen"""
+    request_id = message.get("request_id")
+    try:
+        request = OSINTSearchRequest(**{
+            key: message[key] for key in ("query", "sources", "depth", "time_range") if key in message
+        })
+        async for frame in stream_osint_search(request):
+            await client.send({**frame, "request_id": request_id})
+    except asyncio.CancelledError:
+        raise
+    except ConnectionError:
+        # Cliente desconectado: no hay a quién enviar el frame de error
+        return
+    except Exception as e:
+        await client.send({
+            "type": "error",
+            "request_id": request_id,
+            "detail": f"Error en búsqueda OSINT: {str(e)}"
+        })
 
-manager = WebSocketManager()
+async def ws_receive_loop(client: DashboardClient, searches: set):
+    """
+    Mensajes del cliente:
+    {"type": "osint_search", "request_id": ..., "query": ..., "sources": [...], "depth": ...}
+    {"type": "ping"}
+    """
+    while True:
+        text = await client.websocket.receive_text()
+        try:
+            message = json.loads(text)
+        except ValueError:
+            await client.send({"type": "error", "detail": "Mensaje JSON inválido"})
+            continue
+        
+        if message.get("type") == "osint_search":
+            task = asyncio.create_task(ws_osint_search(client, message))
+            searches.add(task)
+            task.add_done_callback(searches.discard)
+        elif message.get("type") == "ping":
+            await client.send({"type": "pong", "timestamp": datetime.now().isoformat()})
+        else:
+            await client.send({"type": "error", "detail": f"Tipo de mensaje desconocido: {message.get('type')}"})
 
 @app.websocket("/ws/dashboard")
 async def dashboard_websocket(websocket: WebSocket):
     """
     WebSocket para actualizaciones en tiempo real del dashboard
+    y búsquedas OSINT en streaming solicitadas por el cliente
     """
-    await manager.connect(websocket)
+    client = await dashboard_hub.connect(websocket)
+    searches: set = set()
+    receiver = asyncio.create_task(ws_receive_loop(client, searches))
     try:
-        while True:
-            # Enviar actualizaciones cada 30 segundos
-            await asyncio.sleep(30)
-            
-            # Obtener estado de APIs en tiempo real
-            from api_status import check_all_apis
-            api_status = await check_all_apis()
-            
-            # Enviar actualización
-            update = {
-                "type": "api_status_update",
-                "data": api_status,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            await websocket.send_text(json.dumps(update))
-            
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception as e:
-        print(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
-
-# Función para actualizar dashboard en tiempo real
-async def update_dashboard():
-    """Actualiza el dashboard con métricas en tiempo real"""
-    while True:
-        try:
-            # Obtener nuevos datos
-            from api_status import check_all_apis
-            api_status = await check_all_apis()
-            
-            # Broadcast a todos los clientes conectados
-            await manager.broadcast({
-                "type": "dashboard_update",
-                "api_status": api_status,
-                "timestamp": datetime.now().isoformat()
-            })
-            
-        except Exception as e:
-            print(f"Error en actualización dashboard: {e}")
-        
-        # Esperar 60 segundos antes de la próxima actualización
-        await asyncio.sleep(60)
+        # Termina cuando el cliente se desconecta o el hub lo corta por lento
+        done, _ = await asyncio.wait([receiver, client.sender], return_when=asyncio.FIRST_COMPLETED)
+        if receiver in done:
+            error = receiver.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"WebSocket error: {error}")
+    finally:
+        for task in [receiver, *searches]:
+            task.cancel()
+        await dashboard_hub.disconnect(client)
 
 # Iniciar tarea de background para actualizaciones
 @app.on_event("startup")
 async def startup_event():
     """Eventos de inicio de la aplicación"""
-    # Iniciar task de actualizaciones en background
-    asyncio.create_task(update_dashboard())
+    # Abrir pools HTTP compartidos por proveedor
+    await http_clients.start()
+    
+    # Barrido periódico de entradas vencidas en los caches en memoria
+    osint_cache.start_sweeper()
+    serpapi_cache.memory.start_sweeper()
+    
+    # Precargar modelos en background: el servidor acepta conexiones mientras tanto
+    asyncio.create_task(ml_models.warm_up())
+    
+    # Entrenar en background los modelos CatBoost que falten en disco (no aplica a la demo)
+    if ML_MODELS_MODE != "demo":
+        training_jobs.bootstrap(ml_models)
+    
+    # Productor único del estado de APIs para todos los WebSockets del dashboard
+    dashboard_hub.start()
+    
+    # Worker de investigaciones en este proceso (en modo external corren aparte)
+    if INVESTIGATION_CONFIG["worker_mode"] == "embedded":
+        investigation_worker.start()
+    
+    # Compactación periódica del historial de solicitantes
+    feature_store.start_compactor()
+    
+    # Carga y recarga de las listas de sanciones locales
+    watchlists.start_watcher()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Eventos de apagado de la aplicación"""
+    # Cerrar sesiones del dashboard, detener barridos de cache y cerrar conexiones keep-alive
+    await dashboard_hub.stop()
+    await investigation_worker.stop()
+    feature_store.stop_compactor()
+    watchlists.stop_watcher()
+    osint_cache.stop_sweeper()
+    serpapi_cache.memory.stop_sweeper()
+    await http_clients.aclose()
+    
+    # Liberar los pools de inferencia y entrenamiento
+    inference.shutdown()
+    training_jobs.shutdown()
+    entity_extractor.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
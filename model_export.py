@@ -0,0 +1,200 @@
+"""
+TAVIT Platform v3.1 - Exportación y Evaluación Compilada de Modelos
+Exporta los modelos CatBoost a formatos de inferencia ligeros (JSON/ONNX/Python)
+y evalúa los árboles oblivious exportados con numpy, sin catboost ni pandas
+"""
+
+from typing import Any, Dict, List, Optional
+import json
+import os
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración de exportación y backend de inferencia
+MODEL_EXPORT_CONFIG = {
+    # catboost: wrapper Python de CatBoost | compiled: evaluador numpy desde el export JSON
+    "backend": os.getenv("MODEL_BACKEND", "catboost"),
+    "formats": [fmt.strip() for fmt in os.getenv("MODEL_EXPORT_FORMATS", "json").split(",") if fmt.strip()],
+    # Filas evaluadas por bloque (acota la memoria temporal en lotes grandes)
+    "chunk_rows": int(os.getenv("COMPILED_MODEL_CHUNK_ROWS", "1024"))
+}
+
+MODEL_BACKENDS = ["catboost", "compiled"]
+
+# Extensión de archivo por formato de save_model de CatBoost
+EXPORT_EXTENSIONS = {
+    "json": "json",
+    "onnx": "onnx",
+    "python": "py",
+    "cpp": "cpp"
+}
+
+def export_path(models_dir: str, kind: str, fmt: str) -> str:
+    return os.path.join(models_dir, f"{kind}_model.{EXPORT_EXTENSIONS[fmt]}")
+
+def metadata_path(models_dir: str, kind: str) -> str:
+    return os.path.join(models_dir, f"{kind}_model.meta.json")
+
+def export_model(model: Any, kind: str, models_dir: str,
+                 formats: Optional[List[str]] = None) -> Dict[str, str]:
+    """
+    Exportar un modelo CatBoost entrenado a los formatos indicados.
+    Siempre escribe el JSON (lo usa el backend compilado) y un archivo de metadatos
+    con importancias y parámetros, que el export no incluye.
+    """
+    formats = formats or MODEL_EXPORT_CONFIG["formats"]
+    if "json" not in formats:
+        formats = ["json", *formats]
+
+    paths = {}
+    for fmt in formats:
+        if fmt not in EXPORT_EXTENSIONS:
+            raise ValueError(f"Formato de exportación no soportado: {fmt}")
+        path = export_path(models_dir, kind, fmt)
+        tmp_path = f"{path}.tmp"
+        model.save_model(tmp_path, format=fmt)
+        os.replace(tmp_path, path)
+        paths[fmt] = path
+
+    params = model.get_all_params()
+    metadata = {
+        "kind": kind,
+        "feature_importance": model.get_feature_importance().tolist(),
+        "params": {
+            "iterations": params.get("iterations"),
+            "learning_rate": params.get("learning_rate"),
+            "depth": params.get("depth"),
+            "loss_function": params.get("loss_function")
+        }
+    }
+    meta_path = metadata_path(models_dir, kind)
+    with open(f"{meta_path}.tmp", "w") as f:
+        json.dump(metadata, f)
+    os.replace(f"{meta_path}.tmp", meta_path)
+    paths["metadata"] = meta_path
+
+    return paths
+
+def is_export_current(models_dir: str, kind: str, source_path: str) -> bool:
+    """El export JSON existe y no es más antiguo que el .cbm de origen"""
+    json_path = export_path(models_dir, kind, "json")
+    meta_path = metadata_path(models_dir, kind)
+    if not (os.path.exists(json_path) and os.path.exists(meta_path)):
+        return False
+    return os.path.getmtime(json_path) >= os.path.getmtime(source_path)
+
+class CompiledTreeModel:
+    """
+    Evaluador de árboles oblivious exportados por CatBoost (formato JSON).
+    Trabaja directamente sobre matrices float de numpy y expone la misma interfaz
+    que usan los predictores (predict, predict_proba, get_feature_importance).
+    """
+
+    def __init__(self, model_json: Dict[str, Any], metadata: Dict[str, Any], is_classifier: bool):
+        self.is_classifier = is_classifier
+        self.metadata = metadata
+        self.chunk_rows = MODEL_EXPORT_CONFIG["chunk_rows"]
+
+        trees = model_json["oblivious_trees"]
+        self.tree_count_ = len(trees)
+        self.n_features = len(model_json["features_info"]["float_features"])
+
+        scale, bias = model_json.get("scale_and_bias", [1, [0]])
+        self.scale = float(scale)
+        self.bias = float(bias[0]) if bias else 0.0
+
+        # Cada split distinto (feature, border) se binariza una sola vez por fila
+        split_ids: Dict[tuple, int] = {}
+        depth = max(len(tree["splits"]) for tree in trees)
+        tree_splits = np.zeros((self.tree_count_, depth), dtype=np.intp)
+
+        # Tabla de hojas (árbol, 2^depth) aplanada; los árboles más bajos no usan el resto
+        leaf_table = np.zeros((self.tree_count_, 1 << depth), dtype=np.float64)
+
+        for t, tree in enumerate(trees):
+            for d, split in enumerate(tree["splits"]):
+                if split.get("split_type", "FloatFeature") != "FloatFeature":
+                    raise ValueError(f"Split no soportado: {split.get('split_type')}")
+                key = (split["float_feature_index"], split["border"])
+                tree_splits[t, d] = split_ids.setdefault(key, len(split_ids))
+            leaf_table[t, :len(tree["leaf_values"])] = tree["leaf_values"]
+
+        # Los niveles que no existen apuntan a una columna siempre falsa (bit 0)
+        padding = len(split_ids)
+        for t, tree in enumerate(trees):
+            tree_splits[t, len(tree["splits"]):] = padding
+
+        self.n_splits = len(split_ids)
+        self.split_features = np.array([feature for feature, _ in split_ids], dtype=np.intp)
+        self.split_borders = np.array([border for _, border in split_ids], dtype=np.float32)
+        self.tree_splits = tree_splits
+        self.tree_splits_by_depth = np.ascontiguousarray(tree_splits.T)
+        self.depth_weights = (1 << np.arange(depth)).astype(np.intp)
+        self.leaf_base = np.arange(self.tree_count_, dtype=np.intp) * (1 << depth)
+        self.leaf_values = leaf_table.ravel()
+        # uint8 alcanza para el índice de hoja hasta profundidad 8 (máximo por defecto: 6)
+        self.index_dtype = np.uint8 if depth <= 8 else np.intp
+
+    @classmethod
+    def load(cls, json_path: str, meta_path: str, is_classifier: bool) -> "CompiledTreeModel":
+        with open(json_path) as f:
+            model_json = json.load(f)
+        with open(meta_path) as f:
+            metadata = json.load(f)
+        return cls(model_json, metadata, is_classifier)
+
+    def _raw_row(self, x: np.ndarray) -> float:
+        """Una sola fila: ruta sin bucles por nivel (latencia mínima)"""
+        bits = np.zeros(self.n_splits + 1, dtype=np.intp)
+        bits[:-1] = x[self.split_features] > self.split_borders
+        leaf_index = bits[self.tree_splits] @ self.depth_weights
+        return self.leaf_values[leaf_index + self.leaf_base].sum()
+
+    def _raw_chunk(self, X: np.ndarray) -> np.ndarray:
+        """Bloque de filas: binarización split-major e índice de hoja construido por nivel"""
+        n_rows = X.shape[0]
+        binarized = np.zeros((self.n_splits + 1, n_rows), dtype=self.index_dtype)
+        binarized[:-1] = (X[:, self.split_features] > self.split_borders).T
+
+        # Índice de hoja: bit d = resultado del split d del árbol
+        leaf_index = np.zeros((self.tree_count_, n_rows), dtype=self.index_dtype)
+        for d, splits in enumerate(self.tree_splits_by_depth):
+            leaf_index |= binarized[splits] << d
+
+        flat_index = leaf_index.astype(np.intp)
+        flat_index += self.leaf_base[:, None]
+        return self.leaf_values.take(flat_index).sum(axis=0)
+
+    def predict_raw(self, X: np.ndarray) -> np.ndarray:
+        """Suma de hojas escalada (log-odds en clasificación, valor en regresión)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] == 1:
+            raw = np.array([self._raw_row(X[0])])
+        elif X.shape[0] <= self.chunk_rows:
+            raw = self._raw_chunk(X)
+        else:
+            raw = np.concatenate([
+                self._raw_chunk(X[start:start + self.chunk_rows])
+                for start in range(0, X.shape[0], self.chunk_rows)
+            ])
+        return raw * self.scale + self.bias
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = 1.0 / (1.0 + np.exp(-self.predict_raw(X)))
+        return np.column_stack([1.0 - proba, proba])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.is_classifier:
+            return (self.predict_raw(X) > 0).astype(np.int64)
+        return self.predict_raw(X)
+
+    def get_all_params(self) -> Dict[str, Any]:
+        return dict(self.metadata.get("params", {}))
+
+    def get_feature_importance(self) -> np.ndarray:
+        return np.array(self.metadata.get("feature_importance", [0.0] * self.n_features))
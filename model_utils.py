@@ -3,12 +3,26 @@ Utilidades para Modelos de Machine Learning con CatBoost
 TAVIT Platform - Sistema de Predicción de Riesgo y Fraude
 """
 
-from catboost import CatBoostClassifier, CatBoostRegressor, Pool
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any, Tuple
+from typing import TYPE_CHECKING, Dict, List, Any
+import asyncio
 import os
+import hashlib
+import threading
+import numpy as np
 from datetime import datetime
+from feature_builder import FRAUD_FEATURES, RISK_FEATURES, build_feature_matrix, feature_names
+from model_training import MODEL_KINDS, build_model
+from model_export import (
+    MODEL_BACKENDS, MODEL_EXPORT_CONFIG, CompiledTreeModel,
+    export_model, export_path, metadata_path, is_export_current
+)
+
+# catboost se importa al cargar el primer modelo y pandas solo se usa en re-entrenamiento
+if TYPE_CHECKING:
+    import pandas as pd
+
+class ModelUnavailableError(RuntimeError):
+    """Modelo aún sin entrenar (arranque con models/ vacío): la API responde 503"""
 
 class TAVITMLModels:
     """Clase para manejar modelos de CatBoost para TAVIT"""
@@ -17,232 +31,313 @@ class TAVITMLModels:
         self.fraud_model = None
         self.risk_model = None
         self.models_dir = "models"
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        # mtime del .cbm de cada modelo cargado (para detectar reemplazos hechos por otro proceso)
+        self._loaded_mtimes: Dict[str, float] = {}
+        
+        # Backend de inferencia: wrapper CatBoost o evaluador compilado (numpy desde el export JSON)
+        self.backend = MODEL_EXPORT_CONFIG["backend"]
+        if self.backend not in MODEL_BACKENDS:
+            print(f"MODEL_BACKEND desconocido '{self.backend}', usando catboost")
+            self.backend = "catboost"
+        
+        # Carga perezosa: cold -> loading -> loaded (los .cbm se leen en el primer uso o en warm_up)
+        self.state = "cold"
+        self._load_lock = threading.RLock()
         
         # Crear directorio si no existe
         os.makedirs(self.models_dir, exist_ok=True)
+    
+    def load(self):
+        """Cargar los modelos desde disco una sola vez (seguro entre hilos)"""
+        if self.state == "loaded":
+            return
         
-        # Inicializar o cargar modelos
-        self._init_models()
+        with self._load_lock:
+            if self.state == "loaded":
+                return
+            self.state = "loading"
+            try:
+                self._init_models()
+                self.state = "loaded"
+            except Exception:
+                self.state = "cold"
+                raise
+    
+    async def warm_up(self):
+        """Precargar los modelos en un hilo aparte, sin bloquear el event loop"""
+        try:
+            await asyncio.to_thread(self.load)
+        except Exception as e:
+            print(f"Error precargando modelos: {e}")
+    
+    def is_ready(self) -> bool:
+        """Listo para servir: modelos cargados en memoria"""
+        return self.state == "loaded" and self.fraud_model is not None and self.risk_model is not None
+    
+    def model_status(self, kind: str) -> str:
+        """Estado de un modelo sin forzar su carga: loaded, on_disk o missing"""
+        model = self.fraud_model if kind == "fraud" else self.risk_model
+        if model is not None:
+            return "loaded"
+        if os.path.exists(self._model_path(kind)):
+            return "on_disk"
+        return "missing"
     
     def _init_models(self):
-        """Inicializar o cargar modelos pre-entrenados"""
-        fraud_model_path = os.path.join(self.models_dir, "fraud_model.cbm")
-        risk_model_path = os.path.join(self.models_dir, "risk_model.cbm")
-        
-        # Intentar cargar modelos existentes
-        if os.path.exists(fraud_model_path):
-            self.fraud_model = CatBoostClassifier()
-            self.fraud_model.load_model(fraud_model_path)
-        else:
-            # Crear modelo base (será entrenado con datos reales)
-            self.fraud_model = self._create_fraud_model()
+        """Cargar modelos pre-entrenados existentes en disco"""
+        # Los modelos que falten se entrenan en background (model_training.training_jobs)
+        for kind in MODEL_KINDS:
+            if os.path.exists(self._model_path(kind)):
+                self._set_model(kind, self._load_model(kind))
+    
+    def _load_model(self, kind: str):
+        """Cargar un modelo desde su .cbm con el backend configurado"""
+        model_path = self._model_path(kind)
+        if self.backend == "catboost":
+            model = build_model(kind)
+            model.load_model(model_path)
+            return model
         
-        if os.path.exists(risk_model_path):
-            self.risk_model = CatBoostRegressor()
-            self.risk_model.load_model(risk_model_path)
-        else:
-            # Crear modelo base
-            self.risk_model = self._create_risk_model()
-    
-    def _create_fraud_model(self) -> CatBoostClassifier:
-        """Crear modelo de detección de fraude"""
-        model = CatBoostClassifier(
-            iterations=1000,
-            learning_rate=0.05,
-            depth=6,
-            loss_function='Logloss',
-            eval_metric='AUC',
-            random_seed=42,
-            verbose=False
+        # Backend compilado: el export JSON se regenera solo si falta o es anterior al .cbm
+        if not is_export_current(self.models_dir, kind, model_path):
+            model = build_model(kind)
+            model.load_model(model_path)
+            export_model(model, kind, self.models_dir)
+        return self._load_compiled(kind)
+    
+    def _load_compiled(self, kind: str) -> CompiledTreeModel:
+        return CompiledTreeModel.load(
+            export_path(self.models_dir, kind, "json"),
+            metadata_path(self.models_dir, kind),
+            is_classifier=(kind == "fraud")
         )
+    
+    def export_models(self, formats: List[str] = None) -> Dict[str, Dict[str, str]]:
+        """Exportar los modelos entrenados a formatos de inferencia (json, onnx, python, cpp)"""
+        exported = {}
+        for kind in MODEL_KINDS:
+            model_path = self._model_path(kind)
+            if not os.path.exists(model_path):
+                continue
+            model = build_model(kind)
+            model.load_model(model_path)
+            exported[kind] = export_model(model, kind, self.models_dir, formats)
+        return exported
+    
+    def _set_model(self, kind: str, model):
+        """Publicar un modelo y sus metadatos"""
+        self.metadata[kind] = self._build_metadata(kind, model)
+        if os.path.exists(self._model_path(kind)):
+            self._loaded_mtimes[kind] = os.path.getmtime(self._model_path(kind))
+        if kind == "fraud":
+            self.fraud_model = model
+        else:
+            self.risk_model = model
+    
+    def missing_models(self) -> List[str]:
+        """Modelos que aún no tienen archivo .cbm entrenado"""
+        return [kind for kind in MODEL_KINDS if not os.path.exists(self._model_path(kind))]
+    
+    def swap_model(self, kind: str, new_model_path: str):
+        """
+        Reemplazar atómicamente un modelo en servicio por uno recién entrenado.
+        El archivo se renombra con os.replace y la referencia se cambia en una sola asignación,
+        por lo que las predicciones en curso terminan con el modelo anterior.
+        """
+        model = build_model(kind)
+        model.load_model(new_model_path)
+        with self._load_lock:
+            os.replace(new_model_path, self._model_path(kind))
+            # Los exports siguen siempre al modelo en servicio
+            export_model(model, kind, self.models_dir)
+            if self.backend == "compiled":
+                model = self._load_compiled(kind)
+            self._set_model(kind, model)
+    
+    def refresh_if_changed(self):
+        """
+        Recargar los modelos cuyo .cbm cambió en disco desde que se cargaron. Lo usan los
+        procesos del pool de inferencia, que no ven el swap_model del proceso principal.
+        """
+        for kind in MODEL_KINDS:
+            model_path = self._model_path(kind)
+            if not os.path.exists(model_path):
+                continue
+            if os.path.getmtime(model_path) != self._loaded_mtimes.get(kind):
+                with self._load_lock:
+                    if os.path.getmtime(model_path) != self._loaded_mtimes.get(kind):
+                        self._set_model(kind, self._load_model(kind))
+    
+    def _model_path(self, kind: str) -> str:
+        return os.path.join(self.models_dir, f"{kind}_model.cbm")
+    
+    def _build_metadata(self, kind: str, model) -> Dict[str, Any]:
+        """Calcular una sola vez los metadatos estáticos de un modelo cargado"""
+        spec = FRAUD_FEATURES if kind == "fraud" else RISK_FEATURES
+        model_path = self._model_path(kind)
         
-        # Entrenar con datos sintéticos iniciales
-        X_train, y_train = self._generate_synthetic_fraud_data(1000)
-        model.fit(X_train, y_train, verbose=False)
+        params = model.get_all_params()
         
-        # Guardar modelo
-        model.save_model(os.path.join(self.models_dir, "fraud_model.cbm"))
+        # Checksum y fecha de entrenamiento a partir del archivo .cbm
+        checksum = None
+        trained_at = None
+        if os.path.exists(model_path):
+            sha256 = hashlib.sha256()
+            with open(model_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    sha256.update(chunk)
+            checksum = sha256.hexdigest()
+            trained_at = datetime.fromtimestamp(os.path.getmtime(model_path)).isoformat()
         
-        return model
+        return {
+            'feature_names': feature_names(spec),
+            'feature_importance': dict(zip(feature_names(spec), model.get_feature_importance().tolist())),
+            'params': {
+                'iterations': params.get('iterations'),
+                'learning_rate': params.get('learning_rate'),
+                'depth': params.get('depth'),
+                'loss_function': params.get('loss_function')
+            },
+            'tree_count': model.tree_count_,
+            'checksum': checksum,
+            'last_trained': trained_at,
+            'loaded_at': datetime.now().isoformat()
+        }
     
-    def _create_risk_model(self) -> CatBoostRegressor:
-        """Crear modelo de score de riesgo"""
-        model = CatBoostRegressor(
-            iterations=1000,
-            learning_rate=0.05,
-            depth=6,
-            loss_function='RMSE',
-            random_seed=42,
-            verbose=False
-        )
-        
-        # Entrenar con datos sintéticos iniciales
-        X_train, y_train = self._generate_synthetic_risk_data(1000)
-        model.fit(X_train, y_train, verbose=False)
+    def reload_models(self):
+        """Recargar los modelos desde disco y recalcular sus metadatos"""
+        with self._load_lock:
+            self._init_models()
+            self.state = "loaded"
+    
+    def predict_fraud(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Predecir probabilidad de fraude"""
+        return self.predict_fraud_batch([features])[0]
+    
+    def predict_fraud_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Predecir probabilidad de fraude para un lote con una sola pasada del modelo"""
+        if not features_list:
+            return []
         
-        # Guardar modelo
-        model.save_model(os.path.join(self.models_dir, "risk_model.cbm"))
-        
-        return model
-    
-    def _generate_synthetic_fraud_data(self, n_samples: int) -> Tuple[pd.DataFrame, np.ndarray]:
-        """Generar datos sintéticos para entrenamiento de fraude"""
-        np.random.seed(42)
-        
-        data = {
-            'edad': np.random.randint(18, 80, n_samples),
-            'monto_solicitado': np.random.uniform(1000, 100000, n_samples),
-            'historial_años': np.random.randint(0, 30, n_samples),
-            'cambios_direccion': np.random.randint(0, 10, n_samples),
-            'menciones_negativas': np.random.randint(0, 20, n_samples),
-            'registros_judiciales': np.random.randint(0, 5, n_samples),
-            'presencia_digital_score': np.random.uniform(0, 100, n_samples),
-            'variacion_datos': np.random.uniform(0, 1, n_samples),
-            'frecuencia_solicitudes': np.random.randint(1, 50, n_samples)
-        }
+        self.load()
+        if self.fraud_model is None:
+            # Puede haberlo entrenado otro proceso (bootstrap con lock) desde la carga
+            self.refresh_if_changed()
+        if self.fraud_model is None:
+            raise ModelUnavailableError("Modelo de fraude no disponible: entrenamiento en curso")
         
-        df = pd.DataFrame(data)
+        X = build_feature_matrix(features_list, FRAUD_FEATURES)
         
-        # Generar etiquetas basadas en heurísticas
-        fraud_score = (
-            (df['menciones_negativas'] > 5) * 0.3 +
-            (df['registros_judiciales'] > 2) * 0.3 +
-            (df['cambios_direccion'] > 5) * 0.2 +
-            (df['variacion_datos'] > 0.7) * 0.2
-        )
+        # Predicción: la clase se deriva de la probabilidad (umbral 0.5)
+        fraud_probas = self.fraud_model.predict_proba(X)[:, 1]
         
-        y = (fraud_score > 0.5).astype(int)
+        # Feature importance precalculada al cargar el modelo
+        feature_importance = self.metadata["fraud"]["feature_importance"]
+        timestamp = datetime.now().isoformat()
         
-        return df, y
+        return [
+            {
+                'fraud_probability': float(fraud_proba),
+                'is_fraud': bool(fraud_proba >= 0.5),
+                'fraud_score': int(fraud_proba * 100),
+                'confidence': float(max(fraud_proba, 1 - fraud_proba)),
+                'feature_importance': feature_importance,
+                'model_version': '1.0',
+                'prediction_timestamp': timestamp
+            }
+            for fraud_proba in fraud_probas
+        ]
     
-    def _generate_synthetic_risk_data(self, n_samples: int) -> Tuple[pd.DataFrame, np.ndarray]:
-        """Generar datos sintéticos para entrenamiento de riesgo"""
-        np.random.seed(42)
-        
-        data = {
-            'edad': np.random.randint(18, 80, n_samples),
-            'historial_credito_score': np.random.uniform(300, 850, n_samples),
-            'años_experiencia': np.random.randint(0, 40, n_samples),
-            'ingresos_anuales': np.random.uniform(15000, 200000, n_samples),
-            'deuda_ratio': np.random.uniform(0, 2, n_samples),
-            'tipo_poliza_score': np.random.uniform(0, 100, n_samples),
-            'ubicacion_risk_score': np.random.uniform(0, 100, n_samples),
-            'osint_score': np.random.uniform(0, 100, n_samples)
-        }
+    def predict_risk_score(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """Predecir score de riesgo"""
+        return self.predict_risk_score_batch([features])[0]
+    
+    def predict_risk_score_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Predecir score de riesgo para un lote con una sola pasada del regresor"""
+        if not features_list:
+            return []
         
-        df = pd.DataFrame(data)
+        self.load()
+        if self.risk_model is None:
+            self.refresh_if_changed()
+        if self.risk_model is None:
+            raise ModelUnavailableError("Modelo de riesgo no disponible: entrenamiento en curso")
         
-        # Generar scores basados en factores
-        risk_score = (
-            df['historial_credito_score'] * 0.3 +
-            (100 - df['edad'] * 0.5) * 0.2 +
-            df['años_experiencia'] * 2 * 0.15 +
-            (100 - df['deuda_ratio'] * 30) * 0.15 +
-            df['osint_score'] * 0.2
-        )
+        X = build_feature_matrix(features_list, RISK_FEATURES)
         
-        # Normalizar a rango 300-850
-        y = 300 + (risk_score / risk_score.max()) * 550
+        # Predicción asegurando rango 300-850
+        risk_scores = np.clip(self.risk_model.predict(X), 300, 850)
         
-        return df, y
-    
-    def predict_fraud(self, features: Dict[str, Any]) -> Dict[str, Any]:
-        """Predecir probabilidad de fraude"""
-        # Extraer features
-        X = pd.DataFrame([{
-            'edad': features.get('edad', 35),
-            'monto_solicitado': features.get('monto', 50000),
-            'historial_años': features.get('historial_años', 5),
-            'cambios_direccion': features.get('cambios_direccion', 1),
-            'menciones_negativas': features.get('menciones_negativas', 0),
-            'registros_judiciales': features.get('registros_judiciales', 0),
-            'presencia_digital_score': features.get('presencia_digital', 50),
-            'variacion_datos': features.get('variacion_datos', 0.1),
-            'frecuencia_solicitudes': features.get('frecuencia_solicitudes', 1)
-        }])
-        
-        # Predicción
-        fraud_proba = self.fraud_model.predict_proba(X)[0][1]
-        fraud_class = self.fraud_model.predict(X)[0]
-        
-        # Feature importance
-        feature_importance = dict(zip(
-            X.columns,
-            self.fraud_model.get_feature_importance()
-        ))
+        # Feature importance precalculada al cargar el modelo
+        feature_importance = self.metadata["risk"]["feature_importance"]
+        timestamp = datetime.now().isoformat()
         
-        return {
-            'fraud_probability': float(fraud_proba),
-            'is_fraud': bool(fraud_class),
-            'fraud_score': int(fraud_proba * 100),
-            'confidence': float(max(fraud_proba, 1 - fraud_proba)),
-            'feature_importance': feature_importance,
-            'model_version': '1.0',
-            'prediction_timestamp': datetime.now().isoformat()
-        }
+        return [
+            {
+                'risk_score': int(risk_score),
+                'confidence': 0.92,  # Confidence del modelo
+                'feature_importance': feature_importance,
+                'model_version': '1.0',
+                'prediction_timestamp': timestamp
+            }
+            for risk_score in risk_scores
+        ]
     
-    def predict_risk_score(self, features: Dict[str, Any]) -> Dict[str, Any]:
-        """Predecir score de riesgo"""
-        # Extraer features
-        X = pd.DataFrame([{
-            'edad': features.get('edad', 35),
-            'historial_credito_score': features.get('historial_credito_score', 650),
-            'años_experiencia': features.get('años_experiencia', 5),
-            'ingresos_anuales': features.get('ingresos_anuales', 50000),
-            'deuda_ratio': features.get('deuda_ratio', 0.3),
-            'tipo_poliza_score': features.get('tipo_poliza_score', 50),
-            'ubicacion_risk_score': features.get('ubicacion_risk_score', 50),
-            'osint_score': features.get('osint_score', 50)
-        }])
-        
-        # Predicción
-        risk_score = self.fraud_model.predict(X)[0]
-        
-        # Asegurar rango 300-850
-        risk_score = max(300, min(850, risk_score))
-        
-        # Feature importance
-        feature_importance = dict(zip(
-            X.columns,
-            self.risk_model.get_feature_importance()
-        ))
-        
-        return {
-            'risk_score': int(risk_score),
-            'confidence': 0.92,  # Confidence del modelo
-            'feature_importance': feature_importance,
-            'model_version': '1.0',
-            'prediction_timestamp': datetime.now().isoformat()
-        }
+    def _retrain(self, kind: str, X_train: "pd.DataFrame", y_train: np.ndarray):
+        """Entrenar un modelo nuevo y reemplazar el actual (sin modificar el modelo en servicio)"""
+        model = build_model(kind)
+        model.fit(X_train, y_train, verbose=False)
+        tmp_path = f"{self._model_path(kind)}.tmp"
+        model.save_model(tmp_path)
+        self.swap_model(kind, tmp_path)
     
-    def retrain_fraud_model(self, X_train: pd.DataFrame, y_train: np.ndarray):
+    def retrain_fraud_model(self, X_train: "pd.DataFrame", y_train: np.ndarray):
         """Re-entrenar modelo de fraude con nuevos datos"""
-        self.fraud_model.fit(X_train, y_train, verbose=False)
-        self.fraud_model.save_model(os.path.join(self.models_dir, "fraud_model.cbm"))
+        self._retrain("fraud", X_train, y_train)
     
-    def retrain_risk_model(self, X_train: pd.DataFrame, y_train: np.ndarray):
+    def retrain_risk_model(self, X_train: "pd.DataFrame", y_train: np.ndarray):
         """Re-entrenar modelo de riesgo con nuevos datos"""
-        self.risk_model.fit(X_train, y_train, verbose=False)
-        self.risk_model.save_model(os.path.join(self.models_dir, "risk_model.cbm"))
+        self._retrain("risk", X_train, y_train)
     
     def get_model_stats(self) -> Dict[str, Any]:
-        """Obtener estadísticas de los modelos"""
+        """Obtener estadísticas de los modelos (desde el snapshot de metadatos)"""
+        # Un modelo sin cargar (o aún en entrenamiento) no tiene metadatos; no se fuerza la carga
+        empty_meta = {'params': {}, 'last_trained': None, 'checksum': None}
+        fraud_meta = self.metadata.get("fraud", empty_meta)
+        risk_meta = self.metadata.get("risk", empty_meta)
         return {
+            'state': self.state,
+            'backend': self.backend,
             'fraud_model': {
-                'iterations': self.fraud_model.get_param('iterations'),
-                'learning_rate': self.fraud_model.get_param('learning_rate'),
-                'depth': self.fraud_model.get_param('depth'),
+                'loaded': self.fraud_model is not None,
+                **fraud_meta['params'],
                 'accuracy': 0.947,  # Accuracy estimado
-                'last_trained': datetime.now().isoformat()
+                'last_trained': fraud_meta['last_trained'],
+                'checksum': fraud_meta['checksum']
             },
             'risk_model': {
-                'iterations': self.risk_model.get_param('iterations'),
-                'learning_rate': self.risk_model.get_param('learning_rate'),
-                'depth': self.risk_model.get_param('depth'),
+                'loaded': self.risk_model is not None,
+                **risk_meta['params'],
                 'r2_score': 0.89,  # R2 estimado
-                'last_trained': datetime.now().isoformat()
+                'last_trained': risk_meta['last_trained'],
+                'checksum': risk_meta['checksum']
             }
         }
+    
+    def get_model_metadata(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot completo de metadatos (importancias, parámetros, checksum)"""
+        self.load()
+        return self.metadata
 
 # Instancia global
 ml_models = TAVITMLModels()
+
+# Modelos que sirve la API: CatBoost o la simulación de demo (ML_MODELS=demo).
+# Con la demo activa no se entrena ni se re-entrena nada
+ML_MODELS_MODE = os.getenv("ML_MODELS", "catboost")
+
+if ML_MODELS_MODE == "demo":
+    from model_utils_simple import ml_models as serving_models
+else:
+    serving_models = ml_models
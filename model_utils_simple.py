@@ -43,6 +43,14 @@ class SimplifiedMLModels:
         if 'desconocido' in ubicacion.lower() or 'rural' in ubicacion.lower():
             base_score += 0.15
             
+        # Factores de velocidad del solicitante (feature_store)
+        if features.get('frecuencia_solicitudes', 1) > 3:
+            base_score += 0.15
+        if features.get('cambios_direccion', 0) >= 2:
+            base_score += 0.1
+        if features.get('variacion_datos', 0) > 0.5:
+            base_score += 0.1
+            
         # Añadir algo de aleatoriedad para simulación
         fraud_probability = min(0.95, max(0.01, base_score + random.uniform(-0.1, 0.1)))
         
@@ -64,6 +72,13 @@ class SimplifiedMLModels:
             }
         }
     
+    def predict_fraud_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Simulación de predicción de fraude para un lote de solicitantes (fila a fila:
+        la pasada vectorizada del endpoint batch solo existe con los modelos CatBoost)
+        """
+        return [self.predict_fraud(features) for features in features_list]
+    
     def predict_risk_score(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """
         Simulación de scoring de riesgo
@@ -135,5 +150,43 @@ class SimplifiedMLModels:
             }
         }
 
+    def predict_risk_score_batch(self, features_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Simulación de scoring de riesgo para un lote de clientes (fila a fila: la pasada
+        vectorizada del endpoint batch solo existe con los modelos CatBoost)
+        """
+        return [self.predict_risk_score(features) for features in features_list]
+
+    def is_ready(self) -> bool:
+        """
+        Los modelos simulados no requieren carga
+        """
+        return self.fraud_model_trained and self.risk_model_trained
+
+    async def warm_up(self):
+        """
+        Sin precarga: misma interfaz que TAVITMLModels
+        """
+        return None
+
+    def get_model_stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas estáticas de los modelos simulados
+        """
+        return {
+            "state": "loaded",
+            "fraud_model": {
+                "loaded": self.fraud_model_trained,
+                "algorithm": "Gradient Boosting Simulation",
+                "accuracy": 0.85,
+                "model_version": "v3.1-simplified"
+            },
+            "risk_model": {
+                "loaded": self.risk_model_trained,
+                "algorithm": "Risk Scoring Simulation",
+                "model_version": "v3.1-simplified"
+            }
+        }
+
 # Instancia global para uso en main.py
 ml_models = SimplifiedMLModels()
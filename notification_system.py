@@ -4,7 +4,6 @@ Integración con VINELink, PACER, CourtListener y otros sistemas de justicia
 """
 
 import asyncio
-import httpx
 import os
 import json
 from datetime import datetime, timedelta
@@ -15,6 +14,9 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
+from http_clients import get_http_client
+from rate_limiter import RATE_LIMITS
+from state_backend import StateList
 
 load_dotenv()
 
@@ -43,9 +45,36 @@ class Alert:
     channels: List[NotificationChannel]
     metadata: Dict[str, Any]
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Forma serializable para el backend de estado"""
+        return {
+            "id": self.id,
+            "title": self.title,
+            "message": self.message,
+            "severity": self.severity.value,
+            "source": self.source,
+            "target_person": self.target_person,
+            "target_id": self.target_id,
+            "created_at": self.created_at.isoformat(),
+            "channels": [channel.value for channel in self.channels],
+            "metadata": self.metadata
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Alert":
+        return cls(
+            **{**data,
+               "severity": AlertSeverity(data["severity"]),
+               "created_at": datetime.fromisoformat(data["created_at"]),
+               "channels": [NotificationChannel(channel) for channel in data["channels"]]}
+        )
+
 class NotificationManager:
     def __init__(self):
-        self.alerts_queue = []
+        # Cola de alertas en el backend de estado (compartida entre workers con STATE_BACKEND=sqlite)
+        self.alerts_queue = StateList(
+            "notifications", "alerts_queue", max_len=int(os.getenv("ALERTS_QUEUE_MAX", "10000"))
+        )
         self.active_monitors = {}
         self.notification_configs = {
             "email": {
@@ -67,18 +96,18 @@ class NotificationManager:
             "courtlistener": {
                 "base_url": "https://www.courtlistener.com/api/rest/v3/",
                 "token": os.getenv("COURTLISTENER_TOKEN"),
-                "rate_limit": 5000  # requests per hour
+                "rate_limit": RATE_LIMITS["courtlistener"]["rate"]  # requests per hour
             },
             "pacer": {
                 "base_url": "https://pcl.uscourts.gov/",
                 "username": os.getenv("PACER_USERNAME", ""),
                 "password": os.getenv("PACER_PASSWORD", ""),
-                "rate_limit": 100
+                "rate_limit": RATE_LIMITS["pacer"]["rate"]
             },
             "vinelink": {
                 "base_url": "https://www.vinelink.com/",
                 "api_key": os.getenv("VINELINK_API_KEY", ""),
-                "rate_limit": 1000
+                "rate_limit": RATE_LIMITS["vinelink"]["rate"]
             }
         }
 
@@ -191,42 +220,42 @@ class NotificationManager:
             }
             
             # Buscar opiniones recientes
-            async with httpx.AsyncClient() as client:
-                # Buscar por nombre en opiniones
-                opinions_url = f"{api_config['base_url']}opinions/"
-                params = {
-                    "q": person_name,
-                    "order_by": "-date_created",
-                    "date_created__gte": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-                }
+            client = get_http_client("courtlistener")
+            # Buscar por nombre en opiniones
+            opinions_url = f"{api_config['base_url']}opinions/"
+            params = {
+                "q": person_name,
+                "order_by": "-date_created",
+                "date_created__gte": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+            }
+            
+            response = await client.get(opinions_url, headers=headers, params=params)
+            if response.status_code == 200:
+                data = response.json()
                 
-                response = await client.get(opinions_url, headers=headers, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    for opinion in data.get("results", []):
-                        if any(trigger in opinion.get("plain_text", "").lower() 
-                              for trigger in ["arrest", "conviction", "sentence"] 
-                              if trigger in alert_triggers):
-                            
-                            alert = Alert(
-                                id=f"cl_{opinion['id']}_{datetime.now().timestamp()}",
-                                title="Nuevo Caso Judicial Detectado",
-                                message=f"Nueva mención de {person_name} en caso judicial: {opinion.get('case_name', 'N/A')}",
-                                severity=AlertSeverity.CRITICAL,
-                                source="courtlistener",
-                                target_person=person_name,
-                                target_id=None,
-                                created_at=datetime.now(),
-                                channels=[NotificationChannel.EMAIL, NotificationChannel.WEBHOOK],
-                                metadata={
-                                    "case_name": opinion.get("case_name"),
-                                    "court": opinion.get("cluster", {}).get("docket", {}).get("court"),
-                                    "date_filed": opinion.get("date_created"),
-                                    "url": f"https://www.courtlistener.com{opinion.get('absolute_url', '')}"
-                                }
-                            )
-                            alerts.append(alert)
+                for opinion in data.get("results", []):
+                    if any(trigger in opinion.get("plain_text", "").lower() 
+                          for trigger in ["arrest", "conviction", "sentence"] 
+                          if trigger in alert_triggers):
+                        
+                        alert = Alert(
+                            id=f"cl_{opinion['id']}_{datetime.now().timestamp()}",
+                            title="Nuevo Caso Judicial Detectado",
+                            message=f"Nueva mención de {person_name} en caso judicial: {opinion.get('case_name', 'N/A')}",
+                            severity=AlertSeverity.CRITICAL,
+                            source="courtlistener",
+                            target_person=person_name,
+                            target_id=None,
+                            created_at=datetime.now(),
+                            channels=[NotificationChannel.EMAIL, NotificationChannel.WEBHOOK],
+                            metadata={
+                                "case_name": opinion.get("case_name"),
+                                "court": opinion.get("cluster", {}).get("docket", {}).get("court"),
+                                "date_filed": opinion.get("date_created"),
+                                "url": f"https://www.courtlistener.com{opinion.get('absolute_url', '')}"
+                            }
+                        )
+                        alerts.append(alert)
                 
         except Exception as e:
             print(f"Error checking CourtListener: {e}")
@@ -342,7 +371,7 @@ class NotificationManager:
         """
         Procesa y envía una alerta por los canales especificados
         """
-        self.alerts_queue.append(alert)
+        self.alerts_queue.append(alert.to_dict())
         
         # Enviar por cada canal configurado
         for channel_name in channels:
@@ -425,15 +454,15 @@ class NotificationManager:
                 "metadata": alert.metadata
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    webhook_url,
-                    json=payload,
-                    timeout=config["timeout"]
-                )
-                
-                if response.status_code != 200:
-                    print(f"Webhook failed with status {response.status_code}")
+            client = get_http_client("default")
+            response = await client.post(
+                webhook_url,
+                json=payload,
+                timeout=config["timeout"]
+            )
+            
+            if response.status_code != 200:
+                print(f"Webhook failed with status {response.status_code}")
                     
         except Exception as e:
             print(f"Error sending webhook alert: {e}")
@@ -476,7 +505,8 @@ class NotificationManager:
         Obtiene alertas recientes
         """
         cutoff_time = datetime.now() - timedelta(hours=hours)
-        return [alert for alert in self.alerts_queue 
+        alerts = [Alert.from_dict(data) for data in self.alerts_queue.values()]
+        return [alert for alert in alerts 
                 if alert.created_at > cutoff_time]
 
     def stop_monitoring(self, monitor_id: str) -> bool:
@@ -0,0 +1,381 @@
+"""
+TAVIT Platform v3.1 - Fuentes OSINT
+Interfaz de plugins por fuente (web, noticias, legal, GitHub, Reddit) y ejecución
+concurrente con timeout por fuente y ensamblado de resultados parciales
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from http_clients import get_http_client
+from provider_cache import serpapi_cache
+from courtlistener_mirror import courtlistener_mirror
+
+load_dotenv()
+
+# Configuración de fuentes: credenciales y timeout por fuente (segundos)
+OSINT_SOURCES_CONFIG = {
+    "serpapi_key": os.getenv("SERPAPI_KEY"),
+    "courtlistener_token": os.getenv("COURTLISTENER_TOKEN"),
+    "courtlistener_ua": os.getenv("COURTLISTENER_UA", "Tavix/1.0 (ceo@tavit.com)"),
+    "github_token": os.getenv("GITHUB_TOKEN", ""),
+    "timeouts": {
+        "web": float(os.getenv("OSINT_TIMEOUT_WEB", "15")),
+        "news": float(os.getenv("OSINT_TIMEOUT_NEWS", "15")),
+        "legal": float(os.getenv("OSINT_TIMEOUT_LEGAL", "20")),
+        "github": float(os.getenv("OSINT_TIMEOUT_GITHUB", "10")),
+        "reddit": float(os.getenv("OSINT_TIMEOUT_REDDIT", "10"))
+    }
+}
+
+class SourceUnavailable(Exception):
+    """La fuente no está configurada (por ejemplo, falta la credencial)"""
+
+class SourceError(Exception):
+    """La fuente respondió con un error"""
+
+class OSINTSource:
+    """
+    Plugin de fuente OSINT. Cada fuente implementa search() y devuelve
+    {"total": int, "items": [...]} con items ya normalizados.
+    """
+
+    name = "base"
+    provider = "default"
+
+    @property
+    def timeout(self) -> float:
+        return OSINT_SOURCES_CONFIG["timeouts"].get(self.name, 15.0)
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _check_status(self, response):
+        if response.status_code != 200:
+            raise SourceError(f"{self.name}: HTTP {response.status_code}")
+
+class WebSource(OSINTSource):
+    """Búsqueda web general (Google vía SerpAPI)"""
+
+    name = "web"
+    provider = "serpapi"
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        if not OSINT_SOURCES_CONFIG["serpapi_key"]:
+            raise SourceUnavailable("SERPAPI_KEY no configurada")
+
+        response = await serpapi_cache.get({
+            "engine": "google",
+            "q": query,
+            "api_key": OSINT_SOURCES_CONFIG["serpapi_key"],
+            "num": limit,
+            "hl": options.get("hl", "es")
+        }, timeout=self.timeout)
+        self._check_status(response)
+
+        organic = response.json().get("organic_results", [])
+        return {
+            "total": len(organic),
+            "items": [
+                {
+                    "title": result.get("title", ""),
+                    "link": result.get("link", ""),
+                    "snippet": result.get("snippet", ""),
+                    "date": result.get("date", ""),
+                    "source": "web",
+                    "provider": "Google"
+                }
+                for result in organic
+            ]
+        }
+
+class NewsSource(OSINTSource):
+    """Búsqueda de noticias (Google News vía SerpAPI, tbm=nws)"""
+
+    name = "news"
+    provider = "serpapi"
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        if not OSINT_SOURCES_CONFIG["serpapi_key"]:
+            raise SourceUnavailable("SERPAPI_KEY no configurada")
+
+        response = await serpapi_cache.get({
+            "q": query,
+            "api_key": OSINT_SOURCES_CONFIG["serpapi_key"],
+            "tbm": "nws",
+            "num": limit,
+            "hl": options.get("hl", "es")
+        }, timeout=self.timeout)
+        self._check_status(response)
+
+        articles = response.json().get("news_results", [])
+        return {
+            "total": len(articles),
+            "items": [
+                {
+                    "title": article.get("title", ""),
+                    "link": article.get("link", ""),
+                    "snippet": article.get("snippet", ""),
+                    "date": article.get("date", ""),
+                    "source": "news",
+                    "provider": article.get("source", "Unknown")
+                }
+                for article in articles
+            ]
+        }
+
+class LegalSource(OSINTSource):
+    """
+    Registros judiciales (CourtListener). Con el espejo local cargado se consulta primero el
+    índice local y la API solo para las presentaciones posteriores al volcado. Un case_type
+    que el espejo no contiene (opiniones, personas) va directo a la API
+    """
+
+    name = "legal"
+    provider = "courtlistener"
+    url = "https://www.courtlistener.com/api/rest/v3/search/"
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        mode = courtlistener_mirror.config["mode"]
+        if mode == "api":
+            return await self.search_api(query, limit, **options)
+        if not courtlistener_mirror.covers(options.get("case_type")):
+            if mode == "local_only":
+                return {"total": 0, "items": []}
+            return await self.search_api(query, limit, **options)
+
+        local = await asyncio.to_thread(courtlistener_mirror.search, query, limit)
+        if local is None:
+            return await self.search_api(query, limit, **options)
+        if not courtlistener_mirror.needs_recent(local["coverage_date"]):
+            return {"total": local["total"], "items": local["items"]}
+
+        courtlistener_mirror.stats["api_fallbacks"] += 1
+        try:
+            recent = await asyncio.wait_for(
+                self.search_api(query, limit, filed_after=local["coverage_date"], **options),
+                timeout=min(courtlistener_mirror.config["recent_timeout"], self.timeout)
+            )
+        except Exception as e:
+            # El espejo responde aunque la API falle (sin las presentaciones más recientes)
+            print(f"Error consultando presentaciones recientes en CourtListener: {e}")
+            return {"total": local["total"], "items": local["items"]}
+        return {
+            "total": local["total"] + recent["total"],
+            "items": (recent["items"] + local["items"])[:limit]
+        }
+
+    async def search_api(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        headers = {
+            "Authorization": f"Token {OSINT_SOURCES_CONFIG['courtlistener_token']}",
+            "User-Agent": OSINT_SOURCES_CONFIG["courtlistener_ua"]
+        }
+
+        params = {"q": query, "order_by": "dateFiled desc"}
+        # case_type: "o" (opiniones) / "r" (expedientes RECAP) / "p" (personas); sin filtro por defecto
+        if options.get("case_type"):
+            params["type"] = options["case_type"]
+        if options.get("filed_after"):
+            params["filed_after"] = options["filed_after"]
+
+        response = await get_http_client(self.provider).get(
+            self.url,
+            headers=headers,
+            params=params,
+            timeout=self.timeout
+        )
+        self._check_status(response)
+
+        data = response.json()
+        cases = data.get("results", [])
+        return {
+            "total": data.get("count", len(cases)),
+            "items": [
+                {
+                    "case_name": case.get("caseName"),
+                    "date_filed": case.get("dateFiled"),
+                    "court": case.get("court"),
+                    "docket_number": case.get("docketNumber"),
+                    "url": f"https://www.courtlistener.com{case['absolute_url']}" if case.get("absolute_url") else None,
+                    "source": "legal"
+                }
+                for case in cases[:limit]
+            ]
+        }
+
+class GitHubSource(OSINTSource):
+    """Usuarios y repositorios de GitHub (search_type: users | repositories)"""
+
+    name = "github"
+    provider = "github"
+    base_url = "https://api.github.com"
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        if not OSINT_SOURCES_CONFIG["github_token"]:
+            raise SourceUnavailable("Requiere autenticación GitHub API")
+
+        search_type = options.get("search_type", "users")
+        headers = {
+            "Authorization": f"token {OSINT_SOURCES_CONFIG['github_token']}",
+            "Accept": "application/vnd.github.v3+json",
+            "User-Agent": "TAVIT-Platform/1.0"
+        }
+
+        response = await get_http_client(self.provider).get(
+            f"{self.base_url}/search/{search_type}",
+            headers=headers,
+            params={"q": query, "per_page": limit},
+            timeout=self.timeout
+        )
+        self._check_status(response)
+
+        data = response.json()
+        items = []
+        for item in data.get("items", []):
+            if search_type == "users":
+                items.append({
+                    "username": item.get("login", ""),
+                    "profile_url": item.get("html_url", ""),
+                    "avatar_url": item.get("avatar_url", ""),
+                    "type": item.get("type", "User"),
+                    "public_repos": item.get("public_repos", 0),
+                    "followers": item.get("followers", 0),
+                    "source": "github",
+                    "search_type": "users"
+                })
+            else:
+                items.append({
+                    "name": item.get("name", ""),
+                    "full_name": item.get("full_name", ""),
+                    "description": item.get("description", ""),
+                    "url": item.get("html_url", ""),
+                    "language": item.get("language", ""),
+                    "stars": item.get("stargazers_count", 0),
+                    "forks": item.get("forks_count", 0),
+                    "owner": item.get("owner", {}).get("login", ""),
+                    "source": "github",
+                    "search_type": "repositories"
+                })
+
+        return {"total": data.get("total_count", len(items)), "items": items}
+
+class RedditSource(OSINTSource):
+    """Publicaciones de Reddit (búsqueda pública)"""
+
+    name = "reddit"
+    provider = "reddit"
+    base_url = "https://www.reddit.com"
+
+    async def search(self, query: str, limit: int = 10, **options) -> Dict[str, Any]:
+        subreddit = options.get("subreddit", "all")
+
+        response = await get_http_client(self.provider).get(
+            f"{self.base_url}/r/{subreddit}/search.json",
+            params={"q": query, "limit": limit, "sort": "relevance", "t": "all"},
+            headers={"User-Agent": "TAVIT-Platform/1.0 by tavit"},
+            timeout=self.timeout
+        )
+        self._check_status(response)
+
+        posts = response.json().get("data", {}).get("children", [])
+        items = []
+        for post in posts:
+            post_data = post.get("data", {})
+            items.append({
+                "title": post_data.get("title", ""),
+                "url": f"https://reddit.com{post_data.get('permalink', '')}",
+                "subreddit": post_data.get("subreddit", ""),
+                "author": post_data.get("author", ""),
+                "score": post_data.get("score", 0),
+                "num_comments": post_data.get("num_comments", 0),
+                "created_utc": post_data.get("created_utc", 0),
+                "selftext": post_data.get("selftext", "")[:300],
+                "source": "reddit"
+            })
+
+        return {"total": len(items), "items": items}
+
+# Registro de fuentes disponibles
+OSINT_SOURCES: Dict[str, OSINTSource] = {
+    source.name: source
+    for source in [WebSource(), NewsSource(), LegalSource(), GitHubSource(), RedditSource()]
+}
+
+async def run_source(name: str, query: str, limit: int = 10,
+                     timeout: Optional[float] = None, **options) -> Dict[str, Any]:
+    """
+    Ejecutar una fuente con su timeout. Nunca lanza excepción: el estado
+    (ok, timeout, error, unavailable) queda en el resultado.
+    """
+    source = OSINT_SOURCES.get(name)
+    started = time.perf_counter()
+    outcome = {"source": name, "status": "ok", "total": 0, "items": [], "error": None}
+
+    if source is None:
+        outcome.update(status="unavailable", error=f"Fuente desconocida: {name}")
+        return outcome
+
+    try:
+        result = await asyncio.wait_for(
+            source.search(query, limit, **options),
+            timeout=timeout or source.timeout
+        )
+        outcome.update(total=result["total"], items=result["items"])
+    except asyncio.TimeoutError:
+        outcome.update(status="timeout", error=f"Sin respuesta en {timeout or source.timeout}s")
+    except SourceUnavailable as e:
+        outcome.update(status="unavailable", error=str(e))
+    except Exception as e:
+        print(f"Error en fuente OSINT {name}: {e}")
+        outcome.update(status="error", error=str(e))
+
+    outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return outcome
+
+async def fan_out(plan: Dict[str, Tuple[str, Dict[str, Any]]], query: str, limit: int = 10,
+                  timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Ejecutar varias fuentes en paralelo. plan: {etiqueta: (fuente, opciones)};
+    la opción "limit" de una entrada reemplaza al límite general.
+    La latencia total es la de la fuente más lenta (acotada por su timeout).
+    """
+    labels = list(plan)
+    tasks = []
+    for label in labels:
+        name, options = plan[label]
+        options = dict(options)
+        # Una entrada del plan puede fijar su propio número de resultados
+        source_limit = options.pop("limit", limit)
+        tasks.append(run_source(name, query, source_limit, timeout, **options))
+
+    outcomes = await asyncio.gather(*tasks)
+    return dict(zip(labels, outcomes))
+
+async def fan_out_as_completed(plan: Dict[str, Tuple[str, Dict[str, Any]]], query: str,
+                               limit: int = 10, timeout: Optional[float] = None
+                               ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Igual que fan_out, pero entrega (etiqueta, resultado) en orden de finalización.
+    Si el consumidor se detiene (cliente desconectado), las fuentes pendientes se cancelan.
+    """
+    async def labeled(label: str, name: str, options: Dict[str, Any]):
+        options = dict(options)
+        source_limit = options.pop("limit", limit)
+        return label, await run_source(name, query, source_limit, timeout, **options)
+
+    tasks = [
+        asyncio.ensure_future(labeled(label, name, options))
+        for label, (name, options) in plan.items()
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+def available_sources() -> List[str]:
+    return list(OSINT_SOURCES)
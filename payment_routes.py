@@ -13,6 +13,7 @@ import json
 import hmac
 import hashlib
 from datetime import datetime
+from http_clients import get_http_client
 
 router = APIRouter(prefix="/api/v1/payments", tags=["payments"])
 
@@ -79,57 +80,57 @@ async def create_payment_intent(request: PaymentIntentRequest):
             "description": f"Suscripción {plan_config['name']} para {request.company_name}"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.stripe.com/v1/payment_intents",
-                headers={
-                    "Authorization": f"Bearer {STRIPE_SECRET_KEY}",
-                    "Content-Type": "application/x-www-form-urlencoded"
-                },
-                data=stripe_data
-            )
-            
-            if response.status_code != 200:
-                error_detail = response.text
-                raise HTTPException(status_code=response.status_code, detail=f"Error en Stripe: {error_detail}")
-            
-            payment_intent = response.json()
-            
-            # Guardar en Supabase
-            supabase_data = {
-                "payment_intent_id": payment_intent["id"],
-                "amount": amount,
-                "currency": "usd",
-                "status": payment_intent["status"],
-                "company_id": request.company_id,
-                "plan_type": request.plan_type,
-                "billing_period": request.billing_period,
-                "metadata": {
-                    "company_name": request.company_name,
-                    "email": request.email,
-                    "stripe_data": payment_intent
-                }
-            }
-            
-            supabase_response = await client.post(
-                f"{SUPABASE_URL}/rest/v1/payment_intents",
-                headers={
-                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "apikey": SUPABASE_SERVICE_KEY
-                },
-                json=supabase_data
-            )
-            
-            return {
-                "client_secret": payment_intent["client_secret"],
-                "payment_intent_id": payment_intent["id"],
-                "amount": amount,
-                "currency": "usd",
-                "status": payment_intent["status"],
-                "plan_config": plan_config,
-                "publishable_key": STRIPE_PUBLISHABLE_KEY
+        client = get_http_client("stripe")
+        response = await client.post(
+            "https://api.stripe.com/v1/payment_intents",
+            headers={
+                "Authorization": f"Bearer {STRIPE_SECRET_KEY}",
+                "Content-Type": "application/x-www-form-urlencoded"
+            },
+            data=stripe_data
+        )
+        
+        if response.status_code != 200:
+            error_detail = response.text
+            raise HTTPException(status_code=response.status_code, detail=f"Error en Stripe: {error_detail}")
+        
+        payment_intent = response.json()
+        
+        # Guardar en Supabase
+        supabase_data = {
+            "payment_intent_id": payment_intent["id"],
+            "amount": amount,
+            "currency": "usd",
+            "status": payment_intent["status"],
+            "company_id": request.company_id,
+            "plan_type": request.plan_type,
+            "billing_period": request.billing_period,
+            "metadata": {
+                "company_name": request.company_name,
+                "email": request.email,
+                "stripe_data": payment_intent
             }
+        }
+        
+        supabase_response = await get_http_client("supabase").post(
+            f"{SUPABASE_URL}/rest/v1/payment_intents",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json=supabase_data
+        )
+        
+        return {
+            "client_secret": payment_intent["client_secret"],
+            "payment_intent_id": payment_intent["id"],
+            "amount": amount,
+            "currency": "usd",
+            "status": payment_intent["status"],
+            "plan_config": plan_config,
+            "publishable_key": STRIPE_PUBLISHABLE_KEY
+        }
             
     except httpx.RequestError as e:
         raise HTTPException(status_code=500, detail=f"Error de conexión: {str(e)}")
@@ -171,40 +172,40 @@ async def get_payment_status(payment_intent_id: str):
         if not STRIPE_SECRET_KEY:
             raise HTTPException(status_code=500, detail="Configuración de Stripe faltante")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"https://api.stripe.com/v1/payment_intents/{payment_intent_id}",
-                headers={
-                    "Authorization": f"Bearer {STRIPE_SECRET_KEY}"
-                }
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Payment Intent no encontrado")
-            
-            payment_intent = response.json()
-            
-            # Actualizar estado en Supabase
-            supabase_response = await client.patch(
-                f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent_id}",
-                headers={
-                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "apikey": SUPABASE_SERVICE_KEY
-                },
-                json={
-                    "status": payment_intent["status"],
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-            )
-            
-            return {
-                "payment_intent_id": payment_intent["id"],
+        client = get_http_client("stripe")
+        response = await client.get(
+            f"https://api.stripe.com/v1/payment_intents/{payment_intent_id}",
+            headers={
+                "Authorization": f"Bearer {STRIPE_SECRET_KEY}"
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Payment Intent no encontrado")
+        
+        payment_intent = response.json()
+        
+        # Actualizar estado en Supabase
+        supabase_response = await get_http_client("supabase").patch(
+            f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent_id}",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json={
                 "status": payment_intent["status"],
-                "amount": payment_intent["amount"],
-                "currency": payment_intent["currency"],
-                "last_payment_error": payment_intent.get("last_payment_error")
+                "updated_at": datetime.utcnow().isoformat()
             }
+        )
+        
+        return {
+            "payment_intent_id": payment_intent["id"],
+            "status": payment_intent["status"],
+            "amount": payment_intent["amount"],
+            "currency": payment_intent["currency"],
+            "last_payment_error": payment_intent.get("last_payment_error")
+        }
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -225,55 +226,55 @@ async def handle_payment_success(payment_intent: Dict[str, Any]):
     Manejar pago exitoso
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # Actualizar estado en payment_intents
+        client = get_http_client("supabase")
+        # Actualizar estado en payment_intents
+        await client.patch(
+            f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent['id']}",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json={
+                "status": "succeeded",
+                "updated_at": datetime.utcnow().isoformat()
+            }
+        )
+        
+        # Crear registro en payment_history
+        await client.post(
+            f"{SUPABASE_URL}/rest/v1/payment_history",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json={
+                "payment_intent_id": payment_intent["id"],
+                "stripe_payment_id": payment_intent.get("latest_charge"),
+                "amount_received": payment_intent["amount_received"],
+                "currency": payment_intent["currency"],
+                "status": "completed",
+                "receipt_url": payment_intent.get("receipt_url")
+            }
+        )
+        
+        # Actualizar empresa con suscripción activa
+        company_id = payment_intent["metadata"].get("company_id")
+        if company_id:
             await client.patch(
-                f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent['id']}",
+                f"{SUPABASE_URL}/rest/v1/companies?id=eq.{company_id}",
                 headers={
                     "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
                     "Content-Type": "application/json",
                     "apikey": SUPABASE_SERVICE_KEY
                 },
                 json={
-                    "status": "succeeded",
+                    "subscription_status": "active",
+                    "subscription_plan": payment_intent["metadata"].get("plan_type"),
                     "updated_at": datetime.utcnow().isoformat()
                 }
             )
-            
-            # Crear registro en payment_history
-            await client.post(
-                f"{SUPABASE_URL}/rest/v1/payment_history",
-                headers={
-                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "apikey": SUPABASE_SERVICE_KEY
-                },
-                json={
-                    "payment_intent_id": payment_intent["id"],
-                    "stripe_payment_id": payment_intent.get("latest_charge"),
-                    "amount_received": payment_intent["amount_received"],
-                    "currency": payment_intent["currency"],
-                    "status": "completed",
-                    "receipt_url": payment_intent.get("receipt_url")
-                }
-            )
-            
-            # Actualizar empresa con suscripción activa
-            company_id = payment_intent["metadata"].get("company_id")
-            if company_id:
-                await client.patch(
-                    f"{SUPABASE_URL}/rest/v1/companies?id=eq.{company_id}",
-                    headers={
-                        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                        "Content-Type": "application/json",
-                        "apikey": SUPABASE_SERVICE_KEY
-                    },
-                    json={
-                        "subscription_status": "active",
-                        "subscription_plan": payment_intent["metadata"].get("plan_type"),
-                        "updated_at": datetime.utcnow().isoformat()
-                    }
-                )
                 
     except Exception as e:
         print(f"Error manejando pago exitoso: {e}")
@@ -283,38 +284,38 @@ async def handle_payment_failure(payment_intent: Dict[str, Any]):
     Manejar fallo en pago
     """
     try:
-        async with httpx.AsyncClient() as client:
-            # Actualizar estado en payment_intents
-            await client.patch(
-                f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent['id']}",
-                headers={
-                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "apikey": SUPABASE_SERVICE_KEY
-                },
-                json={
-                    "status": "failed",
-                    "updated_at": datetime.utcnow().isoformat()
-                }
-            )
-            
-            # Crear alerta de pago fallido
-            await client.post(
-                f"{SUPABASE_URL}/rest/v1/alerts",
-                headers={
-                    "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                    "Content-Type": "application/json",
-                    "apikey": SUPABASE_SERVICE_KEY
-                },
-                json={
-                    "alert_type": "payment_failed",
-                    "title": "Pago Fallido",
-                    "description": f"El pago falló para payment_intent {payment_intent['id']}",
-                    "severity": "high",
-                    "source_platform": "stripe",
-                    "external_reference": payment_intent["id"]
-                }
-            )
+        client = get_http_client("supabase")
+        # Actualizar estado en payment_intents
+        await client.patch(
+            f"{SUPABASE_URL}/rest/v1/payment_intents?payment_intent_id=eq.{payment_intent['id']}",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json={
+                "status": "failed",
+                "updated_at": datetime.utcnow().isoformat()
+            }
+        )
+        
+        # Crear alerta de pago fallido
+        await client.post(
+            f"{SUPABASE_URL}/rest/v1/alerts",
+            headers={
+                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+                "Content-Type": "application/json",
+                "apikey": SUPABASE_SERVICE_KEY
+            },
+            json={
+                "alert_type": "payment_failed",
+                "title": "Pago Fallido",
+                "description": f"El pago falló para payment_intent {payment_intent['id']}",
+                "severity": "high",
+                "source_platform": "stripe",
+                "external_reference": payment_intent["id"]
+            }
+        )
             
     except Exception as e:
         print(f"Error manejando fallo de pago: {e}")
\ No newline at end of file
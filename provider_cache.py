@@ -0,0 +1,189 @@
+"""
+TAVIT Platform v3.1 - Cache de Respuestas de Proveedores
+Cache de dos niveles (memoria LRU + SQLite) para SerpAPI con TTL por motor
+y coalescencia de consultas idénticas concurrentes
+"""
+
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from http_clients import get_http_client
+from ttl_cache import TTLCache
+
+load_dotenv()
+
+# Configuración del cache de proveedores
+PROVIDER_CACHE_CONFIG = {
+    "db_path": os.getenv("PROVIDER_CACHE_DB", "cache/provider_cache.sqlite3"),
+    "memory_entries": int(os.getenv("PROVIDER_CACHE_MEMORY_ENTRIES", "2048")),
+    "memory_bytes": int(os.getenv("PROVIDER_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+    "excluded_params": ["api_key"]
+}
+
+# TTL por motor de SerpAPI (segundos)
+SERPAPI_CACHE_TTLS = {
+    "google": 6 * 3600,
+    "google_news": 30 * 60,
+    "nws": 30 * 60,  # Google con tbm=nws
+    "google_trends": 60 * 60,
+    "default": 60 * 60
+}
+
+class CachedResponse:
+    """Respuesta mínima compatible con el uso de httpx.Response en los handlers"""
+
+    def __init__(self, status_code: int, data: Optional[Dict[str, Any]], from_cache: bool = False):
+        self.status_code = status_code
+        self.data = data
+        self.from_cache = from_cache
+
+    def json(self) -> Dict[str, Any]:
+        return self.data if self.data is not None else {}
+
+class SQLiteResponseStore:
+    """Nivel persistente del cache: sobrevive reinicios y se comparte entre workers"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS provider_responses ("
+                "key TEXT PRIMARY KEY, provider TEXT, expires_at REAL, body TEXT)"
+            )
+            conn.execute("DELETE FROM provider_responses WHERE expires_at < ?", (time.time(),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT expires_at, body FROM provider_responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] <= time.time():
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, provider: str, data: Dict[str, Any], ttl: float):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO provider_responses (key, provider, expires_at, body) VALUES (?, ?, ?, ?)",
+                (key, provider, time.time() + ttl, json.dumps(data))
+            )
+            conn.commit()
+
+    def clear(self, provider: str) -> int:
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute("DELETE FROM provider_responses WHERE provider = ?", (provider,))
+            conn.commit()
+        return cursor.rowcount
+
+class ProviderCache:
+    """Cache de respuestas JSON de un proveedor, indexado por parámetros normalizados"""
+
+    def __init__(self, provider: str, url: str, ttls: Dict[str, int],
+                 db_path: str = PROVIDER_CACHE_CONFIG["db_path"],
+                 memory_entries: int = PROVIDER_CACHE_CONFIG["memory_entries"],
+                 memory_bytes: int = PROVIDER_CACHE_CONFIG["memory_bytes"]):
+        self.provider = provider
+        self.url = url
+        self.ttls = ttls
+        self.memory = TTLCache(max_entries=memory_entries, default_ttl=ttls["default"], max_bytes=memory_bytes)
+        self.disk = SQLiteResponseStore(db_path)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "upstream_calls": 0}
+
+    def normalize_params(self, params: Dict[str, Any]) -> Dict[str, str]:
+        """Normalizar parámetros: sin credenciales, sin vacíos, consulta en minúsculas"""
+        normalized = {"engine": "google"}
+        for name, value in params.items():
+            if name in PROVIDER_CACHE_CONFIG["excluded_params"] or value is None:
+                continue
+            normalized[name] = str(value)
+
+        if "q" in normalized:
+            normalized["q"] = " ".join(normalized["q"].lower().split())
+        return normalized
+
+    def cache_key(self, params: Dict[str, Any]) -> str:
+        normalized = self.normalize_params(params)
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+        return f"{self.provider}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+    def ttl_for(self, params: Dict[str, Any]) -> int:
+        """TTL según el motor (o tbm) de la consulta"""
+        if params.get("tbm") in self.ttls:
+            return self.ttls[params["tbm"]]
+        return self.ttls.get(params.get("engine", "google"), self.ttls["default"])
+
+    async def get(self, params: Dict[str, Any], timeout: float = 30.0) -> CachedResponse:
+        """Obtener respuesta desde cache o, si no existe, desde el proveedor"""
+        key = self.cache_key(params)
+
+        data = self.memory.get(key)
+        if data is not None:
+            self.stats["memory_hits"] += 1
+            return CachedResponse(200, data, from_cache=True)
+
+        # Consultas idénticas en vuelo comparten una sola llamada
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._load(key, params, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, params: Dict[str, Any], timeout: float) -> CachedResponse:
+        stored = await asyncio.to_thread(self.disk.get, key)
+        if stored is not None:
+            expires_at, data = stored
+            self.stats["disk_hits"] += 1
+            self.memory.set(key, data, ttl=expires_at - time.time())
+            return CachedResponse(200, data, from_cache=True)
+
+        self.stats["upstream_calls"] += 1
+        response = await get_http_client(self.provider).get(self.url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            return CachedResponse(response.status_code, None)
+
+        data = response.json()
+        ttl = self.ttl_for(params)
+        self.memory.set(key, data, ttl=ttl)
+        await asyncio.to_thread(self.disk.set, key, self.provider, data, ttl)
+        return CachedResponse(200, data)
+
+    async def clear(self) -> int:
+        """Vaciar ambos niveles del cache"""
+        self.memory.clear()
+        return await asyncio.to_thread(self.disk.clear, self.provider)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "memory": self.memory.get_stats(),
+            "inflight": len(self._inflight),
+            **self.stats
+        }
+
+# Instancia global del cache de SerpAPI
+serpapi_cache = ProviderCache("serpapi", "https://serpapi.com/search.json", SERPAPI_CACHE_TTLS)
@@ -0,0 +1,92 @@
+"""
+TAVIT Platform v3.1 - Salud Pasiva de Proveedores
+Registro de latencia y estado de cada proveedor a partir de las llamadas reales
+de producción; las sondas solo se usan cuando un proveedor no tiene tráfico reciente
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Optional
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuración del registro de salud
+PROVIDER_HEALTH_CONFIG = {
+    # Sin tráfico en este tiempo, el estado se confirma con una sonda ligera (segundos)
+    "stale_seconds": float(os.getenv("PROVIDER_HEALTH_STALE_SECONDS", "300")),
+    # Resultados recientes usados para la tasa de error
+    "window": int(os.getenv("PROVIDER_HEALTH_WINDOW", "20")),
+    # Suavizado exponencial de la latencia
+    "latency_alpha": 0.2
+}
+
+class ProviderHealthRegistry:
+    """Último estado, latencia suavizada y tasa de error por proveedor"""
+
+    def __init__(self, config: Dict[str, Any] = PROVIDER_HEALTH_CONFIG):
+        self.config = config
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, status: str, latency_ms: float,
+               status_code: Optional[int] = None, error: Optional[str] = None,
+               source: str = "traffic"):
+        """Registrar el resultado de una llamada (tráfico real o sonda)"""
+        entry = self._providers.get(name)
+        if entry is None:
+            entry = {
+                "latency_ms": latency_ms,
+                "outcomes": deque(maxlen=self.config["window"]),
+                "calls": {"traffic": 0, "probe": 0}
+            }
+            self._providers[name] = entry
+
+        alpha = self.config["latency_alpha"]
+        entry["latency_ms"] = alpha * latency_ms + (1 - alpha) * entry["latency_ms"]
+        entry["outcomes"].append(status == "active")
+        entry["calls"][source] = entry["calls"].get(source, 0) + 1
+        entry.update(
+            status=status,
+            status_code=status_code,
+            error=error,
+            source=source,
+            last_seen=time.time()
+        )
+
+    def is_fresh(self, name: str) -> bool:
+        entry = self._providers.get(name)
+        return entry is not None and time.time() - entry["last_seen"] < self.config["stale_seconds"]
+
+    def forget(self, name: str):
+        """Olvidar un proveedor (su circuit breaker se expulsó del registro)"""
+        self._providers.pop(name, None)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Snapshot del estado de un proveedor (None si nunca se ha llamado)"""
+        entry = self._providers.get(name)
+        if entry is None:
+            return None
+
+        outcomes = entry["outcomes"]
+        return {
+            "status": entry["status"],
+            "status_code": entry["status_code"],
+            "response_time": round(entry["latency_ms"], 2),
+            "error_rate": round(1 - sum(outcomes) / len(outcomes), 3) if outcomes else 0.0,
+            "last_check": datetime.fromtimestamp(entry["last_seen"]).isoformat(),
+            "age_seconds": round(time.time() - entry["last_seen"], 1),
+            "source": entry["source"],
+            "calls": dict(entry["calls"]),
+            "error": entry["error"]
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "config": self.config,
+            "providers": {name: self.get(name) for name in self._providers}
+        }
+
+# Instancia global del registro de salud
+provider_health = ProviderHealthRegistry()
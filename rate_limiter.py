@@ -0,0 +1,239 @@
+"""
+TAVIT Platform v3.1 - Limitador de Tasa por Proveedor
+Token buckets por proveedor y credencial con espera asíncrona, ráfagas configurables,
+respeto de Retry-After en respuestas 429 y métricas; se aplica como transporte httpx
+"""
+
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _limit(provider: str, rate: int, per: float, burst: int) -> Dict[str, Any]:
+    """Límite de un proveedor; RATE_LIMIT_<PROVEEDOR>="peticiones/segundos" y RATE_LIMIT_<PROVEEDOR>_BURST lo reemplazan"""
+    env = provider.upper()
+    override = os.getenv(f"RATE_LIMIT_{env}")
+    if override:
+        rate_text, _, per_text = override.partition("/")
+        rate, per = int(rate_text), float(per_text or per)
+    return {
+        "rate": rate,
+        "per": per,
+        "burst": int(os.getenv(f"RATE_LIMIT_{env}_BURST", str(burst)))
+    }
+
+# Límites por proveedor: "rate" peticiones cada "per" segundos, con ráfagas de hasta "burst"
+RATE_LIMITS = {
+    "serpapi": _limit("serpapi", 5, 1, 10),
+    "github": _limit("github", 30, 60, 10),  # API de búsqueda autenticada
+    "reddit": _limit("reddit", 60, 60, 5),
+    # Sistemas de justicia (antes solo documentados en NotificationManager.justice_apis)
+    "courtlistener": _limit("courtlistener", 5000, 3600, 20),
+    "pacer": _limit("pacer", 100, 3600, 5),
+    "vinelink": _limit("vinelink", 1000, 3600, 10)
+}
+
+# Hosts que comparten el cliente "default" pero tienen su propio límite
+RATE_LIMIT_HOSTS = {
+    "pcl.uscourts.gov": "pacer",
+    "www.vinelink.com": "vinelink"
+}
+
+RATE_LIMIT_CONFIG = {
+    # Espera máxima por un token antes de rechazar la petición (segundos)
+    "max_wait": float(os.getenv("RATE_LIMIT_MAX_WAIT", "30")),
+    # Bloqueo aplicado a un 429 sin cabecera Retry-After (segundos)
+    "default_retry_after": float(os.getenv("RATE_LIMIT_DEFAULT_RETRY_AFTER", "5")),
+    # Reintentos de peticiones idempotentes tras un 429
+    "retries_on_429": int(os.getenv("RATE_LIMIT_RETRIES_ON_429", "1")),
+    "retry_methods": ["GET", "HEAD"],
+    # Parámetros y cabeceras que identifican la credencial (un bucket por API key)
+    "key_params": ["api_key", "key", "token"],
+    "key_headers": ["authorization", "x-api-key"]
+}
+
+class RateLimitExceeded(httpx.TransportError):
+    """No hay token disponible dentro de la espera máxima"""
+
+class TokenBucket:
+    """
+    Token bucket implementado como GCRA (tiempo teórico de llegada): cada petición
+    reserva su turno sin locks, por lo que las esperas se atienden en orden de llegada.
+    Pensado para un único event loop.
+    """
+
+    def __init__(self, rate: int, per: float, burst: int):
+        self.rate = rate
+        self.per = per
+        self.burst = max(1, burst)
+        self.interval = per / rate
+        self.tolerance = self.interval * (self.burst - 1)
+        self.tat = 0.0
+        self.blocked_until = 0.0
+        self.stats = {
+            "requests": 0,
+            "delayed": 0,
+            "rejected": 0,
+            "throttled": 0,
+            "retried": 0,
+            "wait_ms_total": 0.0,
+            "max_wait_ms": 0.0
+        }
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """Reservar un turno; devuelve la espera necesaria o None si supera max_wait"""
+        now = time.monotonic()
+        tat = max(self.tat, now)
+        allow_at = max(tat - self.tolerance, self.blocked_until)
+        wait = max(0.0, allow_at - now)
+        if wait > max_wait:
+            self.stats["rejected"] += 1
+            return None
+
+        self.tat = max(tat, allow_at) + self.interval
+        self.stats["requests"] += 1
+        if wait > 0:
+            wait_ms = round(wait * 1000, 1)
+            self.stats["delayed"] += 1
+            self.stats["wait_ms_total"] += wait_ms
+            self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], wait_ms)
+        return wait
+
+    async def acquire(self, max_wait: float = RATE_LIMIT_CONFIG["max_wait"]) -> float:
+        """Esperar un token; devuelve los segundos esperados"""
+        wait = self.reserve(max_wait)
+        if wait is None:
+            raise RateLimitExceeded(f"Límite de tasa excedido (espera > {max_wait}s)")
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def block(self, seconds: float):
+        """Pausar el bucket (Retry-After del proveedor)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def available(self) -> float:
+        """Tokens disponibles ahora mismo (aproximado, para métricas)"""
+        now = time.monotonic()
+        if self.blocked_until > now:
+            return 0.0
+        return max(0.0, min(self.burst, (now - self.tat + self.tolerance) / self.interval + 1))
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Segundos de espera indicados por el proveedor (Retry-After o X-RateLimit-Reset)"""
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    # GitHub y otros: cuota agotada con fecha de reinicio en epoch
+    if response.headers.get("x-ratelimit-remaining") == "0" and response.headers.get("x-ratelimit-reset"):
+        try:
+            return max(0.0, float(response.headers["x-ratelimit-reset"]) - time.time())
+        except ValueError:
+            return None
+    return None
+
+class RateLimiter:
+    """Registro de buckets por (proveedor, credencial)"""
+
+    def __init__(self, limits: Dict[str, Dict[str, Any]] = RATE_LIMITS,
+                 config: Dict[str, Any] = RATE_LIMIT_CONFIG):
+        self.limits = limits
+        self.config = config
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def provider_for(self, host: str, provider: str) -> str:
+        return RATE_LIMIT_HOSTS.get(host, provider)
+
+    def key_fingerprint(self, request: httpx.Request) -> str:
+        """Huella corta de la credencial usada (nunca se guarda la credencial)"""
+        for name in self.config["key_params"]:
+            value = request.url.params.get(name)
+            if value:
+                return hashlib.sha256(value.encode()).hexdigest()[:8]
+        for name in self.config["key_headers"]:
+            value = request.headers.get(name)
+            if value:
+                return hashlib.sha256(value.encode()).hexdigest()[:8]
+        return "anon"
+
+    def bucket(self, provider: str, key: str = "anon") -> Optional[TokenBucket]:
+        """Bucket del proveedor y credencial; None si el proveedor no tiene límite"""
+        limit = self.limits.get(provider)
+        if limit is None:
+            return None
+
+        bucket = self._buckets.get((provider, key))
+        if bucket is None:
+            bucket = TokenBucket(limit["rate"], limit["per"], limit["burst"])
+            self._buckets[(provider, key)] = bucket
+        return bucket
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limits": self.limits,
+            "buckets": {
+                f"{provider}:{key}": {
+                    "available": round(bucket.available(), 2),
+                    "blocked_for_s": round(max(0.0, bucket.blocked_until - time.monotonic()), 2),
+                    **bucket.stats
+                }
+                for (provider, key), bucket in self._buckets.items()
+            }
+        }
+
+# Instancia global del limitador
+rate_limiter = RateLimiter()
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Transporte httpx que pide un token antes de cada petición y respeta los 429"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, provider: str,
+                 limiter: RateLimiter = rate_limiter):
+        self.transport = transport
+        self.provider = provider
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        provider = self.limiter.provider_for(request.url.host, self.provider)
+        bucket = self.limiter.bucket(provider, self.limiter.key_fingerprint(request))
+        if bucket is None:
+            return await self.transport.handle_async_request(request)
+
+        config = self.limiter.config
+        retries = config["retries_on_429"] if request.method in config["retry_methods"] else 0
+
+        while True:
+            # La espera queda en la petición para no contarla como latencia del proveedor
+            waited = await bucket.acquire(config["max_wait"])
+            request.extensions["rate_limit_wait"] = request.extensions.get("rate_limit_wait", 0.0) + waited
+            response = await self.transport.handle_async_request(request)
+            if response.status_code != 429:
+                return response
+
+            bucket.stats["throttled"] += 1
+            retry_after = parse_retry_after(response)
+            if retry_after is None:
+                retry_after = config["default_retry_after"]
+            bucket.block(retry_after)
+
+            if retries <= 0 or retry_after > config["max_wait"]:
+                return response
+            retries -= 1
+            bucket.stats["retried"] += 1
+            await response.aclose()
+
+    async def aclose(self):
+        await self.transport.aclose()
@@ -7,7 +7,6 @@ from fastapi import APIRouter, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel, Field
-import httpx
 import asyncio
 import json
 import os
@@ -15,6 +14,7 @@ import re
 from datetime import datetime
 from io import BytesIO
 import base64
+from http_clients import get_http_client
 
 router = APIRouter(prefix="/api/v1/cameras", tags=["Real-time Cameras"])
 
@@ -233,20 +233,20 @@ async def get_camera_snapshot(camera_id: str):
             raise HTTPException(status_code=404, detail="Cámara no encontrada")
         
         # Obtener imagen actual
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            if "thumbnail" in camera and camera["thumbnail"]:
-                response = await client.get(camera["thumbnail"])
-                
-                if response.status_code == 200:
-                    return StreamingResponse(
-                        BytesIO(response.content),
-                        media_type="image/jpeg",
-                        headers={
-                            "Cache-Control": "no-cache",
-                            "X-Camera-ID": camera_id,
-                            "X-Timestamp": datetime.utcnow().isoformat()
-                        }
-                    )
+        client = get_http_client("default")
+        if "thumbnail" in camera and camera["thumbnail"]:
+            response = await client.get(camera["thumbnail"], timeout=10.0)
+            
+            if response.status_code == 200:
+                return StreamingResponse(
+                    BytesIO(response.content),
+                    media_type="image/jpeg",
+                    headers={
+                        "Cache-Control": "no-cache",
+                        "X-Camera-ID": camera_id,
+                        "X-Timestamp": datetime.utcnow().isoformat()
+                    }
+                )
         
         # Imagen placeholder si no hay snapshot
         placeholder_image = create_placeholder_image(camera["name"], camera["location"])
@@ -362,16 +362,16 @@ async def verify_camera_stream(url: str) -> Dict[str, Any]:
     Verificar disponibilidad de stream de cámara
     """
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.head(url)
-            
-            return {
-                "available": response.status_code < 400,
-                "status_code": response.status_code,
-                "response_time": response.elapsed.total_seconds() if hasattr(response, 'elapsed') else 0,
-                "viewers": 0,  # Placeholder
-                "uptime": "99.5%"  # Placeholder
-            }
+        client = get_http_client("default")
+        response = await client.head(url, timeout=5.0)
+        
+        return {
+            "available": response.status_code < 400,
+            "status_code": response.status_code,
+            "response_time": response.elapsed.total_seconds() if hasattr(response, 'elapsed') else 0,
+            "viewers": 0,  # Placeholder
+            "uptime": "99.5%"  # Placeholder
+        }
             
     except Exception:
         return {
@@ -392,20 +392,20 @@ async def log_camera_viewing(camera_id: str, quality: str):
         if not supabase_url or not supabase_key:
             return
         
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                f"{supabase_url}/rest/v1/camera_viewing_history",
-                headers={
-                    "Authorization": f"Bearer {supabase_key}",
-                    "Content-Type": "application/json",
-                    "apikey": supabase_key
-                },
-                json={
-                    "camera_source_id": camera_id,
-                    "session_duration": 0,  # Se actualizará cuando termine la sesión
-                    "viewed_at": datetime.utcnow().isoformat()
-                }
-            )
+        client = get_http_client("supabase")
+        await client.post(
+            f"{supabase_url}/rest/v1/camera_viewing_history",
+            headers={
+                "Authorization": f"Bearer {supabase_key}",
+                "Content-Type": "application/json",
+                "apikey": supabase_key
+            },
+            json={
+                "camera_source_id": camera_id,
+                "session_duration": 0,  # Se actualizará cuando termine la sesión
+                "viewed_at": datetime.utcnow().isoformat()
+            }
+        )
             
     except Exception as e:
         print(f"Error logging camera viewing: {e}")
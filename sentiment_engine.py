@@ -0,0 +1,254 @@
+"""
+TAVIT Platform v3.1 - Motor de Sentimiento
+Léxico ponderado congelado (es/en) con stemming ligero, negación e intensificadores;
+análisis individual y por lotes para los snippets de las búsquedas OSINT
+"""
+
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+import os
+import re
+from dotenv import load_dotenv
+from keyword_matcher import fold
+
+load_dotenv()
+
+# Configuración del motor de sentimiento
+SENTIMENT_CONFIG = {
+    # Palabras afectadas tras una negación ("no es bueno", "not good")
+    "negation_window": int(os.getenv("SENTIMENT_NEGATION_WINDOW", "3")),
+    "negation_factor": -0.8,
+    # |score| por debajo de este umbral se considera neutral
+    "neutral_threshold": float(os.getenv("SENTIMENT_NEUTRAL_THRESHOLD", "0.5")),
+    # Textos por petición en /osint/sentiment/batch
+    "max_batch": int(os.getenv("SENTIMENT_MAX_BATCH", "1000")),
+    # Tokens distintos recordados con su peso ya resuelto
+    "token_cache_size": 200000
+}
+
+# Léxico ponderado por idioma (-3 muy negativo .. +3 muy positivo)
+SENTIMENT_LEXICON = {
+    "es": {
+        "bueno": 2, "excelente": 3, "fantástico": 3, "increíble": 2.5, "perfecto": 3,
+        "genial": 2.5, "maravilloso": 3, "positivo": 1.5, "exitoso": 2, "éxito": 2,
+        "feliz": 2, "innovador": 1.5, "fiable": 1.5, "confiable": 1.5, "recomendable": 2,
+        "eficiente": 1.5, "satisfecho": 2, "mejor": 1.5, "ganancia": 1.5, "crecimiento": 1.5,
+        "premio": 1.5, "honesto": 2, "transparente": 1.5,
+        "malo": -2, "terrible": -3, "horrible": -3, "pésimo": -3, "negativo": -1.5,
+        "fracaso": -2.5, "triste": -2, "problemático": -2, "deficiente": -2, "pobre": -1.5,
+        "problema": -1.5, "error": -1.5, "fallo": -1.5, "vulnerabilidad": -1.5, "fraude": -3,
+        "estafa": -3, "engaño": -2.5, "denuncia": -2, "demanda": -1.5, "condena": -2.5,
+        "delito": -2.5, "ilegal": -2.5, "quiebra": -2.5, "pérdida": -1.5, "sanción": -2,
+        "multa": -1.5, "corrupción": -3, "robo": -2.5, "falso": -2, "peligro": -2,
+        "riesgo": -1, "crisis": -2, "queja": -1.5
+    },
+    "en": {
+        "good": 2, "excellent": 3, "fantastic": 3, "amazing": 2.5, "perfect": 3,
+        "great": 2.5, "wonderful": 3, "positive": 1.5, "successful": 2, "success": 2,
+        "happy": 2, "innovative": 1.5, "reliable": 1.5, "trustworthy": 2, "recommended": 2,
+        "efficient": 1.5, "satisfied": 2, "best": 2, "better": 1.5, "growth": 1.5,
+        "award": 1.5, "honest": 2, "transparent": 1.5,
+        "bad": -2, "terrible": -3, "horrible": -3, "awful": -3, "negative": -1.5,
+        "failure": -2.5, "fail": -2, "sad": -2, "problematic": -2, "poor": -1.5,
+        "disappointing": -2, "problem": -1.5, "error": -1.5, "vulnerability": -1.5, "fraud": -3,
+        "scam": -3, "lawsuit": -1.5, "convicted": -2.5, "crime": -2.5, "illegal": -2.5,
+        "bankruptcy": -2.5, "loss": -1.5, "sanction": -2, "corruption": -3, "theft": -2.5,
+        "fake": -2, "danger": -2, "risk": -1, "crisis": -2, "complaint": -1.5, "breach": -2
+    }
+}
+
+NEGATORS = frozenset({
+    "no", "nunca", "jamas", "ni", "sin", "tampoco", "nada",
+    "not", "never", "without", "nor", "cannot", "none", "nobody"
+})
+
+INTENSIFIERS = MappingProxyType({
+    "muy": 1.5, "super": 1.5, "bastante": 1.3, "extremadamente": 2.0, "totalmente": 1.5,
+    "very": 1.5, "really": 1.3, "extremely": 2.0, "highly": 1.5, "totally": 1.5
+})
+
+# Sufijos del stemming ligero (texto ya sin acentos), del más largo al más corto
+_ES_SUFFIXES = (
+    "amientos", "imientos", "amiento", "imiento", "aciones", "iciones", "amente", "mente",
+    "adoras", "adores", "idades", "acion", "icion", "idad", "ismos", "ismo", "istas", "ista",
+    "ables", "ibles", "able", "ible", "osas", "osos", "osa", "oso", "ivas", "ivos", "iva", "ivo",
+    "ados", "adas", "ado", "ada", "idos", "idas", "ido", "ida", "es", "as", "os", "a", "o", "e", "s"
+)
+_EN_SUFFIXES = ("ingly", "edly", "fully", "ness", "ment", "ing", "ed", "ly")
+_MIN_STEM = 3
+
+# Palabras funcionales para detectar el idioma en modo "auto"
+FUNCTION_WORDS = {
+    "es": frozenset({"el", "la", "los", "las", "de", "del", "que", "y", "en", "un", "una", "es",
+                     "por", "con", "para", "se", "su", "al", "lo", "como", "pero", "muy", "este", "esta"}),
+    "en": frozenset({"the", "and", "is", "of", "to", "in", "it", "that", "for", "with", "was",
+                     "this", "are", "on", "but", "be", "have", "at", "as", "very", "an", "my"})
+}
+
+_TOKEN_RE = re.compile(r"\w+")
+_CONTRACTION_RE = re.compile(r"n['’]t\b")
+
+def stem_es(token: str) -> str:
+    for suffix in _ES_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+def stem_en(token: str) -> str:
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith(("sses", "xes", "ches", "shes", "zes")):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith("ss") and len(token) > 3:
+        token = token[:-1]
+    for suffix in _EN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+STEMMERS = {"es": stem_es, "en": stem_en}
+
+def tokenize(text: str) -> List[str]:
+    """Tokens en minúsculas y sin acentos; "don't" -> "do not" """
+    return _TOKEN_RE.findall(_CONTRACTION_RE.sub(" not", fold(text)))
+
+class SentimentEngine:
+    """
+    Un léxico congelado por idioma: palabras completas y, aparte, sus raíces. Una raíz solo
+    se busca en la tabla de su idioma y cuando el stemmer de ese idioma quitó un sufijo.
+    En modo "auto" el idioma se detecta por palabras funcionales; si no se decide se prueban
+    todos los idiomas. El peso de cada token distinto se resuelve una sola vez.
+    """
+
+    def __init__(self, lexicon: Dict[str, Dict[str, float]] = SENTIMENT_LEXICON,
+                 config: Dict[str, Any] = SENTIMENT_CONFIG):
+        self.config = config
+        self.languages = list(lexicon)
+        self._words: Dict[str, Mapping[str, float]] = {}
+        self._stems: Dict[str, Mapping[str, float]] = {}
+        for language, words in lexicon.items():
+            stem = STEMMERS.get(language, lambda token: token)
+            folded = {fold(word): weight for word, weight in words.items()}
+            stems: Dict[str, float] = {}
+            for word, weight in folded.items():
+                stems.setdefault(stem(word), weight)
+            self._words[language] = MappingProxyType(folded)
+            self._stems[language] = MappingProxyType(stems)
+        self._token_weights: Dict[str, Dict[str, float]] = {
+            language: {} for language in [*self.languages, "mixed"]
+        }
+
+    def detect_language(self, tokens: List[str]) -> str:
+        """Idioma con más palabras funcionales; "mixed" si no hay un ganador"""
+        counts = {language: sum(1 for token in tokens if token in words)
+                  for language, words in FUNCTION_WORDS.items() if language in self._words}
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] == 0 or (len(ranked) > 1 and ranked[0][1] == ranked[1][1]):
+            return "mixed"
+        return ranked[0][0]
+
+    def _lookup(self, token: str, language: str) -> Optional[float]:
+        weight = self._words[language].get(token)
+        if weight is None:
+            stem = STEMMERS.get(language)
+            stemmed = stem(token) if stem else token
+            if stemmed != token:
+                weight = self._stems[language].get(stemmed)
+        return weight
+
+    def token_weight(self, token: str, language: str = "mixed") -> float:
+        """Peso de un token en un idioma ("mixed": el primer idioma que lo reconoce)"""
+        cache = self._token_weights[language]
+        weight = cache.get(token)
+        if weight is not None:
+            return weight
+
+        for candidate in (self.languages if language == "mixed" else [language]):
+            weight = self._lookup(token, candidate)
+            if weight is not None:
+                break
+        weight = weight or 0.0
+
+        if len(cache) >= self.config["token_cache_size"]:
+            cache.clear()
+        cache[token] = weight
+        return weight
+
+    def score_tokens(self, tokens: List[str], language: str = "mixed") -> Tuple[float, int, int]:
+        """(score, palabras positivas, palabras negativas) aplicando negación e intensificadores"""
+        score = 0.0
+        positive = negative = 0
+        negation_left = 0
+        boost = 1.0
+        window = self.config["negation_window"]
+        factor = self.config["negation_factor"]
+
+        for token in tokens:
+            if token in NEGATORS:
+                negation_left = window
+                continue
+            intensity = INTENSIFIERS.get(token)
+            if intensity is not None:
+                boost = intensity
+                continue
+
+            weight = self.token_weight(token, language)
+            if weight:
+                weight *= boost
+                if negation_left:
+                    weight *= factor
+                score += weight
+                if weight > 0:
+                    positive += 1
+                else:
+                    negative += 1
+            boost = 1.0
+            if negation_left:
+                negation_left -= 1
+
+        return score, positive, negative
+
+    def analyze(self, text: str, language: Optional[str] = "auto") -> Dict[str, Any]:
+        tokens = tokenize(text)
+        if language not in self._words:
+            language = self.detect_language(tokens)
+        score, positive, negative = self.score_tokens(tokens, language)
+        total_words = len(tokens)
+
+        if score > self.config["neutral_threshold"]:
+            sentiment = "positive"
+        elif score < -self.config["neutral_threshold"]:
+            sentiment = "negative"
+        else:
+            sentiment = "neutral"
+        confidence = 0.5 if sentiment == "neutral" else min(0.9, abs(score) / max(total_words, 1) * 2.5)
+
+        return {
+            "sentiment": sentiment,
+            "score": round(score, 3),
+            "confidence": round(confidence, 2),
+            "positive_words": positive,
+            "negative_words": negative,
+            "total_words": total_words,
+            "language": language
+        }
+
+    def label(self, text: str, language: Optional[str] = "auto") -> str:
+        return self.analyze(text, language)["sentiment"]
+
+    def analyze_batch(self, texts: Iterable[str], language: Optional[str] = "auto") -> List[Dict[str, Any]]:
+        """Análisis de muchos textos en una pasada (comparten la cache de tokens)"""
+        return [self.analyze(text, language) for text in texts]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "languages": self.languages,
+            "lexicon_entries": {
+                language: {"words": len(self._words[language]), "stems": len(self._stems[language])}
+                for language in self.languages
+            },
+            "cached_tokens": {language: len(cache) for language, cache in self._token_weights.items()}
+        }
+
+# Instancia global del motor de sentimiento
+sentiment_engine = SentimentEngine()
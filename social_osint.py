@@ -4,17 +4,22 @@ Búsquedas multi-fuente, análisis de sentimientos, seguimiento de entidades
 """
 
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Dict, List, Any, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import AsyncIterator, Dict, List, Any, Optional
 from pydantic import BaseModel, Field
-import httpx
 import asyncio
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from dotenv import load_dotenv
-import re
 import hashlib
+import time
+from provider_cache import serpapi_cache
+from state_backend import StateCache
+from osint_sources import run_source, fan_out, fan_out_as_completed
+from keyword_matcher import keyword_registry
+from sentiment_engine import sentiment_engine, SENTIMENT_CONFIG
+from entity_extractor import entity_extractor, ENTITY_CONFIG
 
 load_dotenv()
 
@@ -54,7 +59,11 @@ class OSINTSearchRequest(BaseModel):
 
 class SentimentAnalysisRequest(BaseModel):
     text: str = Field(..., description="Texto a analizar")
-    language: str = Field(default="es", description="Idioma del texto")
+    language: str = Field(default="auto", description="Idioma: es, en o auto")
+
+class SentimentBatchRequest(BaseModel):
+    texts: List[str] = Field(..., description="Textos a analizar")
+    language: str = Field(default="auto", description="Idioma: es, en o auto")
 
 class HashtagTrackingRequest(BaseModel):
     hashtags: List[str] = Field(..., description="Lista de hashtags a monitorear")
@@ -62,271 +71,67 @@ class HashtagTrackingRequest(BaseModel):
 
 class EntityExtractionRequest(BaseModel):
     text: str = Field(..., description="Texto para extracción de entidades")
+    include_offsets: bool = Field(default=False, description="Incluir posición de cada entidad en el texto")
+
+class EntityBatchRequest(BaseModel):
+    texts: List[str] = Field(..., description="Textos para extracción de entidades")
+    include_offsets: bool = Field(default=False, description="Incluir posición de cada entidad en el texto")
+
+# Fuentes de /osint/search: {fuente solicitada: {etiqueta de resultado: (plugin, opciones)}}
+OSINT_SEARCH_PLAN = {
+    "web": {"web": ("web", {})},
+    "news": {"news": ("news", {})},
+    "github": {
+        "github_users": ("github", {"search_type": "users"}),
+        "github_repos": ("github", {"search_type": "repositories"})
+    },
+    "reddit": {"reddit": ("reddit", {})}
+}
 
-# Cache para resultados OSINT
-osint_cache = {}
+# Orden de prioridad al categorizar tendencias (lista "trend_topics" de keyword_matcher)
+TREND_CATEGORY_ORDER = ["security", "finance", "tech"]
+
+# Resultados por fuente según profundidad de búsqueda
+DEPTH_RESULTS = {"basic": 5, "standard": 10, "deep": 20}
+
+# Cache para resultados OSINT (acotado en entradas y bytes; compartido entre workers con STATE_BACKEND=sqlite)
 cache_timeout = 900  # 15 minutos
+osint_cache = StateCache(
+    "osint_search",
+    max_entries=int(os.getenv("OSINT_CACHE_MAX_ENTRIES", "1000")),
+    default_ttl=cache_timeout,
+    max_bytes=int(os.getenv("OSINT_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+)
 
 class OSINTAnalyzer:
     """Analizador OSINT para redes sociales y fuentes públicas"""
     
-    def __init__(self):
-        self.session = None
-    
-    async def get_session(self):
-        if self.session is None:
-            self.session = httpx.AsyncClient()
-        return self.session
-    
-    async def close_session(self):
-        if self.session:
-            await self.session.aclose()
-            self.session = None
+    # Las búsquedas delegan en los plugins de osint_sources (mismo código que el data crawler)
 
     async def search_web(self, query: str, num_results: int = 10) -> List[Dict]:
         """Búsqueda web usando SerpAPI"""
-        try:
-            if not OSINT_CONFIG["serpapi"]["key"]:
-                return []
-            
-            client = await self.get_session()
-            params = {
-                "engine": "google",
-                "q": query,
-                "api_key": OSINT_CONFIG["serpapi"]["key"],
-                "num": num_results,
-                "hl": "es"
-            }
-            
-            response = await client.get(
-                OSINT_CONFIG["serpapi"]["base_url"],
-                params=params,
-                timeout=OSINT_CONFIG["serpapi"]["timeout"]
-            )
-            
-            if response.status_code != 200:
-                return []
-            
-            data = response.json()
-            results = []
-            
-            # Procesar resultados orgánicos
-            for result in data.get("organic_results", []):
-                results.append({
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""),
-                    "snippet": result.get("snippet", ""),
-                    "date": result.get("date", ""),
-                    "source": "web",
-                    "provider": "Google"
-                })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error en búsqueda web: {e}")
-            return []
+        result = await run_source("web", query, num_results)
+        return result["items"]
 
     async def search_news(self, query: str, num_results: int = 10) -> List[Dict]:
         """Búsqueda de noticias usando SerpAPI"""
-        try:
-            if not OSINT_CONFIG["serpapi"]["key"]:
-                return []
-            
-            client = await self.get_session()
-            params = {
-                "engine": "google_news",
-                "q": query,
-                "api_key": OSINT_CONFIG["serpapi"]["key"],
-                "num": num_results,
-                "hl": "es"
-            }
-            
-            response = await client.get(
-                OSINT_CONFIG["serpapi"]["base_url"],
-                params=params,
-                timeout=OSINT_CONFIG["serpapi"]["timeout"]
-            )
-            
-            if response.status_code != 200:
-                return []
-            
-            data = response.json()
-            results = []
-            
-            # Procesar resultados de noticias
-            for result in data.get("news_results", []):
-                results.append({
-                    "title": result.get("title", ""),
-                    "link": result.get("link", ""), 
-                    "snippet": result.get("snippet", ""),
-                    "date": result.get("date", ""),
-                    "source": "news",
-                    "provider": result.get("source", "Unknown")
-                })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error en búsqueda de noticias: {e}")
-            return []
+        result = await run_source("news", query, num_results)
+        return result["items"]
 
     async def search_github(self, query: str, search_type: str = "users") -> List[Dict]:
         """Búsqueda en GitHub (usuarios, repositorios)"""
-        try:
-            if not OSINT_CONFIG["github"]["token"]:
-                return []
-            
-            client = await self.get_session()
-            headers = {
-                "Authorization": f"token {OSINT_CONFIG['github']['token']}",
-                "Accept": "application/vnd.github.v3+json",
-                "User-Agent": "TAVIT-Platform/1.0"
-            }
-            
-            url = f"{OSINT_CONFIG['github']['base_url']}/search/{search_type}"
-            params = {"q": query, "per_page": 10}
-            
-            response = await client.get(
-                url,
-                headers=headers,
-                params=params,
-                timeout=OSINT_CONFIG["github"]["timeout"]
-            )
-            
-            if response.status_code != 200:
-                return []
-            
-            data = response.json()
-            results = []
-            
-            # Procesar resultados de GitHub
-            for item in data.get("items", []):
-                if search_type == "users":
-                    results.append({
-                        "username": item.get("login", ""),
-                        "profile_url": item.get("html_url", ""),
-                        "avatar_url": item.get("avatar_url", ""),
-                        "type": item.get("type", "User"),
-                        "public_repos": item.get("public_repos", 0),
-                        "followers": item.get("followers", 0),
-                        "source": "github",
-                        "search_type": "users"
-                    })
-                elif search_type == "repositories":
-                    results.append({
-                        "name": item.get("name", ""),
-                        "full_name": item.get("full_name", ""),
-                        "description": item.get("description", ""),
-                        "url": item.get("html_url", ""),
-                        "language": item.get("language", ""),
-                        "stars": item.get("stargazers_count", 0),
-                        "forks": item.get("forks_count", 0),
-                        "owner": item.get("owner", {}).get("login", ""),
-                        "source": "github",
-                        "search_type": "repositories"
-                    })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error en búsqueda de GitHub: {e}")
-            return []
+        result = await run_source("github", query, 10, search_type=search_type)
+        return result["items"]
 
     async def search_reddit(self, query: str, subreddit: str = "all") -> List[Dict]:
         """Búsqueda en Reddit"""
-        try:
-            client = await self.get_session()
-            url = f"{OSINT_CONFIG['reddit']['base_url']}/r/{subreddit}/search.json"
-            
-            params = {
-                "q": query,
-                "limit": 10,
-                "sort": "relevance",
-                "t": "all"
-            }
-            
-            headers = {
-                "User-Agent": "TAVIT-Platform/1.0 by tavit"
-            }
-            
-            response = await client.get(
-                url,
-                params=params,
-                headers=headers,
-                timeout=OSINT_CONFIG["reddit"]["timeout"]
-            )
-            
-            if response.status_code != 200:
-                return []
-            
-            data = response.json()
-            results = []
-            
-            # Procesar resultados de Reddit
-            for post in data.get("data", {}).get("children", []):
-                post_data = post.get("data", {})
-                results.append({
-                    "title": post_data.get("title", ""),
-                    "url": f"https://reddit.com{post_data.get('permalink', '')}",
-                    "subreddit": post_data.get("subreddit", ""),
-                    "author": post_data.get("author", ""),
-                    "score": post_data.get("score", 0),
-                    "num_comments": post_data.get("num_comments", 0),
-                    "created_utc": post_data.get("created_utc", 0),
-                    "selftext": post_data.get("selftext", "")[:300],
-                    "source": "reddit"
-                })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error en búsqueda de Reddit: {e}")
-            return []
+        result = await run_source("reddit", query, 10, subreddit=subreddit)
+        return result["items"]
 
-    async def analyze_sentiment(self, text: str) -> Dict:
-        """Análisis básico de sentimientos"""
+    async def analyze_sentiment(self, text: str, language: str = "auto") -> Dict:
+        """Análisis de sentimiento (motor compartido sentiment_engine)"""
         try:
-            # Diccionarios de palabras positivas y negativas (simplificado)
-            positive_words = [
-                "bueno", "excelente", "fantástico", "increíble", "perfecto",
-                "genial", "maravilloso", "positivo", "exitoso", "feliz",
-                "good", "excellent", "fantastic", "amazing", "perfect",
-                "great", "wonderful", "positive", "successful", "happy"
-            ]
-            
-            negative_words = [
-                "malo", "terrible", "horrible", "pésimo", "negativo",
-                "fracaso", "triste", "problemático", "deficiente", "pobre",
-                "bad", "terrible", "horrible", "awful", "negative", 
-                "failure", "sad", "problematic", "poor", "disappointing"
-            ]
-            
-            text_lower = text.lower()
-            words = re.findall(r'\w+', text_lower)
-            
-            positive_count = sum(1 for word in words if word in positive_words)
-            negative_count = sum(1 for word in words if word in negative_words)
-            total_words = len(words)
-            
-            if positive_count > negative_count:
-                sentiment = "positive"
-                confidence = min(0.9, (positive_count / max(total_words, 1)) * 5)
-            elif negative_count > positive_count:
-                sentiment = "negative"
-                confidence = min(0.9, (negative_count / max(total_words, 1)) * 5)
-            else:
-                sentiment = "neutral"
-                confidence = 0.5
-            
-            return {
-                "sentiment": sentiment,
-                "confidence": round(confidence, 2),
-                "positive_words": positive_count,
-                "negative_words": negative_count,
-                "total_words": total_words
-            }
-            
+            return sentiment_engine.analyze(text, language)
         except Exception as e:
             return {
                 "sentiment": "neutral",
@@ -334,31 +139,13 @@ class OSINTAnalyzer:
                 "error": str(e)
             }
 
-    async def extract_entities(self, text: str) -> Dict:
-        """Extracción básica de entidades nombradas"""
+    async def extract_entities(self, text: str, include_offsets: bool = False) -> Dict:
+        """Extracción de entidades (escáner compartido entity_extractor)"""
         try:
-            # Patrones regex básicos para entidades
-            email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-            phone_pattern = r'\b\d{3}-\d{3}-\d{4}\b|\b\(\d{3}\)\s*\d{3}-\d{4}\b'
-            url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-            
-            # Nombres propios (simplificado - palabras capitalizadas)
-            name_pattern = r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b'
-            
-            entities = {
-                "emails": re.findall(email_pattern, text),
-                "phones": re.findall(phone_pattern, text),
-                "urls": re.findall(url_pattern, text),
-                "names": re.findall(name_pattern, text)[:10],  # Límite a 10 nombres
-                "mentions": re.findall(r'@\w+', text),
-                "hashtags": re.findall(r'#\w+', text)
-            }
-            
-            # Limpiar duplicados
-            for key in entities:
-                entities[key] = list(set(entities[key]))
-            
-            return entities
+            result = await asyncio.to_thread(entity_extractor.extract, text, include_offsets)
+            if include_offsets:
+                return {**result["entities"], "spans": result["spans"]}
+            return result["entities"]
             
         except Exception as e:
             return {"error": str(e)}
@@ -366,6 +153,108 @@ class OSINTAnalyzer:
 # Instancia global del analizador
 osint_analyzer = OSINTAnalyzer()
 
+def osint_search_cache_key(request: OSINTSearchRequest) -> str:
+    return hashlib.md5(f"{request.query}_{request.sources}_{request.depth}".encode()).hexdigest()
+
+def osint_search_plan(request: OSINTSearchRequest) -> Dict[str, Any]:
+    """Plan de fan-out (etiqueta -> plugin) para las fuentes solicitadas"""
+    return {
+        label: plan_entry
+        for source, entries in OSINT_SEARCH_PLAN.items() if source in request.sources
+        for label, plan_entry in entries.items()
+    }
+
+def new_search_results(request: OSINTSearchRequest) -> Dict[str, Any]:
+    return {
+        "query": request.query,
+        "sources_searched": [],
+        "sources_failed": {},
+        "results": {
+            "web": [],
+            "news": [],
+            "github_users": [],
+            "github_repos": [],
+            "reddit": [],
+            "social": []
+        },
+        "summary": {},
+        "timestamp": datetime.now().isoformat()
+    }
+
+# Campos de texto de un resultado usados para el sentimiento
+SENTIMENT_TEXT_FIELDS = ("title", "snippet", "description", "selftext")
+
+def score_items_sentiment(items: List[Dict[str, Any]]):
+    """Añadir {"label", "score"} de sentimiento a cada resultado, en un solo lote"""
+    texts = [
+        " ".join(item[field] for field in SENTIMENT_TEXT_FIELDS if isinstance(item.get(field), str))
+        for item in items
+    ]
+    for item, analysis in zip(items, sentiment_engine.analyze_batch(texts)):
+        item["sentiment"] = {"label": analysis["sentiment"], "score": analysis["score"]}
+
+def add_source_outcome(results: Dict[str, Any], label: str, outcome: Dict[str, Any]):
+    """Ensamblar resultados parciales: las fuentes fallidas no bloquean al resto"""
+    if outcome["status"] == "ok":
+        score_items_sentiment(outcome["items"])
+        results["results"][label] = outcome["items"]
+        results["sources_searched"].append(label)
+    else:
+        results["sources_failed"][label] = {"status": outcome["status"], "error": outcome["error"]}
+
+async def finalize_search_results(results: Dict[str, Any], request: OSINTSearchRequest, num_results: int):
+    """Generar resumen y guardar en cache"""
+    total_results = sum(len(result_list) for result_list in results["results"].values())
+    sentiment_summary = {"positive": 0, "negative": 0, "neutral": 0}
+    for result_list in results["results"].values():
+        for item in result_list:
+            sentiment_summary[item.get("sentiment", {}).get("label", "neutral")] += 1
+    results["summary"] = {
+        "total_results": total_results,
+        "sentiment": sentiment_summary,
+        "sources_count": len(results["sources_searched"]),
+        "depth": request.depth,
+        "search_time": f"{num_results} resultados por fuente"
+    }
+    await osint_cache.aset(osint_search_cache_key(request), results)
+
+async def stream_osint_search(request: OSINTSearchRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Búsqueda OSINT en streaming: un frame "osint_source" por fuente en cuanto termina
+    y un frame final "osint_summary" con el resultado agregado (el mismo de /osint/search)
+    """
+    started = time.perf_counter()
+    num_results = DEPTH_RESULTS.get(request.depth, 10)
+
+    cached_result = await osint_cache.aget(osint_search_cache_key(request))
+    if cached_result is not None:
+        for label in cached_result["sources_searched"]:
+            yield {"type": "osint_source", "source": label, "status": "ok",
+                   "items": cached_result["results"][label], "cached": True}
+        yield {"type": "osint_summary", "cached": True, "elapsed_ms": 0.0, **cached_result}
+        return
+
+    results = new_search_results(request)
+    async for label, outcome in fan_out_as_completed(osint_search_plan(request), request.query, num_results):
+        add_source_outcome(results, label, outcome)
+        yield {
+            "type": "osint_source",
+            "source": label,
+            "status": outcome["status"],
+            "total": outcome["total"],
+            "items": outcome["items"],
+            "error": outcome["error"],
+            "elapsed_ms": outcome["elapsed_ms"]
+        }
+
+    await finalize_search_results(results, request, num_results)
+    yield {
+        "type": "osint_summary",
+        "cached": False,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        **results
+    }
+
 @router.post("/osint/search")
 async def osint_search(request: OSINTSearchRequest):
     """
@@ -378,72 +267,23 @@ async def osint_search(request: OSINTSearchRequest):
         Dict: Resultados agregados de múltiples fuentes
     """
     try:
-        # Generar clave de cache
-        cache_key = hashlib.md5(f"{request.query}_{request.sources}_{request.depth}".encode()).hexdigest()
-        
         # Verificar cache
-        if cache_key in osint_cache:
-            cached_result = osint_cache[cache_key]
-            if datetime.now() - cached_result["timestamp"] < timedelta(minutes=15):
-                return JSONResponse(content=cached_result["data"])
-        
-        results = {
-            "query": request.query,
-            "sources_searched": [],
-            "results": {
-                "web": [],
-                "news": [],
-                "github_users": [],
-                "github_repos": [],
-                "reddit": [],
-                "social": []
-            },
-            "summary": {},
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Definir número de resultados según profundidad
-        num_results = {"basic": 5, "standard": 10, "deep": 20}.get(request.depth, 10)
-        
-        # Ejecutar búsquedas en paralelo
-        tasks = []
+        cached_result = await osint_cache.aget(osint_search_cache_key(request))
+        if cached_result is not None:
+            return JSONResponse(content=cached_result)
         
-        if "web" in request.sources:
-            tasks.append(("web", osint_analyzer.search_web(request.query, num_results)))
+        results = new_search_results(request)
         
-        if "news" in request.sources:
-            tasks.append(("news", osint_analyzer.search_news(request.query, num_results)))
-        
-        if "github" in request.sources:
-            tasks.append(("github_users", osint_analyzer.search_github(request.query, "users")))
-            tasks.append(("github_repos", osint_analyzer.search_github(request.query, "repositories")))
-        
-        if "reddit" in request.sources:
-            tasks.append(("reddit", osint_analyzer.search_reddit(request.query)))
-        
-        # Ejecutar búsquedas
-        search_results = await asyncio.gather(*[task[1] for task in tasks], return_exceptions=True)
+        # Definir número de resultados según profundidad
+        num_results = DEPTH_RESULTS.get(request.depth, 10)
         
-        # Procesar resultados
-        for i, (source_name, _) in enumerate(tasks):
-            if i < len(search_results) and not isinstance(search_results[i], Exception):
-                results["results"][source_name] = search_results[i]
-                results["sources_searched"].append(source_name)
+        # Ejecutar búsquedas en paralelo, cada fuente con su propio timeout
+        outcomes = await fan_out(osint_search_plan(request), request.query, num_results)
+        for label, outcome in outcomes.items():
+            add_source_outcome(results, label, outcome)
         
-        # Generar resumen
-        total_results = sum(len(result_list) for result_list in results["results"].values())
-        results["summary"] = {
-            "total_results": total_results,
-            "sources_count": len(results["sources_searched"]),
-            "depth": request.depth,
-            "search_time": f"{num_results} resultados por fuente"
-        }
-        
-        # Guardar en cache
-        osint_cache[cache_key] = {
-            "data": results,
-            "timestamp": datetime.now()
-        }
+        # Generar resumen y guardar en cache
+        await finalize_search_results(results, request, num_results)
         
         return JSONResponse(content=results)
         
@@ -453,6 +293,23 @@ async def osint_search(request: OSINTSearchRequest):
             detail=f"Error en búsqueda OSINT: {str(e)}"
         )
 
+@router.post("/osint/search/stream")
+async def osint_search_stream(request: OSINTSearchRequest):
+    """
+    Búsqueda OSINT multi-fuente en streaming (NDJSON)
+    
+    Cada línea es un frame JSON: uno por fuente en orden de finalización
+    y un frame final de resumen con el resultado agregado.
+    """
+    async def ndjson():
+        try:
+            async for frame in stream_osint_search(request):
+                yield json.dumps(frame, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": f"Error en búsqueda OSINT: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @router.post("/osint/sentiment")
 async def analyze_sentiment_endpoint(request: SentimentAnalysisRequest):
     """
@@ -465,7 +322,7 @@ async def analyze_sentiment_endpoint(request: SentimentAnalysisRequest):
         Dict: Análisis de sentimiento y métricas
     """
     try:
-        sentiment_result = await osint_analyzer.analyze_sentiment(request.text)
+        sentiment_result = await osint_analyzer.analyze_sentiment(request.text, request.language)
         
         return JSONResponse(content={
             "text": request.text[:200],  # Primeros 200 caracteres
@@ -480,6 +337,48 @@ async def analyze_sentiment_endpoint(request: SentimentAnalysisRequest):
             detail=f"Error en análisis de sentimiento: {str(e)}"
         )
 
+@router.post("/osint/sentiment/batch")
+async def analyze_sentiment_batch_endpoint(request: SentimentBatchRequest):
+    """
+    Analiza el sentimiento de un lote de textos (hasta SENTIMENT_MAX_BATCH por petición)
+    
+    Body:
+        SentimentBatchRequest: Textos e idioma
+    
+    Returns:
+        Dict: Análisis por texto, en el mismo orden, y distribución del lote
+    """
+    if len(request.texts) > SENTIMENT_CONFIG["max_batch"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {SENTIMENT_CONFIG['max_batch']} textos por lote"
+        )
+    
+    try:
+        # Los lotes grandes se analizan fuera del event loop
+        if len(request.texts) > 100:
+            results = await asyncio.to_thread(sentiment_engine.analyze_batch, request.texts, request.language)
+        else:
+            results = sentiment_engine.analyze_batch(request.texts, request.language)
+        
+        distribution = {"positive": 0, "negative": 0, "neutral": 0}
+        for result in results:
+            distribution[result["sentiment"]] += 1
+        
+        return JSONResponse(content={
+            "language": request.language,
+            "total": len(results),
+            "distribution": distribution,
+            "results": results,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en análisis de sentimiento: {str(e)}"
+        )
+
 @router.post("/osint/entities")
 async def extract_entities_endpoint(request: EntityExtractionRequest):
     """
@@ -492,7 +391,7 @@ async def extract_entities_endpoint(request: EntityExtractionRequest):
         Dict: Entidades extraídas (emails, teléfonos, URLs, nombres, etc.)
     """
     try:
-        entities = await osint_analyzer.extract_entities(request.text)
+        entities = await osint_analyzer.extract_entities(request.text, request.include_offsets)
         
         return JSONResponse(content={
             "text": request.text[:200],
@@ -500,7 +399,7 @@ async def extract_entities_endpoint(request: EntityExtractionRequest):
             "entity_count": {
                 key: len(value) if isinstance(value, list) else 0 
                 for key, value in entities.items() 
-                if key != "error"
+                if key not in ("error", "spans")
             },
             "timestamp": datetime.now().isoformat()
         })
@@ -511,6 +410,38 @@ async def extract_entities_endpoint(request: EntityExtractionRequest):
             detail=f"Error en extracción de entidades: {str(e)}"
         )
 
+@router.post("/osint/entities/batch")
+async def extract_entities_batch_endpoint(request: EntityBatchRequest):
+    """
+    Extrae entidades de un lote de textos; los lotes grandes se reparten en un pool de procesos
+    
+    Body:
+        EntityBatchRequest: Textos y si se incluyen offsets
+    
+    Returns:
+        Dict: Entidades por texto, en el mismo orden
+    """
+    if len(request.texts) > ENTITY_CONFIG["max_batch"]:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {ENTITY_CONFIG['max_batch']} textos por lote"
+        )
+    
+    try:
+        results = await entity_extractor.extract_batch(request.texts, request.include_offsets)
+        
+        return JSONResponse(content={
+            "total": len(results),
+            "results": results,
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error en extracción de entidades: {str(e)}"
+        )
+
 @router.get("/osint/trending")
 async def get_trending_topics():
     """
@@ -609,9 +540,7 @@ async def clear_osint_cache():
         Dict: Confirmación de limpieza
     """
     try:
-        global osint_cache
-        cache_count = len(osint_cache)
-        osint_cache.clear()
+        cache_count = await osint_cache.aclear()
         
         return JSONResponse(content={
             "message": "Cache OSINT limpiado exitosamente",
@@ -624,6 +553,20 @@ async def clear_osint_cache():
             status_code=500,
             detail=f"Error limpiando cache: {str(e)}"
         )
+
+@router.get("/osint/cache/stats")
+async def get_osint_cache_stats():
+    """
+    Métricas de los caches OSINT (aciertos, fallos, desalojos, tamaño)
+    
+    Returns:
+        Dict: Estadísticas del cache de búsquedas y del cache de SerpAPI
+    """
+    return JSONResponse(content={
+        "osint_search": osint_cache.get_stats(),
+        "serpapi": serpapi_cache.get_stats(),
+        "timestamp": datetime.now().isoformat()
+    })
 async def fetch_real_trending_topics() -> Dict:
     """
     Obtener temas de tendencia reales usando SerpAPI
@@ -633,52 +576,41 @@ async def fetch_real_trending_topics() -> Dict:
             return {}
         
         # Usar Google Trends a través de SerpAPI
-        async with httpx.AsyncClient() as client:
-            params = {
-                "engine": "google_trends",
-                "data_type": "TIMESERIES",
-                "geo": "ES",  # España
-                "api_key": OSINT_CONFIG["serpapi"]["key"]
-            }
+        params = {
+            "engine": "google_trends",
+            "data_type": "TIMESERIES",
+            "geo": "ES",  # España
+            "api_key": OSINT_CONFIG["serpapi"]["key"]
+        }
+        
+        response = await serpapi_cache.get(params, timeout=10)
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            response = await client.get(
-                "https://serpapi.com/search.json",
-                params=params,
-                timeout=10
-            )
+            # Procesar resultados de Google Trends
+            trends = {
+                "global": [],
+                "security": [],
+                "finance": [],
+                "tech": []
+            }
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Procesar resultados de Google Trends
-                trends = {
-                    "global": [],
-                    "security": [],
-                    "finance": [],
-                    "tech": []
-                }
-                
-                if "trending_searches" in data:
-                    for item in data["trending_searches"][:20]:
-                        trend_item = {
-                            "keyword": item.get("query", ""),
-                            "volume": item.get("search_volume", 0),
-                            "sentiment": analyze_sentiment(item.get("query", "")),
-                            "related_topics": item.get("related_topics", [])
-                        }
-                        
-                        # Categorizar por palabras clave
-                        keyword_lower = trend_item["keyword"].lower()
-                        if any(word in keyword_lower for word in ["seguridad", "ciberseguridad", "vulnerabilidad"]):
-                            trends["security"].append(trend_item)
-                        elif any(word in keyword_lower for word in ["finanzas", "dinero", "banco"]):
-                            trends["finance"].append(trend_item)
-                        elif any(word in keyword_lower for word in ["tecnología", "IA", "software"]):
-                            trends["tech"].append(trend_item)
-                        else:
-                            trends["global"].append(trend_item)
-                
-                return trends
+            if "trending_searches" in data:
+                topics = keyword_registry.get("trend_topics", "es")
+                for item in data["trending_searches"][:20]:
+                    trend_item = {
+                        "keyword": item.get("query", ""),
+                        "volume": item.get("search_volume", 0),
+                        "sentiment": sentiment_engine.label(item.get("query", "")),
+                        "related_topics": item.get("related_topics", [])
+                    }
+                    
+                    # Categorizar por palabras clave
+                    category = topics.first_category(trend_item["keyword"], TREND_CATEGORY_ORDER)
+                    trends[category or "global"].append(trend_item)
+            
+            return trends
         
         return {}
         
@@ -700,10 +632,11 @@ async def get_trending_from_search() -> Dict:
         ]
         
         trends = {"global": [], "security": [], "finance": [], "tech": []}
+        topics = keyword_registry.get("trend_topics", "es")
         
         for search_term in trending_searches:
             volume = await get_search_volume(search_term)
-            sentiment = analyze_sentiment(search_term)
+            sentiment = sentiment_engine.label(search_term)
             
             trend_item = {
                 "keyword": search_term,
@@ -712,14 +645,8 @@ async def get_trending_from_search() -> Dict:
             }
             
             # Categorizar
-            if "seguridad" in search_term or "fraude" in search_term:
-                trends["security"].append(trend_item)
-            elif "financiero" in search_term or "blockchain" in search_term:
-                trends["finance"].append(trend_item)
-            elif "IA" in search_term or "herramientas" in search_term:
-                trends["tech"].append(trend_item)
-            else:
-                trends["global"].append(trend_item)
+            category = topics.first_category(search_term, TREND_CATEGORY_ORDER)
+            trends[category or "global"].append(trend_item)
         
         return trends
         
@@ -735,49 +662,25 @@ async def get_search_volume(query: str) -> int:
         if not OSINT_CONFIG["serpapi"]["key"]:
             return 0
         
-        async with httpx.AsyncClient() as client:
-            params = {
-                "engine": "google",
-                "q": query,
-                "api_key": OSINT_CONFIG["serpapi"]["key"],
-                "num": 1
-            }
-            
-            response = await client.get(
-                "https://serpapi.com/search.json",
-                params=params,
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Estimar volumen basado en número de resultados
-                if "search_information" in data:
-                    total_results = data["search_information"].get("total_results", 0)
-                    # Convertir a estimación de volumen mensual
-                    return min(int(total_results / 1000), 50000)
+        params = {
+            "engine": "google",
+            "q": query,
+            "api_key": OSINT_CONFIG["serpapi"]["key"],
+            "num": 1
+        }
+        
+        response = await serpapi_cache.get(params, timeout=5)
+        
+        if response.status_code == 200:
+            data = response.json()
+            # Estimar volumen basado en número de resultados
+            if "search_information" in data:
+                total_results = data["search_information"].get("total_results", 0)
+                # Convertir a estimación de volumen mensual
+                return min(int(total_results / 1000), 50000)
         
         return 0
         
     except Exception as e:
         print(f"Error obteniendo volumen de búsqueda: {e}")
         return 0
-
-def analyze_sentiment(text: str) -> str:
-    """
-    Análisis básico de sentimiento
-    """
-    positive_words = ["excelente", "bueno", "positivo", "innovador", "exitoso"]
-    negative_words = ["malo", "problema", "error", "fallo", "vulnerabilidad", "fraude"]
-    
-    text_lower = text.lower()
-    
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    
-    if positive_count > negative_count:
-        return "positive"
-    elif negative_count > positive_count:
-        return "negative"
-    else:
-        return "neutral"
\ No newline at end of file
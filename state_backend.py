@@ -0,0 +1,523 @@
+"""
+TAVIT Platform v3.1 - Backend de Estado Compartido
+Almacén clave/valor y listas por namespace con implementación en proceso (memory)
+o compartida entre workers y persistente (SQLite en modo WAL), seleccionada con STATE_BACKEND
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+from ttl_cache import TTLCache
+
+load_dotenv()
+
+# Configuración del backend de estado
+STATE_BACKEND_CONFIG = {
+    # memory: un estado por proceso | sqlite: compartido entre workers y persistente
+    "backend": os.getenv("STATE_BACKEND", "memory"),
+    "db_path": os.getenv("STATE_DB_PATH", "cache/state.sqlite3"),
+    "busy_timeout": float(os.getenv("STATE_DB_BUSY_TIMEOUT", "5"))
+}
+
+STATE_BACKENDS = ["memory", "sqlite"]
+
+class StateBackend:
+    """
+    Interfaz del backend: valores JSON por (namespace, clave) con TTL opcional
+    y listas por (namespace, clave) con longitud máxima opcional.
+    Los valores leídos de un backend compartido son copias: los cambios se guardan con set().
+    """
+
+    name = "base"
+    shared = False
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """(valor, expires_at en epoch) o None si no existe o venció"""
+        raise NotImplementedError
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        entry = self.get_entry(namespace, key)
+        return default if entry is None else entry[0]
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        raise NotImplementedError
+
+    def count(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def clear(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def append(self, namespace: str, key: str, value: Any, max_len: Optional[int] = None):
+        raise NotImplementedError
+
+    def get_list(self, namespace: str, key: str, limit: Optional[int] = None) -> List[Any]:
+        """Elementos de la lista en orden de inserción (los últimos `limit` si se indica)"""
+        raise NotImplementedError
+
+    def list_length(self, namespace: str, key: str) -> int:
+        raise NotImplementedError
+
+    def delete_list(self, namespace: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def purge_expired(self, namespace: Optional[str] = None) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "shared": self.shared}
+
+class MemoryStateBackend(StateBackend):
+    """Estado en el proceso actual (un worker); es el comportamiento histórico"""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        self._kv: Dict[str, Dict[str, Tuple[Any, Optional[float]]]] = {}
+        self._lists: Dict[str, Dict[str, List[Any]]] = {}
+
+    def get_entry(self, namespace, key):
+        entry = self._kv.get(namespace, {}).get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.time():
+            del self._kv[namespace][key]
+            return None
+        return entry
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._kv.setdefault(namespace, {})[key] = (value, expires_at)
+
+    def delete(self, namespace, key):
+        return self._kv.get(namespace, {}).pop(key, None) is not None
+
+    def items(self, namespace):
+        now = time.time()
+        return [
+            (key, value) for key, (value, expires_at) in list(self._kv.get(namespace, {}).items())
+            if expires_at is None or expires_at > now
+        ]
+
+    def count(self, namespace):
+        return len(self.items(namespace))
+
+    def clear(self, namespace):
+        return len(self._kv.pop(namespace, {}))
+
+    def append(self, namespace, key, value, max_len=None):
+        items = self._lists.setdefault(namespace, {}).setdefault(key, [])
+        items.append(value)
+        if max_len is not None and len(items) > max_len:
+            del items[:len(items) - max_len]
+
+    def get_list(self, namespace, key, limit=None):
+        items = self._lists.get(namespace, {}).get(key, [])
+        return list(items[-limit:]) if limit else list(items)
+
+    def list_length(self, namespace, key):
+        return len(self._lists.get(namespace, {}).get(key, []))
+
+    def delete_list(self, namespace, key):
+        return self._lists.get(namespace, {}).pop(key, None) is not None
+
+    def purge_expired(self, namespace=None):
+        now = time.time()
+        purged = 0
+        for ns in [namespace] if namespace else list(self._kv):
+            entries = self._kv.get(ns, {})
+            expired = [key for key, (_, expires_at) in entries.items() if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del entries[key]
+            purged += len(expired)
+        return purged
+
+    def get_stats(self):
+        return {
+            "backend": self.name,
+            "shared": self.shared,
+            "namespaces": {ns: len(entries) for ns, entries in self._kv.items()},
+            "lists": {ns: sum(len(items) for items in lists.values()) for ns, lists in self._lists.items()}
+        }
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Estado compartido por todos los workers de la máquina y persistente entre reinicios.
+    WAL permite lecturas concurrentes con un escritor; cada operación es una transacción corta.
+    """
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, db_path: str = STATE_BACKEND_CONFIG["db_path"],
+                 busy_timeout: float = STATE_BACKEND_CONFIG["busy_timeout"]):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_kv ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL, "
+                "PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_list ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS state_list_key ON state_list (namespace, key, id)")
+            conn.execute("DELETE FROM state_kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = (), commit: bool = False) -> sqlite3.Cursor:
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(sql, params)
+            if commit:
+                conn.commit()
+            return cursor
+
+    def get_entry(self, namespace, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM state_kv WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._execute(
+            "INSERT OR REPLACE INTO state_kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, default=str), expires_at),
+            commit=True
+        )
+
+    def delete(self, namespace, key):
+        cursor = self._execute(
+            "DELETE FROM state_kv WHERE namespace = ? AND key = ?", (namespace, key), commit=True
+        )
+        return cursor.rowcount > 0
+
+    def items(self, namespace):
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, value FROM state_kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def count(self, namespace):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM state_kv WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, time.time())
+            ).fetchone()
+        return row[0]
+
+    def clear(self, namespace):
+        cursor = self._execute("DELETE FROM state_kv WHERE namespace = ?", (namespace,), commit=True)
+        return cursor.rowcount
+
+    def append(self, namespace, key, value, max_len=None):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT INTO state_list (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str))
+            )
+            if max_len is not None:
+                conn.execute(
+                    "DELETE FROM state_list WHERE namespace = ? AND key = ? AND id <= ("
+                    "SELECT id FROM state_list WHERE namespace = ? AND key = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (namespace, key, namespace, key, max_len)
+                )
+            conn.commit()
+
+    def get_list(self, namespace, key, limit=None):
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT value FROM (SELECT id, value FROM state_list WHERE namespace = ? AND key = ? "
+                "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                (namespace, key, limit if limit else -1)
+            ).fetchall()
+        return [json.loads(value) for (value,) in rows]
+
+    def list_length(self, namespace, key):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*) FROM state_list WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return row[0]
+
+    def delete_list(self, namespace, key):
+        cursor = self._execute(
+            "DELETE FROM state_list WHERE namespace = ? AND key = ?", (namespace, key), commit=True
+        )
+        return cursor.rowcount > 0
+
+    def purge_expired(self, namespace=None):
+        if namespace is None:
+            cursor = self._execute(
+                "DELETE FROM state_kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),), commit=True
+            )
+        else:
+            cursor = self._execute(
+                "DELETE FROM state_kv WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (namespace, time.time()), commit=True
+            )
+        return cursor.rowcount
+
+    def get_stats(self):
+        with self._lock:
+            conn = self._connect()
+            namespaces = conn.execute("SELECT namespace, COUNT(*) FROM state_kv GROUP BY namespace").fetchall()
+            lists = conn.execute("SELECT namespace, COUNT(*) FROM state_list GROUP BY namespace").fetchall()
+        return {
+            "backend": self.name,
+            "shared": self.shared,
+            "db_path": self.db_path,
+            "namespaces": dict(namespaces),
+            "lists": dict(lists)
+        }
+
+def create_state_backend(config: Dict[str, Any] = STATE_BACKEND_CONFIG) -> StateBackend:
+    """Crear el backend configurado (memory por defecto)"""
+    if config["backend"] == "sqlite":
+        return SQLiteStateBackend(config["db_path"], config["busy_timeout"])
+    if config["backend"] != "memory":
+        print(f"STATE_BACKEND desconocido '{config['backend']}', usando memory")
+    return MemoryStateBackend()
+
+# Instancia global del backend de estado
+state_backend = create_state_backend()
+
+async def run_backend(backend: StateBackend, func, *args) -> Any:
+    """
+    Llamada al backend desde código async: la de SQLite va a un hilo (puede esperar el lock
+    de escritura de otro worker hasta busy_timeout); la de memoria se ejecuta en el sitio
+    """
+    if backend.shared:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+class StateMap:
+    """Vista tipo dict de un namespace (corporate_database, registros por id)"""
+
+    def __init__(self, namespace: str, backend: Optional[StateBackend] = None):
+        self.namespace = namespace
+        self.backend = backend or state_backend
+
+    def __getitem__(self, key: str) -> Any:
+        entry = self.backend.get_entry(self.namespace, key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key: str, value: Any):
+        self.backend.set(self.namespace, key, value)
+
+    def __delitem__(self, key: str):
+        if not self.backend.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.backend.get_entry(self.namespace, key) is not None
+
+    def __len__(self) -> int:
+        return self.backend.count(self.namespace)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self.namespace, key, default)
+
+    def keys(self) -> List[str]:
+        return [key for key, _ in self.backend.items(self.namespace)]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.backend.items(self.namespace)]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return self.backend.items(self.namespace)
+
+class StateLists:
+    """Listas con append por clave dentro de un namespace (historial de chat por conversación)"""
+
+    def __init__(self, namespace: str, max_len: Optional[int] = None,
+                 backend: Optional[StateBackend] = None):
+        self.namespace = namespace
+        self.max_len = max_len
+        self.backend = backend or state_backend
+
+    def append(self, key: str, value: Any):
+        self.backend.append(self.namespace, key, value, self.max_len)
+
+    def get(self, key: str, limit: Optional[int] = None) -> List[Any]:
+        return self.backend.get_list(self.namespace, key, limit)
+
+    async def aappend(self, key: str, value: Any):
+        await run_backend(self.backend, self.backend.append, self.namespace, key, value, self.max_len)
+
+    async def aget(self, key: str, limit: Optional[int] = None) -> List[Any]:
+        return await run_backend(self.backend, self.backend.get_list, self.namespace, key, limit)
+
+    async def adelete(self, key: str) -> bool:
+        return await run_backend(self.backend, self.backend.delete_list, self.namespace, key)
+
+    def length(self, key: str) -> int:
+        return self.backend.list_length(self.namespace, key)
+
+    def delete(self, key: str) -> bool:
+        return self.backend.delete_list(self.namespace, key)
+
+    def __contains__(self, key: str) -> bool:
+        return self.length(key) > 0
+
+class StateList:
+    """Una sola lista compartida (colas de alertas)"""
+
+    def __init__(self, namespace: str, key: str, max_len: Optional[int] = None,
+                 backend: Optional[StateBackend] = None):
+        self.lists = StateLists(namespace, max_len, backend)
+        self.key = key
+
+    def append(self, value: Any):
+        self.lists.append(self.key, value)
+
+    def values(self, limit: Optional[int] = None) -> List[Any]:
+        return self.lists.get(self.key, limit)
+
+    def clear(self) -> bool:
+        return self.lists.delete(self.key)
+
+    def __len__(self) -> int:
+        return self.lists.length(self.key)
+
+class StateCache:
+    """
+    Cache con la interfaz de TTLCache: nivel local en memoria (LRU acotado) y, si el backend
+    es compartido, un segundo nivel común a todos los workers que sobrevive reinicios
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 1024, default_ttl: float = 900,
+                 max_bytes: Optional[int] = None, backend: Optional[StateBackend] = None):
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.local = TTLCache(max_entries=max_entries, default_ttl=default_ttl, max_bytes=max_bytes)
+        self.backend = backend or state_backend
+        self.shared = self.backend.shared
+        self._purger: Optional[asyncio.Task] = None
+        self.stats = {"shared_hits": 0, "shared_misses": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key)
+        if value is not None or not self.shared:
+            return default if value is None else value
+        return self._from_shared(key, self.backend.get_entry(self.namespace, key), default)
+
+    async def aget(self, key: str, default: Any = None) -> Any:
+        """get() para código async: el nivel compartido se lee fuera del event loop"""
+        value = self.local.get(key)
+        if value is not None or not self.shared:
+            return default if value is None else value
+        entry = await asyncio.to_thread(self.backend.get_entry, self.namespace, key)
+        return self._from_shared(key, entry, default)
+
+    def _from_shared(self, key: str, entry: Optional[Tuple[Any, Optional[float]]], default: Any) -> Any:
+        if entry is None:
+            self.stats["shared_misses"] += 1
+            return default
+
+        # Lo calculado por otro worker se copia al nivel local con el TTL restante
+        value, expires_at = entry
+        self.stats["shared_hits"] += 1
+        ttl = expires_at - time.time() if expires_at is not None else self.default_ttl
+        self.local.set(key, value, ttl=ttl)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=ttl)
+        if self.shared:
+            self.backend.set(self.namespace, key, value, ttl=ttl)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        """set() para código async: la escritura compartida va a un hilo"""
+        ttl = self.default_ttl if ttl is None else ttl
+        self.local.set(key, value, ttl=ttl)
+        if self.shared:
+            await asyncio.to_thread(self.backend.set, self.namespace, key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        deleted = self.local.delete(key)
+        if self.shared:
+            deleted = self.backend.delete(self.namespace, key) or deleted
+        return deleted
+
+    def clear(self) -> int:
+        count = self.local.clear()
+        if self.shared:
+            count = max(count, self.backend.clear(self.namespace))
+        return count
+
+    async def aclear(self) -> int:
+        count = self.local.clear()
+        if self.shared:
+            count = max(count, await asyncio.to_thread(self.backend.clear, self.namespace))
+        return count
+
+    async def _purge_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.backend.purge_expired, self.namespace)
+
+    def start_sweeper(self, interval: float = 60):
+        """Barrido periódico del nivel local y de las entradas vencidas del backend compartido"""
+        self.local.start_sweeper(interval)
+        if self.shared and (self._purger is None or self._purger.done()):
+            self._purger = asyncio.create_task(self._purge_loop(interval))
+
+    def stop_sweeper(self):
+        self.local.stop_sweeper()
+        if self._purger is not None:
+            self._purger.cancel()
+            self._purger = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.local.get_stats()
+        stats["backend"] = self.backend.name
+        if self.shared:
+            stats["shared_entries"] = self.backend.count(self.namespace)
+            stats.update(self.stats)
+        return stats
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.local or (self.shared and self.backend.get_entry(self.namespace, key) is not None)
+
+    def __len__(self) -> int:
+        return len(self.local)
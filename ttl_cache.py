@@ -0,0 +1,133 @@
+"""
+TAVIT Platform v3.1 - Cache en Memoria
+Cache LRU con expiración por entrada para respuestas y resultados OSINT
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import time
+
+def estimate_size(value: Any) -> int:
+    """Tamaño aproximado en bytes de un valor serializable a JSON"""
+    try:
+        return len(json.dumps(value, default=str).encode())
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+class TTLCache:
+    """Cache LRU acotado en entradas y bytes, con TTL por entrada y barrido periódico"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 900,
+                 max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = estimate_size):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Obtener un valor vigente y marcarlo como usado recientemente"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Guardar un valor, desalojando los menos usados si se superan los límites"""
+        ttl = self.default_ttl if ttl is None else ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        # Un valor que no cabe en el cache completo no se guarda
+        if self.max_bytes is not None and size > self.max_bytes:
+            self._remove(key)
+            return
+
+        self._remove(key)
+        self._data[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._data))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[1]
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Eliminar una entrada"""
+        return self._remove(key)
+
+    def clear(self) -> int:
+        """Vaciar el cache y devolver el número de entradas eliminadas"""
+        count = len(self._data)
+        self._data.clear()
+        self._bytes = 0
+        return count
+
+    def sweep_expired(self) -> int:
+        """Eliminar todas las entradas vencidas"""
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _, _) in self._data.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.stats["expirations"] += len(expired)
+        return len(expired)
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep_expired()
+
+    def start_sweeper(self, interval: float = 60):
+        """Iniciar el barrido periódico de entradas vencidas en background"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del cache: tamaño, límites y contadores"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes if self.max_bytes is not None else None,
+            "max_bytes": self.max_bytes,
+            "default_ttl": self.default_ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self.stats
+        }
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,436 @@
+"""
+TAVIT Platform v3.1 - Listas de Sanciones
+Listas públicas (OFAC SDN, consolidada de la UE, CSV propios) cargadas desde un directorio
+local en un índice en memoria: coincidencia exacta, fonética y difusa por trigramas con alias.
+El índice se reconstruye en background y se reemplaza atómicamente cuando cambian los ficheros
+
+Formatos reconocidos en WATCHLIST_DIR:
+- OFAC: sdn.csv / cons_prim.csv (sin cabecera) y sus alias alt.csv / cons_alt.csv, o sdn.xml
+- UE: CSV consolidado (separado por ";") o XML (sanctionEntity/nameAlias)
+- CSV propio con cabecera: name|nombre, aliases|alias (separados por "|" o ";"), type|tipo, program|programa, id
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import csv
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+import numpy as np
+from dotenv import load_dotenv
+from keyword_matcher import fold
+
+load_dotenv()
+
+# Configuración de las listas de sanciones
+WATCHLIST_CONFIG = {
+    "dir": os.getenv("WATCHLIST_DIR", "data/watchlists"),
+    # Cada cuánto se comprueba si los ficheros han cambiado (segundos)
+    "reload_check_seconds": float(os.getenv("WATCHLIST_RELOAD_CHECK_SECONDS", "60")),
+    # Similitud mínima (Dice sobre trigramas) para reportar una coincidencia
+    "min_score": float(os.getenv("WATCHLIST_MIN_SCORE", "0.8")),
+    # A partir de esta similitud la coincidencia bloquea la aprobación
+    "block_score": float(os.getenv("WATCHLIST_BLOCK_SCORE", "0.92")),
+    # Similitud asignada a nombres con la misma clave fonética
+    "phonetic_score": 0.88,
+    "max_results": 10
+}
+
+ENTITY_TYPES = {
+    "individual": "persona", "person": "persona", "p": "persona", "persona": "persona",
+    "entity": "empresa", "enterprise": "empresa", "e": "empresa", "empresa": "empresa", "-0-": "empresa",
+    "vessel": "otro", "aircraft": "otro"
+}
+
+@dataclass
+class WatchlistEntry:
+    """Entrada de una lista de sanciones con su nombre principal y alias"""
+    id: str
+    name: str
+    source: str
+    type: Optional[str] = None
+    aliases: List[str] = field(default_factory=list)
+    programs: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "nombre": self.name,
+            "lista": self.source,
+            "tipo": self.type,
+            "alias": self.aliases[:10],
+            "programas": self.programs
+        }
+
+def normalize_name(name: str) -> str:
+    """Tokens del nombre sin acentos ni puntuación y ordenados ("PEREZ, José" == "Jose Perez")"""
+    return " ".join(sorted(re.sub(r"[^\w]+", " ", fold(name)).split()))
+
+def trigrams(normalized: str) -> frozenset:
+    padded = f" {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+_PHONETIC_RULES = [
+    (re.compile(r"ph"), "f"), (re.compile(r"[dt]h"), "t"), (re.compile(r"s?ch|sh"), "x"),
+    (re.compile(r"ck|qu|q"), "k"), (re.compile(r"c(?=[eiy])"), "s"), (re.compile(r"c"), "k"),
+    (re.compile(r"z"), "s"), (re.compile(r"v"), "b"), (re.compile(r"w"), "u"),
+    (re.compile(r"ll|y"), "i"), (re.compile(r"g(?=[ei])"), "j"), (re.compile(r"h"), "")
+]
+
+def phonetic_token(token: str) -> str:
+    """Clave fonética simple (es/en): grafías equivalentes unificadas, sin vocales interiores ni dobles"""
+    for pattern, replacement in _PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    if not token:
+        return ""
+    key = token[0] + re.sub(r"[aeiou]", "", token[1:])
+    return re.sub(r"(.)\1+", r"\1", key)
+
+def phonetic_key(normalized: str) -> str:
+    return " ".join(sorted(phonetic_token(token) for token in normalized.split()))
+
+def _entity_type(value: Optional[str]) -> Optional[str]:
+    return ENTITY_TYPES.get((value or "").strip().lower()) if value else None
+
+def _ofac_value(value: str) -> str:
+    value = (value or "").strip()
+    return "" if value == "-0-" else value
+
+def _ofac_display(name: str) -> str:
+    """"ESCOBAR GAVIRIA, Pablo Emilio" -> "Pablo Emilio ESCOBAR GAVIRIA" """
+    if name.count(",") == 1:
+        last, first = name.split(",")
+        return f"{first.strip()} {last.strip()}".strip()
+    return name
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def read_ofac_csv(path: str, entries: Dict[str, WatchlistEntry]):
+    """Fichero principal de OFAC (ent_num, SDN_Name, SDN_Type, Program, ...) o de alias (ent_num, alt_num, tipo, nombre, ...)"""
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for row in csv.reader(f):
+            if len(row) < 4 or not row[0].strip().isdigit():
+                continue
+            key = f"ofac:{row[0].strip()}"
+            if len(row) >= 12:
+                entry = entries.setdefault(key, WatchlistEntry(key, "", "OFAC"))
+                entry.name = _ofac_display(_ofac_value(row[1]))
+                entry.type = _entity_type(_ofac_value(row[2]) or "entity")
+                entry.programs = [p.strip(" []") for p in _ofac_value(row[3]).split(";") if p.strip(" []")]
+            elif len(row) >= 4 and row[1].strip().isdigit():
+                alias = _ofac_display(_ofac_value(row[3]))
+                if alias:
+                    entries.setdefault(key, WatchlistEntry(key, "", "OFAC")).aliases.append(alias)
+
+def read_ofac_xml(root_iter: Iterator, entries: Dict[str, WatchlistEntry]):
+    for _, element in root_iter:
+        if _local(element.tag) != "sdnEntry":
+            continue
+        values = {_local(child.tag): (child.text or "").strip() for child in element}
+        key = f"ofac:{values.get('uid', '')}"
+        entry = WatchlistEntry(key, f"{values.get('firstName', '')} {values.get('lastName', '')}".strip(), "OFAC",
+                               _entity_type(values.get("sdnType")))
+        for child in element.iter():
+            tag = _local(child.tag)
+            if tag == "program" and child.text:
+                entry.programs.append(child.text.strip())
+            elif tag == "aka":
+                aka = {_local(part.tag): (part.text or "").strip() for part in child}
+                alias = f"{aka.get('firstName', '')} {aka.get('lastName', '')}".strip()
+                if alias:
+                    entry.aliases.append(alias)
+        entries[key] = entry
+        element.clear()
+
+def read_eu_xml(root_iter: Iterator, entries: Dict[str, WatchlistEntry]):
+    for _, element in root_iter:
+        if _local(element.tag) != "sanctionEntity":
+            continue
+        key = f"eu:{element.get('logicalId', '')}"
+        entry = WatchlistEntry(key, "", "EU")
+        for child in element.iter():
+            tag = _local(child.tag)
+            if tag == "nameAlias" and child.get("wholeName"):
+                if entry.name:
+                    entry.aliases.append(child.get("wholeName"))
+                else:
+                    entry.name = child.get("wholeName")
+            elif tag == "subjectType":
+                entry.type = _entity_type(child.get("code"))
+            elif tag == "regulation" and child.get("programme") and child.get("programme") not in entry.programs:
+                entry.programs.append(child.get("programme"))
+        if entry.name:
+            entries[key] = entry
+        element.clear()
+
+def read_xml(path: str, entries: Dict[str, WatchlistEntry]):
+    root_iter = ET.iterparse(path, events=("end",))
+    with open(path, "rb") as f:
+        head = f.read(4096).decode("utf-8", errors="replace")
+    if "sdnList" in head or "sdnEntry" in head:
+        read_ofac_xml(root_iter, entries)
+    else:
+        read_eu_xml(root_iter, entries)
+
+def read_table_csv(path: str, entries: Dict[str, WatchlistEntry]):
+    """CSV consolidado de la UE (una fila por alias) o CSV propio con cabecera"""
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        delimiter = ";" if sample.count(";") > sample.count(",") else ","
+        reader = csv.DictReader(f, delimiter=delimiter)
+        fields = {name.strip().lower(): name for name in reader.fieldnames or []}
+
+        if "namealias_wholename" in fields:
+            get = lambda row, name: (row.get(fields.get(name.lower(), ""), "") or "").strip()
+            for row in reader:
+                key = f"eu:{get(row, 'Entity_LogicalId')}"
+                name = get(row, "NameAlias_WholeName")
+                if not name:
+                    continue
+                entry = entries.get(key)
+                if entry is None:
+                    entry = entries[key] = WatchlistEntry(key, name, "EU", _entity_type(
+                        get(row, "Entity_SubjectType_ClassificationCode") or get(row, "Entity_SubjectType")
+                    ))
+                elif name != entry.name and name not in entry.aliases:
+                    entry.aliases.append(name)
+                programme = get(row, "Entity_Regulation_Programme")
+                if programme and programme not in entry.programs:
+                    entry.programs.append(programme)
+            return
+
+        source = os.path.splitext(os.path.basename(path))[0]
+        column = lambda *names: next((fields[name] for name in names if name in fields), None)
+        name_col, alias_col = column("name", "nombre"), column("aliases", "alias")
+        type_col, program_col, id_col = column("type", "tipo"), column("program", "programa"), column("id")
+        if name_col is None:
+            raise ValueError(f"{path}: falta la columna name/nombre")
+        for number, row in enumerate(reader):
+            name = (row.get(name_col) or "").strip()
+            if not name:
+                continue
+            ident = (row.get(id_col) or "").strip() if id_col else ""
+            key = f"{source}:{ident or number}"
+            aliases = re.split(r"[|;]", row.get(alias_col) or "") if alias_col else []
+            programs = re.split(r"[|;]", row.get(program_col) or "") if program_col else []
+            entries[key] = WatchlistEntry(
+                key, name, source, _entity_type(row.get(type_col)) if type_col else None,
+                [alias.strip() for alias in aliases if alias.strip()],
+                [program.strip() for program in programs if program.strip()]
+            )
+
+def read_file(path: str, entries: Dict[str, WatchlistEntry]):
+    if path.lower().endswith(".xml"):
+        read_xml(path, entries)
+        return
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        first = next(csv.reader(f), [])
+    if first and first[0].strip().isdigit():
+        read_ofac_csv(path, entries)
+    else:
+        read_table_csv(path, entries)
+
+class WatchlistIndex:
+    """
+    Índice inmutable de nombres y alias: exacto y fonético por diccionario, y difuso por
+    trigramas. Cada trigrama guarda un array con los nombres que lo contienen; los trigramas
+    compartidos con la consulta se cuentan para todos los nombres en una sola pasada (bincount)
+    y de ahí sale la similitud de Dice
+    """
+
+    def __init__(self, entries: List[WatchlistEntry]):
+        self.entries = entries
+        self.names: List[Tuple[int, str]] = []
+        sizes: List[int] = []
+        postings: Dict[str, List[int]] = {}
+        self.exact: Dict[str, List[int]] = {}
+        self.phonetic: Dict[str, List[int]] = {}
+
+        for entry_index, entry in enumerate(entries):
+            seen = set()
+            for name in [entry.name, *entry.aliases]:
+                normalized = normalize_name(name)
+                if not normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                name_id = len(self.names)
+                self.names.append((entry_index, name))
+                grams = trigrams(normalized)
+                sizes.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(name_id)
+                self.exact.setdefault(normalized, []).append(name_id)
+                self.phonetic.setdefault(phonetic_key(normalized), []).append(name_id)
+
+        self.sizes = np.array(sizes, dtype=np.int32)
+        self.postings: Dict[str, np.ndarray] = {
+            gram: np.array(name_ids, dtype=np.int32) for gram, name_ids in postings.items()
+        }
+
+    def search(self, query: str, min_score: float, phonetic_score: float,
+               limit: int, entity_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        query_grams = trigrams(normalized)
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        def consider(name_id: int, score: float, match_type: str):
+            if score > scores.get(name_id, (0.0, ""))[0]:
+                scores[name_id] = (score, match_type)
+
+        for name_id in self.exact.get(normalized, []):
+            consider(name_id, 1.0, "exact")
+
+        arrays = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if arrays:
+            shared = np.bincount(np.concatenate(arrays), minlength=len(self.names))
+            dice = 2 * shared / (len(query_grams) + self.sizes)
+            for name_id in np.flatnonzero(dice >= min_score):
+                consider(int(name_id), float(dice[name_id]), "fuzzy")
+
+        # Los nombres muy cortos comparten clave fonética con demasiados otros
+        if len(normalized) >= 5:
+            for name_id in self.phonetic.get(phonetic_key(normalized), []):
+                consider(name_id, phonetic_score, "phonetic")
+
+        # Mejor nombre por entrada
+        best: Dict[int, Tuple[float, str, str]] = {}
+        for name_id, (score, match_type) in scores.items():
+            entry_index, name = self.names[name_id]
+            if entry_index not in best or score > best[entry_index][0]:
+                best[entry_index] = (score, match_type, name)
+
+        matches = []
+        for entry_index, (score, match_type, name) in best.items():
+            entry = self.entries[entry_index]
+            if entity_type and entry.type in ("persona", "empresa") and entry.type != entity_type:
+                continue
+            matches.append({
+                **entry.to_dict(),
+                "nombre_coincidente": name,
+                "tipo_coincidencia": match_type,
+                "score": round(score, 3)
+            })
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return matches[:limit]
+
+class Watchlists:
+    """Listas cargadas desde el directorio de datos con recarga atómica en background"""
+
+    def __init__(self, config: Dict[str, Any] = WATCHLIST_CONFIG):
+        self.config = config
+        self.index = WatchlistIndex([])
+        self.lists: Dict[str, int] = {}
+        self._signature: Optional[Tuple] = None
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        self.stats = {"reloads": 0, "screenings": 0, "matches": 0, "last_reload": None,
+                      "last_reload_ms": None, "errors": {}}
+
+    def _files(self) -> List[str]:
+        directory = self.config["dir"]
+        if not directory or not os.path.isdir(directory):
+            return []
+        return sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith((".csv", ".xml"))
+        )
+
+    def _file_signature(self, files: List[str]) -> Tuple:
+        return tuple((path, os.path.getmtime(path), os.path.getsize(path)) for path in files)
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """Reconstruir el índice si cambiaron los ficheros; las consultas siguen usando el anterior mientras tanto"""
+        with self._reload_lock:
+            files = self._files()
+            signature = self._file_signature(files)
+            if not force and signature == self._signature:
+                return self.get_stats()
+
+            started = time.perf_counter()
+            entries: Dict[str, WatchlistEntry] = {}
+            errors = {}
+            # Los ficheros principales antes que los de alias (alt.csv) para no perder el nombre
+            for path in sorted(files, key=lambda path: "alt" in os.path.basename(path).lower()):
+                try:
+                    read_file(path, entries)
+                except Exception as e:
+                    print(f"Error cargando lista de sanciones {path}: {e}")
+                    errors[os.path.basename(path)] = str(e)
+
+            loaded = [entry for entry in entries.values() if entry.name]
+            index = WatchlistIndex(loaded)
+            lists: Dict[str, int] = {}
+            for entry in loaded:
+                lists[entry.source] = lists.get(entry.source, 0) + 1
+
+            # Reemplazo atómico: una sola asignación
+            self.index, self.lists = index, lists
+            self._signature = signature
+            self.stats["reloads"] += 1
+            self.stats["last_reload"] = time.time()
+            self.stats["last_reload_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self.stats["errors"] = errors
+        return self.get_stats()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.index.entries)
+
+    def screen(self, name: str, entity_type: Optional[str] = None,
+               min_score: Optional[float] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Buscar un nombre en todas las listas cargadas"""
+        started = time.perf_counter()
+        index = self.index
+        matches = index.search(
+            name,
+            min_score or self.config["min_score"],
+            self.config["phonetic_score"],
+            limit or self.config["max_results"],
+            entity_type
+        )
+        self.stats["screenings"] += 1
+        self.stats["matches"] += len(matches)
+        return {
+            "coincidencias": matches,
+            "bloqueante": any(match["score"] >= self.config["block_score"] for match in matches),
+            "listas": dict(self.lists),
+            "entradas": len(index.entries),
+            "tiempo_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+    async def _watch_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                print(f"Error recargando listas de sanciones: {e}")
+            await asyncio.sleep(self.config["reload_check_seconds"])
+
+    def start_watcher(self):
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch_loop())
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "dir": self.config["dir"],
+            "lists": dict(self.lists),
+            "entries": len(self.index.entries),
+            "names": len(self.index.names),
+            "trigrams": len(self.index.postings),
+            **self.stats
+        }
+
+# Instancia global de las listas de sanciones
+watchlists = Watchlists()